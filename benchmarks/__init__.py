@@ -0,0 +1,30 @@
+"""基准测试，需要用单独的配置文件运行，避免影响正在使用的数据，比如
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m benchmarks.crawl_replay
+"""
+import json
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()  # noqa: S607
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def save_result(name: str, result: dict, output: str | None) -> dict:
+    """加上运行环境的信息，写入 JSON 文件，便于不同提交之间对比"""
+    result = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        **result,
+    }
+    if output:
+        Path(output).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return result
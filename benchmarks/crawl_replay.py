@@ -0,0 +1,87 @@
+"""回放录制的网络请求，运行全部示例抓取器，报告吞吐量和各阶段的耗时
+
+先联网录制一次，之后可以离线重复运行，--clear 会清空配置的数据库，使每次都走完整的保存流程
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m benchmarks.crawl_replay --record --clear
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m benchmarks.crawl_replay --clear --latency 0.05 -o crawl.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import time
+
+from config_handle import config
+from data_handle import Plugins, data
+from src.crawl import ScraperNameAndParams, start_to_crawl
+from src.utils.metrics import articles_total, crawl_phase_seconds
+
+from . import save_result
+
+logger = logging.getLogger("benchmark")
+
+
+def example_scrapers() -> dict[str, tuple[ScraperNameAndParams, ...]]:
+    """只包括示例抓取器，都在本地运行，且实例之间不等待"""
+    scrapers = {}
+    for cls_id in Plugins.get_all_id():
+        cls = Plugins.get_plugin_or_none(cls_id)
+        if cls_id in ("Remote", "Representative") or not cls.__module__.startswith("src.scraper.examples"):
+            continue
+        instances = ScraperNameAndParams.create(cls_id, i_am_remote=True)
+        scrapers[cls_id] = tuple(dataclasses.replace(s, interval=0) for s in instances)
+    return scrapers
+
+
+async def crawl_one_class(scrapers: tuple[ScraperNameAndParams, ...]) -> tuple[int, str]:
+    try:
+        res = await start_to_crawl([scrapers])
+    except Exception as e:
+        return 0, f"{e.__class__.__name__}: {e}"
+    return sum(len(r) for r in res), ""
+
+
+async def run() -> dict:
+    scrapers = example_scrapers()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(crawl_one_class(s) for s in scrapers.values()))
+    seconds = time.perf_counter() - start
+
+    articles = sum(articles_total._values.values())  # noqa: SLF001
+    sources = sum(n for n, _ in results)
+    return {
+        "mode": config.cassette_mode,
+        "latency": config.cassette_latency,
+        "seconds": round(seconds, 3),
+        "instances": sum(len(s) for s in scrapers.values()),
+        "sources": sources,
+        "articles": articles,
+        "sources_per_second": round(sources / seconds, 3),
+        "articles_per_second": round(articles / seconds, 3),
+        "phases": {phase: {"count": count, "seconds": round(total, 4)}
+                   for phase, (count, total) in sorted(crawl_phase_seconds.totals("phase").items())},
+        "failed": {cls_id: error for cls_id, (_, error) in zip(scrapers, results, strict=True) if error},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="访问网络并录制，否则从录制的文件回放")
+    parser.add_argument("--latency", type=float, default=0, help="回放时每个请求等待的秒数")
+    parser.add_argument("--clear", action="store_true", help="运行前清空数据库")
+    parser.add_argument("-o", "--output", help="结果写入的 JSON 文件")
+    args = parser.parse_args()
+
+    config.cassette_mode = "record" if args.record else "replay"
+    config.cassette_latency = args.latency
+    config.enable_metrics = True
+    config.wait_before_close_browser = 0
+    if args.clear:
+        data.db_intf._clear_db()  # noqa: SLF001
+
+    result = save_result("crawl_replay", asyncio.run(run()), args.output)
+    print(json.dumps(result, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""对比抓取器读取网页的三种方式的耗时：BeautifulSoup 构建整棵树、只构建 SoupStrainer 匹配的部分、parse_html 用 lxml 解析
+
+网页是 tests/scraper/html 中保存的样例，查询和对应抓取器读取的节点相同，三种方式的结果也应该相同。
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m benchmarks.html_parse -r 50 -o html_parse.json
+"""
+import argparse
+import json
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from src.scraper.tools import parse_html
+
+from . import save_result
+
+HTML_DIR = Path(__file__).parent.parent / "tests" / "scraper" / "html"
+
+
+def telegram_channel(soup) -> list:
+    right_column = soup.find('section', class_='tgme_right_column')
+    result = [right_column.find('div', class_='tgme_channel_info_header_title').get_text(strip=True),
+              right_column.find('div', class_='tgme_channel_info_description').get_text(strip=True)]
+    for a in soup.find_all('div', class_='tgme_widget_message_wrap js-widget_message_wrap'):
+        link_tag = a.find('div', class_="tgme_widget_message_text js-message_text").find('a', href=True)
+        info = a.find('div', class_="tgme_widget_message_footer").find('div', class_="tgme_widget_message_info")
+        preview = a.find('a', class_="tgme_widget_message_link_preview")
+        result.append((link_tag['href'], link_tag.get_text(strip=True), info.find('time', datetime=True)['datetime'],
+                       preview.find('div', class_="link_preview_description").text if preview else "",
+                       a.find('a', class_="tgme_widget_message_date")['href']))
+    return result
+
+
+def mangacopy(soup) -> list:
+    articles = soup.find('div', id='default全部').find_all('a', style=re.compile(r'display:\s*(block|none);'))
+    result = [(a["title"], a["href"]) for a in articles]
+    result.append(next(t for li in soup.find_all('li') if (t := li.text.strip()).startswith("最後更新：")))
+    result.append(soup.find('p', class_='intro').text)
+    result.append(soup.find('img')["src"])
+    return result
+
+
+def hot_juejin(soup) -> list:
+    return [soup.find('div', class_='meta-box').find('time', class_="time")["datetime"],
+            soup.find('div', class_='message').p.text,
+            soup.find('img', class_='medium-zoom-image')["src"]]
+
+
+def chiphell(soup) -> list:
+    test_room = soup.find('div', class_='chip_index_pingce cl')
+    return [test_room.div.span.text.strip()] + [
+        (a.select_one('a.tm01 img')['src'], a.select_one('a.tm03').text.strip(), a.select_one('div.tm04').text.strip(),
+         a.select_one('a.tm03')['href'], a.select_one('div.avimain2 span').text)
+        for a in test_room.find('div', class_='acon cl').select('ul#threadulid li')
+    ]
+
+
+def career_tsinghua(soup) -> list:
+    return [(li.find('a')['style'], li.find('a').text.strip(), li.find('a').get('ahref'), li.find('span').text.strip())
+            for li in soup.find_all('ul', id='todayList')[0].find_all('li')]
+
+
+# 网页名称：(读取节点的函数，只包括这些节点所在部分的 SoupStrainer)
+QUERIES: dict[str, tuple[Callable, SoupStrainer]] = {
+    "telegram_channel": (telegram_channel, SoupStrainer(["section"])),
+    "mangacopy": (mangacopy, SoupStrainer(["div", "p", "img"], class_=["tab-content", "comicParticulars-left-img",
+                                                                       "comicParticulars-title-right", "intro"])),
+    "hot_juejin": (hot_juejin, SoupStrainer("article")),
+    "chiphell": (chiphell, SoupStrainer("div", class_="chip_index_pingce cl")),
+    "career_tsinghua": (career_tsinghua, SoupStrainer("ul", id="todayList")),
+}
+
+
+def load(name: str) -> str:
+    return (HTML_DIR / f"{name}.html").read_text(encoding="utf-8")
+
+
+def run(repeat: int) -> dict:
+    timings = {}
+    for name, (query, only) in QUERIES.items():
+        html = load(name)
+        item = timings[name] = {"count": repeat}
+        for method, parse in (("bs4_full", lambda h: BeautifulSoup(h, features="lxml")),
+                              ("bs4_strainer", lambda h, only=only: parse_html(h, only)),
+                              ("parse_html", parse_html)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                query(parse(html))
+            item[f"{method}_ms"] = round((time.perf_counter() - start) / repeat * 1000, 4)
+        item["speedup"] = round(item["bs4_full_ms"] / item["parse_html_ms"], 2)
+    return {"repeat": repeat, "timings": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-r", "--repeat", type=int, default=50, help="每个网页解析的次数")
+    parser.add_argument("-o", "--output", help="结果写入的 JSON 文件")
+    args = parser.parse_args()
+    result = save_result("html_parse", run(args.repeat), args.output)
+    print(json.dumps(result, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""大量源时的基准测试：生成 N 个源、每个 M 篇文章，测量保存、查询、生成 RSS、缓存加载和网页接口的耗时
+
+数据写在临时目录中，不影响配置的数据库。每项记录次数、总时长和单次耗时（毫秒），
+单次耗时超过 THRESHOLDS ，或者比 --baseline 指定的上次结果慢了 --tolerance 以上时，以非零状态退出。
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m benchmarks.scale -n 1000 -m 10 -o scale.json
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m benchmarks.scale --baseline scale.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from data_handle import RSSCache, data
+from src.crawl.generate_rss import generate_rss
+from src.data import DatabaseIntf, SQliteConnInfo, SQliteIntf
+from src.scraper import AccessLevel, ArticleInfo, SortKey, SrcMetaDict
+
+from . import save_result
+
+# 单次操作的耗时上限，毫秒，按普通的开发机设置得比较宽松
+THRESHOLDS = {
+    "store2database": 50,
+    "get_top_n_articles_by_key": 50,
+    "generate_rss": 50,
+    "rss_cache_startup": 60000,
+    "get_source_list": 500,
+    "route_rss_list": 2000,
+    "route_rss_xml": 50,
+    "route_rss_json": 100,
+}
+
+
+class Timings:
+    def __init__(self):
+        self.items: dict[str, dict] = {}
+
+    @contextmanager
+    def measure(self, name: str, count: int = 1):
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        item = self.items.setdefault(name, {"count": 0, "seconds": 0.0})
+        item["count"] += count
+        item["seconds"] += seconds
+        item["per_op_ms"] = round(item["seconds"] / item["count"] * 1000, 4)
+
+
+def fake_source(i: int) -> SrcMetaDict:
+    return {
+        "name": f"Bench Source {i}",
+        "link": f"https://example.com/{i}",
+        "desc": "synthetic source for benchmark",
+        "lang": "zh-CN",
+        "tags": "",
+        "key4sort": SortKey.PUB_TIME,
+        "access": AccessLevel.PUBLIC,
+        "table_name": f"bench_source_{i}",
+    }
+
+def fake_article(i: int, j: int, now: datetime) -> dict:
+    return ArticleInfo.model_validate({
+        "title": f"Article {j} of source {i}",
+        "summary": "summary " * 20,
+        "link": f"https://example.com/{i}/{j}",
+        "content": "<p>content</p>" * 50,
+        "pub_time": now - timedelta(hours=j),
+    }).model_dump()
+
+
+def fill(db_intf: DatabaseIntf, rss_dir: Path, n: int, m: int, timings: Timings) -> list[str]:
+    now = datetime.now()
+    names = []
+    for i in range(n):
+        source_info = fake_source(i)
+        db_intf.exist_source_meta(source_info)
+        for j in range(m):
+            article = fake_article(i, j, now)
+            with timings.measure("store2database"):
+                db_intf.store2database(source_info["table_name"], article)
+        with timings.measure("get_top_n_articles_by_key"):
+            articles = db_intf.get_top_n_articles_by_key(source_info["table_name"], m, source_info["key4sort"])
+        with timings.measure("generate_rss"):
+            rss = generate_rss(source_info, articles)
+        (rss_dir / f"{source_info['table_name']}.xml").write_bytes(rss)
+        names.append(source_info["table_name"])
+    return names
+
+
+async def request_routes(names: list[str], requests: int, timings: Timings):
+    from main import fast_app  # 导入时会加载插件等，只在需要时导入
+
+    transport = httpx.ASGITransport(app=fast_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with timings.measure("route_rss_list"):
+            assert (await client.get("/source2rss/")).status_code == 200
+        for name in random.sample(names, min(requests, len(names))):
+            with timings.measure("route_rss_xml"):
+                assert (await client.get(f"/source2rss/{name}.xml/")).status_code == 200
+            with timings.measure("route_rss_json"):
+                assert (await client.get(f"/source2rss/{name}.json/")).status_code == 200
+
+
+def run(n: int, m: int, requests: int) -> dict:
+    timings = Timings()
+    with tempfile.TemporaryDirectory() as tmp:
+        rss_dir = Path(tmp) / "rss"
+        rss_dir.mkdir()
+        db_intf = SQliteIntf.connect(SQliteConnInfo(f"sqlite:///{tmp}/bench.db"))
+        names = fill(db_intf, rss_dir, n, m, timings)
+
+        with timings.measure("rss_cache_startup"):
+            rss_cache = RSSCache(str(rss_dir), db_intf)
+        with timings.measure("get_source_list"):
+            rss_cache.get_source_list(AccessLevel.PUBLIC)
+
+        # 网页接口读取的是全局的缓存，临时替换
+        original_cache, data.rss_cache = data.rss_cache, rss_cache
+        try:
+            asyncio.run(request_routes(names, requests, timings))
+        finally:
+            data.rss_cache = original_cache
+        db_intf.engine.dispose()
+    return {"sources": n, "articles_per_source": m, "timings": timings.items}
+
+
+def check(result: dict, baseline: dict | None, tolerance: float) -> list[str]:
+    failures = []
+    for name, item in result["timings"].items():
+        if (limit := THRESHOLDS.get(name)) is not None and item["per_op_ms"] > limit:
+            failures.append(f"{name}: {item['per_op_ms']}ms > threshold {limit}ms")
+        if baseline and (old := baseline["timings"].get(name)) and item["per_op_ms"] > old["per_op_ms"] * (1 + tolerance):
+            failures.append(f"{name}: {item['per_op_ms']}ms > baseline {old['per_op_ms']}ms * {1 + tolerance}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--sources", type=int, default=1000)
+    parser.add_argument("-m", "--articles", type=int, default=10, help="每个源的文章数")
+    parser.add_argument("-r", "--requests", type=int, default=200, help="请求单个源的次数")
+    parser.add_argument("-o", "--output", help="结果写入的 JSON 文件")
+    parser.add_argument("--baseline", help="用于对比的上次结果")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="相比上次结果允许变慢的比例")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    result = save_result("scale", run(args.sources, args.articles, args.requests), args.output)
+    print(json.dumps(result, ensure_ascii=False, indent=2))  # noqa: T201
+    if failures := check(result, baseline, args.tolerance):
+        print("\n".join(failures), file=sys.stderr)  # noqa: T201
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+import asyncio
 import base64
 import logging
 import os
 from dataclasses import dataclass
 from datetime import datetime
 from typing import ClassVar, Self, TypedDict
+from weakref import WeakKeyDictionary
 
 import httpx
 
@@ -23,10 +25,14 @@ class Source2RSSClient:
     src_url: str
     headers: dict[str, str]
 
-    __slots__ = ("post_url", "src_url", "headers")
+    __slots__ = ("post_url", "src_url", "headers", "_clients")
 
     timeout: ClassVar[httpx.Timeout] = httpx.Timeout(10.0, read=10.0)
 
+    def __post_init__(self):
+        # 连接不能跨事件循环使用，每个事件循环保持一个客户端，复用连接
+        self._clients: WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = WeakKeyDictionary()
+
     @classmethod
     def create(cls, cfg: S2RProfile, send_test: bool=False) -> Self:
         """如果 send_test 为真，则在创建后发送一个文章，用于测试功能"""
@@ -43,7 +49,6 @@ class Source2RSSClient:
 
         client = cls(post_url, src_url, headers)
         if send_test or bool(os.getenv("SOURCE2RSS_CLIENT_SEND_TEST")):
-            import asyncio
             title = f"This is a test article from {cfg['source_name']}"
             summary = """This article was posted because you set the environment variable 'SOURCE2RSS_CLIENT_SEND_TEST'
 or pass True for 'send_test', so when the source2RSS client was being creating, it will send a test article."""
@@ -59,13 +64,20 @@ or pass True for 'send_test', so when the source2RSS client was being creating,
     async def post_article(self, title: str, summary: str) -> httpx.Response | None:
         """不引发异常"""
         data_raw = (Source2RSSClient._assamble_article(self.src_url, title, summary), )
-        async with httpx.AsyncClient(headers=self.headers, timeout=Source2RSSClient.timeout) as client:
-            try:
-                response = await client.post(url=self.post_url, json=data_raw)
-            except Exception as e:
-                logger.warning("exception of Source2RSSClient - post_article: %s", str(e))
-            else:
-                return response
+        loop = asyncio.get_running_loop()
+        if (client := self._clients.get(loop)) is None or client.is_closed:
+            client = self._clients[loop] = httpx.AsyncClient(headers=self.headers, timeout=Source2RSSClient.timeout)
+        try:
+            response = await client.post(url=self.post_url, json=data_raw)
+        except Exception as e:
+            logger.warning("exception of Source2RSSClient - post_article: %s", str(e))
+        else:
+            return response
+
+    async def aclose(self):
+        """关闭当前事件循环中的客户端"""
+        if (client := self._clients.pop(asyncio.get_running_loop(), None)) is not None:
+            await client.aclose()
 
     def sync_post_article(self, title: str, summary: str) -> httpx.Response | None:
         """不引发异常"""
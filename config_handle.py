@@ -27,9 +27,20 @@ class Config(BriefConfig):
     WAIT: int
     amount_when_firstly_add: int
     interval_between_each_instance: int
+    concurrent_instances: int
     max_of_rss_items: int
     timezone: str
     max_opening_context: int
+    browser_instances: int
+    adaptive_polling: bool
+    min_poll_interval: int
+    max_poll_interval: int
+    article_timeout: int
+    min_wait_time: int
+    respect_robots_txt: bool
+    breaker_threshold: int
+    breaker_cooldown: int
+    breaker_max_cooldown: int
     prefer_agent: str | list[tuple[str, int]] # 指定一个 agent ，或者指定一个列表，包含多个 agent 和权重
 
     enabled_web_scraper: dict[str, str]
@@ -48,6 +59,12 @@ class Config(BriefConfig):
     s2r_c: Source2RSSClient | None
 
     enable_agent_server: bool
+    enable_metrics: bool # 开启后，在 /metrics 以 Prometheus 文本格式提供抓取各阶段和请求的耗时
+    loop_lag_threshold: float # 事件循环被阻塞超过这么多秒时，记录是哪个抓取器造成的，为 0 则不监测
+    enable_http_cache: bool # 开启后，抓取器可以对订阅源等进行条件请求，没有更新时跳过解析，缓存在 data_dir/http_cache
+    enable_http2: bool # 安装了 h2 时，请求支持 HTTP/2 的网站使用 HTTP/2
+    offload_workers: int # 解析网页、生成 RSS 等使用的进程数，为 0 则在事件循环中运行
+    crawl_mode: str # in_process 在网页进程中抓取；thread 在网页进程中单独的线程里抓取；daemon 由单独的抓取进程负责定时抓取，网页进程只刷新缓存
     known_agents: list[dict[str, Any]]
 
     # 用户不应该考虑的配置，开发者可以改的
@@ -55,7 +72,28 @@ class Config(BriefConfig):
     http_proxy_url: str
     source_meta: str = "source_meta"   # 存储源的元信息的表的名称
     wait_before_close_browser: int = 180
+    browser_queue_timeout: int = 1800 # 等待浏览器上下文的最长时间，秒
+    context_max_uses: int = 20 # 浏览器上下文复用这么多次后关闭，换新的
+    browser_max_pages: int = 500 # 一个浏览器使用这么多次上下文后重启
+    browser_max_memory: int = 1536 # 一个浏览器的进程树占用的内存超过这么多 MB 后重启
+    browser_memory_interval: int = 30 # 浏览器的内存至少间隔这么多秒才统计一次，读取 /proc 较慢
+    offload_check_pickle: bool = False # offload_workers 为 0 时也检查交给进程池的函数和参数能否 pickle ，用于测试
     refractory_period: int = 60 # 当一个抓取器实例被创建后的一段时间，不接受同一种实例的创建，避免无效的重复
+    last_source_maxsize: int = 1024 # 记住最近多少个实例成功运行得到的源，不应期和熔断期间的请求直接返回它
+    cassette_mode: str = "off" # record 录制网络请求，replay 从录制的文件回放，用于离线测试，见 src/scraper/cassette.py
+    cassette_dir: str = ""
+    http_cache_dir: str = ""
+    http_cache_ttl: int = 30 * 86400 # 这么多秒没有用到的上游响应缓存会被删除
+    http_cache_max_mb: int = 512 # 上游响应缓存的目录超过这么多 MB 时，从最久没有用到的开始删除
+    cassette_latency: float = 0 # 回放时每个请求等待的秒数
+    change_poll_interval: int = 2 # daemon 模式下，网页进程检查源的更新记录的间隔，秒
+    http_max_connections: int = 100 # 共享的 httpx 客户端的连接池上限
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 30 # 空闲连接保留的秒数
+    http_max_per_host: int = 6 # 同一网站同时进行的请求数
+    robots_ttl: int = 86400 # robots.txt 的缓存时间，秒
+    robots_negative_ttl: int = 3600 # 获取 robots.txt 失败时，视为全部允许的时间，秒
+    lease_ttl: int = 120 # 跨进程租约的有效期，秒，持有者会定期续期，进程退出后最多这么久就能被其他进程取得
     init_script_path: str = "" # TODO
     _crawl_schedules: tuple[tuple[str, tuple], ...] = () # 运行时可以改变
 
@@ -73,6 +111,7 @@ class Config(BriefConfig):
         max_opening_context = crawler_default_cfg.get("max_opening_context", 1)
         if max_opening_context <= 0:
             max_opening_context = 1
+        browser_instances = max(crawler_default_cfg.get("browser_instances", 1), 1)
 
         scraper_profile_file = configs.get("scraper_profile", [])
 
@@ -101,8 +140,19 @@ class Config(BriefConfig):
 
             amount_when_firstly_add=crawler_default_cfg.get("amount_when_firstly_add", 10),
             interval_between_each_instance=crawler_default_cfg.get("interval_between_each_instance", 1),
+            concurrent_instances=max(crawler_default_cfg.get("concurrent_instances", 1), 1),
             max_of_rss_items=crawler_default_cfg.get("max_of_rss_items", 50),
             max_opening_context=max_opening_context,
+            browser_instances=browser_instances,
+            adaptive_polling=crawler_default_cfg.get("adaptive_polling", False),
+            min_poll_interval=crawler_default_cfg.get("min_poll_interval", 3600),
+            max_poll_interval=crawler_default_cfg.get("max_poll_interval", 604800),
+            article_timeout=crawler_default_cfg.get("article_timeout", 300),
+            min_wait_time=crawler_default_cfg.get("min_wait_time", 600),
+            respect_robots_txt=crawler_default_cfg.get("respect_robots_txt", False),
+            breaker_threshold=crawler_default_cfg.get("breaker_threshold", 3),
+            breaker_cooldown=crawler_default_cfg.get("breaker_cooldown", 1800),
+            breaker_max_cooldown=crawler_default_cfg.get("breaker_max_cooldown", 86400),
             prefer_agent=crawler_default_cfg.get("prefer_agent", "self"),
             enabled_web_scraper=configs.get('enabled_web_scraper', {}),
             remote_pub_scraper=configs.get('remote_pub_scraper', {}),
@@ -116,8 +166,16 @@ class Config(BriefConfig):
             port=port,
             s2r_c=s2r_c,
             enable_agent_server=configs.get("enable_agent_server", False),
+            enable_http_cache=configs.get("enable_http_cache", False),
+            enable_http2=configs.get("enable_http2", False),
+            offload_workers=max(configs.get("offload_workers", 0), 0),
+            crawl_mode=configs.get("crawl_mode", "in_process"),
+            enable_metrics=configs.get("enable_metrics", False),
+            loop_lag_threshold=configs.get("loop_lag_threshold", 0),
             known_agents=configs.get("known_agents", []),
             rss_dir=f"{data_dir}/rss",
+            cassette_dir=f"{data_dir}/cassettes",
+            http_cache_dir=f"{data_dir}/http_cache",
             http_proxy_url=configs.get("http_proxy_url", ""),
         )
         config.prepare()
@@ -157,6 +215,19 @@ class Config(BriefConfig):
         except KeyError:
             return self.run_everyday_at
 
+    def is_adaptive_polling(self, class_name: str) -> bool:
+        try:
+            return self.scraper_profile[class_name]["custom_cfg"]["adaptive_polling"]
+        except KeyError:
+            return self.adaptive_polling
+
+    def get_poll_bounds(self, class_name: str) -> tuple[int, int]:
+        """返回自适应抓取时，两次抓取之间的最短和最长间隔，单位秒"""
+        custom_cfg = self.scraper_profile.get(class_name, {}).get("custom_cfg", {})
+        min_ = custom_cfg.get("min_poll_interval", self.min_poll_interval)
+        max_ = custom_cfg.get("max_poll_interval", self.max_poll_interval)
+        return min_, max(min_, max_)
+
     def get_schedule_and_cls_names(self, class_names: Iterable[str]) -> dict[str, list[str]]:
         """返回每个时间点需要执行的类的名称"""
         points_cls = defaultdict(list)
@@ -201,12 +272,31 @@ class Config(BriefConfig):
         except KeyError:
             return self.interval_between_each_instance
 
+    def get_concurrency(self, class_name: str) -> int:
+        try:
+            concurrency = self.scraper_profile[class_name]["custom_cfg"]["concurrent_instances"]
+        except KeyError:
+            concurrency = self.concurrent_instances
+        return max(concurrency, 1)
+
     def get_max_rss_items(self, class_name: str) -> int:
         try:
             return self.scraper_profile[class_name]["custom_cfg"]["max_of_rss_items"]
         except KeyError:
             return self.max_of_rss_items
 
+    def get_article_timeout(self, class_name: str) -> int:
+        try:
+            return self.scraper_profile[class_name]["custom_cfg"]["article_timeout"]
+        except KeyError:
+            return self.article_timeout
+
+    def get_min_wait_time(self, class_name: str) -> int:
+        try:
+            return self.scraper_profile[class_name]["custom_cfg"]["min_wait_time"]
+        except KeyError:
+            return self.min_wait_time
+
     def in_bedtime(self, class_name: str, hm: str) -> bool:
         """检查 hm 是否在 bedtime 期间，是的话返回真"""
         try:
@@ -52,12 +52,34 @@ class RSSCache:
 
     def set_rss(self, source_name: str, rss: bytes, rss_json: dict, access: AccessLevel):
         """将RSS源表名称和RSS内容映射，如果是单例，还将类名和RSS内容映射"""
-        rss_data = RSSData(rss.decode(), rss_json)
-        self._cached_sources[access][source_name] = rss_data
+        self.cache_rss(source_name, rss, rss_json, access)
+        self.save_rss_file(source_name, rss)
+
+    def cache_rss(self, source_name: str, rss: bytes, rss_json: dict, access: AccessLevel):
+        """只更新内存中的缓存"""
+        self._cached_sources[access][source_name] = RSSData(rss.decode(), rss_json)
+
+    def save_rss_file(self, source_name: str, rss: bytes):
         rss_filepath = self.rss_dir / (source_name + ".xml")
         with open(rss_filepath, 'wb') as rss_file:   # todo 退出时保存一次
             rss_file.write(rss)
 
+    def reload_rss(self, source_name: str, db_intf: DatabaseIntf):
+        """其他进程更新了源之后，从文件和数据库重新加载这个源"""
+        rss_filepath = self.rss_dir / (source_name + ".xml")
+        src_meta = db_intf.get_source_info(source_name)
+        if src_meta is None or not rss_filepath.is_file():
+            return
+        articles = db_intf.get_top_n_articles_by_key(source_name, config.max_of_rss_items, src_meta["key4sort"])
+        for a in articles:
+            a["pub_time"] = str(a["pub_time"])
+            a["time4sort"] = str(a["time4sort"])
+        rss_json = {"source_info": src_meta, "articles": articles}
+        # 访问级别可能改变，先从所有级别中移除
+        for cached_sources in self._cached_sources:
+            cached_sources.pop(source_name, None)
+        self._cached_sources[src_meta["access"]][source_name] = RSSData(rss_filepath.read_text(encoding="utf-8"), rss_json)
+
     def rss_is_absent(self, source_name: str) -> bool:
         return all(source_name not in self._cached_sources[access] for access in AccessLevel)
 
@@ -1,32 +1,66 @@
 import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from enum import StrEnum
 from pathlib import Path
 
 import socketio
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 
 from data_handle import Plugins
 from config_handle import config
+from src.crawl.crawl_loop import start as start_crawl_loop
+from src.crawl.crawl_loop import stop as stop_crawl_loop
+from src.crawl.daemon import watch_rss_changes
 from src.node import sio
 from src.run_as_scheduled import run_continuously
+from src.scraper.http_client import close_clients
+from src.scraper.tools import shutdown_offload_pool
+from src.utils.loop_monitor import start_monitor, stop_monitors
+from src.utils.metrics import http_request_seconds, render_all
 from src.web import get_rss, manage, post_src, query_rss, usage, user
+from src.web.security import get_admin_user
 
 logger = logging.getLogger("main")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Start the background thread
     loop = asyncio.get_running_loop()
-    stop_run_continuously = run_continuously(loop)
+    monitors = [start_monitor(loop)]
+    if config.crawl_mode == "daemon":
+        # 由单独的抓取进程负责定时抓取，这里只根据更新记录刷新缓存
+        watcher = asyncio.create_task(watch_rss_changes())
+        yield
+        watcher.cancel()
+        stop_monitors(monitors)
+        await close_http_clients()
+        return
+
+    # Start the background thread
+    # thread 模式下，抓取在单独线程的事件循环中进行
+    crawl_loop = start_crawl_loop(loop) if config.crawl_mode == "thread" else loop
+    if crawl_loop is not loop:
+        monitors.append(start_monitor(crawl_loop))
+    stop_run_continuously = run_continuously(crawl_loop)
 
     # Do some other things...
     yield
     # Stop the background thread
     stop_run_continuously.set()
+    if crawl_loop is not loop:
+        stop_crawl_loop()
+    stop_monitors(monitors)
+    await close_http_clients()
+
+
+async def close_http_clients():
+    await close_clients()
+    shutdown_offload_pool()
+    if config.s2r_c:
+        await config.s2r_c.aclose()
 
 
 fast_app = FastAPI(lifespan=lifespan)
@@ -54,6 +88,23 @@ async def favicon():
     return FileResponse(path="src/web/static/favicon.ico", filename="favicon.ico")
 
 
+if config.enable_metrics:
+    @fast_app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        """按处理请求的路由所在的模块，如 get_rss、query_rss、post_src，记录耗时"""
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        router = route.endpoint.__module__.rsplit(".", 1)[-1] if route else "unmatched"
+        http_request_seconds.observe(time.perf_counter() - start, router, request.method, str(response.status_code))
+        return response
+
+    # 标签中有各个源的表名，包括不公开的，只给管理员看
+    @fast_app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(get_admin_user)])
+    async def metrics():
+        return render_all()
+
+
 class AdditionalPage(StrEnum):
     robots = "robots.txt"
     sitemap = "sitemap.xml"
@@ -0,0 +1,124 @@
+"""熔断：某个抓取器类或某个网站连续失败多次后，一段时间内不再运行，等待时间指数增长
+
+每个实例同时受两个熔断器控制，一个以类名为键，一个以 site_of 返回的网址（默认是 home_url ）的主机名为键，任一个打开都会跳过运行。
+等待时间过后进入半开状态，只放行一个实例试探，成功则关闭，失败则再次打开且等待时间翻倍。
+"""
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from urllib.parse import urlparse
+
+from config_handle import config
+from data_handle import Plugins
+
+logger = logging.getLogger("circuit_breaker")
+
+
+class BreakerState(StrEnum):
+    CLOSED = auto()
+    OPEN = auto()
+    HALF_OPEN = auto()
+
+
+@dataclass
+class CircuitBreaker:
+    key: str
+    failures: int = 0       # 连续失败次数
+    opened_times: int = 0   # 连续打开的次数，决定等待时间
+    state: BreakerState = BreakerState.CLOSED
+    open_until: float = 0
+    probing: bool = False   # 半开状态下，是否已经放行了一个试探
+
+    def check(self, now: float) -> bool:
+        """只判断是否放行，不占用试探"""
+        if self.state is BreakerState.OPEN and now >= self.open_until:
+            self.state, self.probing = BreakerState.HALF_OPEN, False
+        if self.state is BreakerState.HALF_OPEN:
+            return not self.probing
+        return self.state is BreakerState.CLOSED
+
+    def allow(self, now: float) -> bool:
+        """放行时，如果是半开状态，占用唯一的试探"""
+        if not self.check(now):
+            return False
+        if self.state is BreakerState.HALF_OPEN:
+            self.probing = True
+        return True
+
+    def release_probe(self):
+        """试探没有记录结果就结束时，放回试探，否则一直停在半开状态"""
+        if self.state is BreakerState.HALF_OPEN:
+            self.probing = False
+
+    def record_success(self) -> bool:
+        """成功后关闭，如果之前不是关闭的，返回真"""
+        recovered = self.state is not BreakerState.CLOSED
+        self.failures, self.opened_times, self.probing = 0, 0, False
+        self.state = BreakerState.CLOSED
+        return recovered
+
+    def record_failure(self, now: float) -> bool:
+        """失败达到阈值或试探失败时打开，如果是从关闭变为打开，返回真"""
+        self.failures += 1
+        if self.state is BreakerState.CLOSED and self.failures < config.breaker_threshold:
+            return False
+        newly_opened = self.state is BreakerState.CLOSED
+        cooldown = min(config.breaker_cooldown * 2 ** self.opened_times, config.breaker_max_cooldown)
+        self.opened_times += 1
+        self.state, self.probing = BreakerState.OPEN, False
+        self.open_until = now + cooldown
+        return newly_opened
+
+
+breakers: dict[str, CircuitBreaker] = {}
+
+def get_breaker_keys(cls_id: str, init_params: Sequence = ()) -> tuple[str, ...]:
+    """网站由抓取器的 site_of 根据初始化参数决定，class_breaker 为假的类不按类名熔断"""
+    cls = Plugins.get_plugin_or_none(cls_id)
+    if cls is None:
+        return (f"class:{cls_id}",)
+    keys = [f"class:{cls_id}"] if cls.class_breaker else []
+    try:
+        url = cls.site_of(*init_params)
+    except TypeError:   # 参数个数不对，创建时会报错
+        url = cls.home_url
+    if host := urlparse(url).hostname:
+        keys.append(f"host:{host}")
+    return tuple(keys)
+
+def acquire(cls_id: str, init_params: Sequence = ()) -> tuple[CircuitBreaker, ...] | None:
+    """全部熔断器都允许才能运行，不允许时返回 None 。先检查全部熔断器，以便及时进入半开状态，
+    都允许时才占用半开的熔断器的试探，返回这些熔断器，运行结束后需要用 release 放回"""
+    now = time.monotonic()
+    related = [breakers.setdefault(key, CircuitBreaker(key)) for key in get_breaker_keys(cls_id, init_params)]
+    allowed = [b.check(now) for b in related]
+    if not all(allowed):
+        return None
+    probes = tuple(b for b in related if b.state is BreakerState.HALF_OPEN)
+    for b in probes:
+        b.allow(now)
+    return probes
+
+def release(probes: tuple[CircuitBreaker, ...]):
+    """已经记录了结果的熔断器不再是半开状态，不受影响"""
+    for b in probes:
+        b.release_probe()
+
+async def record(cls_id: str, succeeded: bool, init_params: Sequence = (), error: str = "") -> None:
+    """只在打开和恢复时通知，error 是本次失败的原因，打开时附在通知中"""
+    now = time.monotonic()
+    for key in get_breaker_keys(cls_id, init_params):
+        breaker = breakers.setdefault(key, CircuitBreaker(key))
+        if succeeded:
+            if breaker.record_success():
+                logger.info("%s recovers", key)
+                await config.post2RSS("circuit breaker closed", f"{key} recovers after {breaker.key} succeeded")
+        elif breaker.record_failure(now):
+            msg = f"{key} failed {breaker.failures} times in a row, skip it for {int(breaker.open_until - now)} seconds"
+            logger.warning(msg)
+            await config.post2RSS("circuit breaker opened", f"{msg}\n{error}" if error else msg)
+
+def not_closed_breakers() -> list[CircuitBreaker]:
+    return [b for b in breakers.values() if b.state is not BreakerState.CLOSED]
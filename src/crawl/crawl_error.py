@@ -12,6 +12,12 @@ class CrawlRepeatError(CrawlError):
         super().__init__(466, message)
 
 
+class CrawlBreakError(CrawlError):
+    """抓取器类或网站连续失败，已熔断，暂不运行"""
+    def __init__(self, message: str):
+        super().__init__(503, message)
+
+
 class CrawlInitError(CrawlError):
     """创建抓取器实例时出错"""
     pass
@@ -0,0 +1,69 @@
+"""在网页进程的后台线程中运行单独的事件循环，抓取都在这个循环中进行，网页的循环只处理请求
+
+配置 crawl_mode: thread 时由 lifespan 启动。没有启动时，各函数退化为在当前循环中直接运行。
+"""
+import asyncio
+import logging
+import threading
+from collections.abc import Callable, Coroutine
+from typing import Any, TypeVar
+
+from src.scraper.http_client import close_clients
+
+logger = logging.getLogger("crawl_loop")
+
+T = TypeVar("T")
+
+_crawl_loop: asyncio.AbstractEventLoop | None = None
+_web_loop: asyncio.AbstractEventLoop | None = None
+
+
+def start(web_loop: asyncio.AbstractEventLoop) -> asyncio.AbstractEventLoop:
+    """启动抓取线程，返回它的事件循环"""
+    global _crawl_loop, _web_loop
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_forever()
+        loop.close()
+
+    threading.Thread(target=run, name="crawl_loop", daemon=True).start()
+    started.wait()
+    _crawl_loop, _web_loop = loop, web_loop
+    logger.info("crawl loop starts")
+    return loop
+
+
+def stop() -> None:
+    global _crawl_loop, _web_loop
+    if _crawl_loop is not None:
+        # 先关闭这个循环中的 http 客户端，再停止循环
+        loop = _crawl_loop
+        future = asyncio.run_coroutine_threadsafe(close_clients(), loop)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(loop.stop))
+    _crawl_loop, _web_loop = None, None
+
+
+def in_crawl_thread() -> bool:
+    try:
+        return asyncio.get_running_loop() is _crawl_loop
+    except RuntimeError:
+        return False
+
+
+async def run_in_crawl_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """在抓取循环中运行协程，并在当前循环中等待结果"""
+    if _crawl_loop is None or in_crawl_thread():
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _crawl_loop))
+
+
+def call_in_web_loop(func: Callable[..., Any], *args: Any) -> None:
+    """从抓取循环中把缓存的更新交给网页的循环执行，避免两个线程同时修改"""
+    if _web_loop is not None and in_crawl_thread():
+        _web_loop.call_soon_threadsafe(func, *args)
+    else:
+        func(*args)
@@ -1,15 +1,17 @@
 import asyncio
+import json
 import logging
 from collections.abc import Iterable
 from dataclasses import dataclass
 from typing import Self
 
+from cachetools import LRUCache
 from pydantic_core import ValidationError
 
 from data_handle import Plugins
 from config_handle import config
 from data_handle import data
-from src.scraper import AsyncBrowserManager, WebsiteScraper
+from src.scraper import AsyncBrowserManager, WebsiteScraper, http_cache
 from src.scraper.scraper_error import (
     CreateButRequestFail,
     CreateByInvalidParam,
@@ -17,8 +19,11 @@ from src.scraper.scraper_error import (
     CreateByLocked,
     FailtoGet,
 )
+from src.utils.loop_monitor import reset_current_scraper, set_current_scraper
+from src.utils.metrics import crawl_phase_seconds
 
-from .crawl_error import CrawlError, CrawlInitError, CrawlRepeatError, CrawlRunError
+from . import circuit_breaker, lease, polling
+from .crawl_error import CrawlBreakError, CrawlError, CrawlInitError, CrawlRepeatError, CrawlRunError
 from .local_publish import goto_uniform_flow
 
 logger = logging.getLogger("crawler")
@@ -60,6 +65,23 @@ class ScraperNameAndParams:
             scrapers.append(scraper)
         return tuple(scrapers)
 
+    @property
+    def cls_id(self) -> str:
+        """实际运行的抓取器类名，对于 Remote 是委托给远端的类名"""
+        return self.init_params[1] if self.name == "Remote" else self.name
+
+    @property
+    def cls_params(self) -> list:
+        """实际运行的抓取器的初始化参数，对于 Remote 是委托给远端的参数"""
+        if self.name == "Remote":
+            return list(self.init_params[2:])
+        return [self.init_params] if isinstance(self.init_params, str) else list(self.init_params)
+
+    @property
+    def key(self) -> str:
+        """可持久化的标识，同一个抓取器和参数，不论是否通过 Remote 运行，都得到相同的值"""
+        return f"{self.cls_id}:{json.dumps(self.cls_params, ensure_ascii=False, default=str)}"
+
     def __hash__(self):
         if self.name == "Remote":
             return hash(tuple(self.init_params[1:]))
@@ -71,23 +93,33 @@ class ScraperNameAndParams:
             return self.init_params[1:] == other.init_params[1:]
         return self.name == other.name and self.init_params == other.init_params
 
-running_scrapers = set()
+running_scrapers = set()   # 本进程中运行的，跨进程的互斥由租约保证
+# 每个实例最近一次成功运行得到的源，不应期内的请求直接使用。query_rss 的参数来自用户，因此限制数量
+last_source_names: LRUCache[ScraperNameAndParams, str] = LRUCache(maxsize=config.last_source_maxsize)
+
+def _lease_name(scraper: ScraperNameAndParams) -> str:
+    return f"crawl:{scraper.key}"
 
 def has_scraper(scraper: ScraperNameAndParams) -> bool:
     if scraper.name == "Representative":
         return False
-    return scraper in running_scrapers
+    return scraper in running_scrapers or lease.held_by_other(_lease_name(scraper))
 
-def add_scraper(scraper: ScraperNameAndParams):
+async def add_scraper(scraper: ScraperNameAndParams) -> bool:
+    """返回是否添加成功，其他进程抢先取得租约则失败"""
     if scraper.name == "Representative":
-        return
+        return True
+    if not await lease.acquire_with_heartbeat(_lease_name(scraper)):
+        return False
     running_scrapers.add(scraper)
+    return True
 
 async def discard_scraper(scraper: ScraperNameAndParams):
     if scraper.name == "Representative":
         return
     await asyncio.sleep(config.refractory_period)
     running_scrapers.discard(scraper)
+    lease.release_with_heartbeat(_lease_name(scraper))
 
 """
 对于单例抓取器，同一时间只能有一个在运行，因此有运行时的实例时，新请求引发异常
@@ -101,11 +133,10 @@ async def get_instance(scraper: ScraperNameAndParams) -> WebsiteScraper | None:
     if cls is None or (not scraper.init_params and cls.is_variety):
         return
     # 可以创建，但是重复：有另一个相同的在运行，引发异常
-    if has_scraper(scraper):
+    if has_scraper(scraper) or not await add_scraper(scraper): # 添加成功后，需要保证每一处调用该函数的地方都能正常移除
         logger.debug("repeat instance of %s", str(scraper))
         raise CrawlRepeatError(f"repeat instance of {scraper.name}")
     # 最终创建实例
-    add_scraper(scraper) # 需要保证每一处调用该函数的地方都能正常移除
     try:
         if not scraper.init_params:
             instance = await cls.create()
@@ -119,9 +150,36 @@ async def get_instance(scraper: ScraperNameAndParams) -> WebsiteScraper | None:
         raise
     return instance
 
-async def process_one_instance(scraper: ScraperNameAndParams) -> str | None:  # noqa: C901
+async def process_one_instance(scraper: ScraperNameAndParams) -> str | None:
+    """运行期间，当前任务及其子任务都能通过 contextvar 得知正在运行的抓取器，用于定位阻塞事件循环的抓取器"""
+    token = set_current_scraper(scraper.cls_id)
+    try:
+        with http_cache.deferred(scraper.key):
+            return await _process_one_instance(scraper)
+    except (CrawlInitError, CrawlRunError) as e:
+        # 繁忙、参数错误等不是源的问题，不推迟下次抓取
+        if scraper.name != "Representative" and e.code in (500, 503):
+            polling.record_failure(scraper.key, scraper.cls_id)
+        raise
+    finally:
+        reset_current_scraper(token)
+
+async def _process_one_instance(scraper: ScraperNameAndParams) -> str | None:
+    """半开的熔断器放行的试探，不论以何种方式结束都要放回，包括被取消"""
+    if scraper.name == "Representative":
+        return await _run_instance(scraper)
+    probes = circuit_breaker.acquire(scraper.cls_id, scraper.cls_params)
+    if probes is None:
+        raise CrawlBreakError(f"circuit of {scraper.cls_id} is open")
+    try:
+        return await _run_instance(scraper)
+    finally:
+        circuit_breaker.release(probes)
+
+async def _run_instance(scraper: ScraperNameAndParams) -> str | None:  # noqa: C901
     try:
-        instance = await get_instance(scraper)
+        with crawl_phase_seconds.time(scraper.cls_id, "", "get_instance"):
+            instance = await get_instance(scraper)
         if instance is None:
             return
     except TypeError:
@@ -132,40 +190,86 @@ async def process_one_instance(scraper: ScraperNameAndParams) -> str | None:  #
         raise CrawlInitError(422, "Invalid parameters")  # noqa: B904
     except CreateByLackAgent:
         raise CrawlInitError(423, "Lack agent")  # noqa: B904
-    except (CreateButRequestFail, FailtoGet): # todo 多次连续出现，则 post2RSS
+    except (CreateButRequestFail, FailtoGet):
+        await circuit_breaker.record(scraper.cls_id, False, scraper.cls_params) # 连续多次出现则熔断
         raise CrawlInitError(503, "Failed when crawling")  # noqa: B904
     except CrawlError:
         raise
     except Exception as e:
         msg = f"fail when query rss {scraper.name}: {e}"
         logger.exception(msg)
-        await config.post2RSS("error log of _process_one_kind_of_class", msg)
+        # 不必每次都通知，连续失败到熔断时，熔断器会通知一次
+        await circuit_breaker.record(scraper.cls_id, False, scraper.cls_params, msg)
         raise CrawlInitError(500, "Unknown Error") from e
 
+    new_pub_times, failed = [], [False]
     try:
-        source_name = await goto_uniform_flow(data, instance, scraper.amount)
+        source_name = await goto_uniform_flow(data, instance, scraper.amount, new_pub_times, failed)
     except ValidationError:
         raise CrawlRunError(422, "Invalid source meta")  # noqa: B904
+    except FailtoGet:
+        await circuit_breaker.record(scraper.cls_id, False, scraper.cls_params)
+        raise CrawlRunError(503, "Failed when crawling")  # noqa: B904
     except Exception as e:
         msg = f"fail when goto_uniform_flow of {scraper.name}, {scraper.init_params=}: {e}"
         logger.exception(msg)
-        await config.post2RSS("error log of goto_uniform_flow", msg)
+        await circuit_breaker.record(scraper.cls_id, False, scraper.cls_params, msg)
         raise CrawlRunError(500, "Unknown Error") from e
     finally:
         asyncio.create_task(discard_scraper(scraper))
         await instance.destroy() # TODO 不能保证一定会清理资源
+    if scraper.name != "Representative":
+        # 中途出错但保存了新文章的，依然返回源，不影响同类的其他实例，只是记为失败
+        await circuit_breaker.record(scraper.cls_id, not failed[0], scraper.cls_params)
+        last_source_names[scraper] = source_name
+        if failed[0]:
+            polling.record_failure(scraper.key, scraper.cls_id)
+        else:
+            polling.record_run(scraper.key, scraper.cls_id, source_name, new_pub_times)
     return source_name
 
 async def _process_one_kind_of_class(scrapers: tuple[ScraperNameAndParams, ...]) -> list[str]:
+    if (concurrency := config.get_concurrency(scrapers[0].cls_id)) > 1:
+        return await _process_concurrently(scrapers, concurrency)
     res = []
     # 如果有一个发送异常，剩下的多半也会，因此不继续进行
     for scraper in scrapers:
-        source_name = await process_one_instance(scraper)
+        try:
+            source_name = await process_one_instance(scraper)
+        except CrawlBreakError:
+            continue  # 熔断的实例跳过即可，不算错误
         if source_name:
             res.append(source_name)
             await asyncio.sleep(scraper.interval)
     return res
 
+async def _process_concurrently(scrapers: tuple[ScraperNameAndParams, ...], concurrency: int) -> list[str]:
+    """concurrency 个协程从同一个队列中取实例运行，对同一网站的请求仍由 host_slot 限制。
+    这种类的实例通常分布在不同网站，一个实例出错不影响其他的"""
+    res = []
+    pending = iter(scrapers)
+
+    async def worker():
+        for scraper in pending:
+            try:
+                source_name = await process_one_instance(scraper)
+            except CrawlBreakError:
+                continue
+            except CrawlError as e:
+                logger.warning("skip %s: %s", scraper.key, e)
+                continue
+            if source_name:
+                res.append(source_name)
+                await asyncio.sleep(scraper.interval)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(scrapers)))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return res
+
 
 async def start_to_crawl(clses: Iterable[tuple[ScraperNameAndParams, ...]]) -> list[list[str]]:
     """根据类名获得相应的类，和它们的初始化参数，组装协程然后放入事件循环"""
@@ -0,0 +1,59 @@
+"""单独运行的抓取进程，负责定时抓取，网页进程通过数据库中的更新记录刷新缓存
+
+配置 crawl_mode: daemon 后，网页服务不再定时抓取，需要另外运行
+.env/bin/python -m src.crawl.daemon
+"""
+import asyncio
+import logging
+import signal
+
+from config_handle import config
+from data_handle import data
+from src.run_as_scheduled import run_continuously
+from src.scraper import AsyncBrowserManager
+from src.scraper.http_client import close_clients
+from src.scraper.tools import shutdown_offload_pool
+from src.utils.loop_monitor import start_monitor, stop_monitors
+
+logger = logging.getLogger("daemon")
+
+
+async def watch_rss_changes():
+    """网页进程中运行，定期读取更新记录，只重新加载有更新的源"""
+    last_id = data.db_intf.get_last_rss_change_id()
+    while True:
+        await asyncio.sleep(config.change_poll_interval)
+        try:
+            changes = data.db_intf.get_rss_changes(last_id)
+        except Exception:
+            logger.exception("fail to read rss changes")
+            continue
+        for change_id, source_name in changes:
+            data.rss_cache.reload_rss(source_name, data.db_intf)
+            logger.debug("%s reloads", source_name)
+            last_id = change_id
+
+
+async def run_daemon():
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    monitor = start_monitor(loop)
+    stop_run_continuously = run_continuously(loop)
+    logger.info("crawl daemon starts")
+    await stop.wait()
+    stop_run_continuously.set()
+    stop_monitors([monitor])
+    await AsyncBrowserManager.delayed_clean("daemon", 0)
+    await close_clients()
+    shutdown_offload_pool()
+    if config.s2r_c:
+        await config.s2r_c.aclose()
+    logger.info("crawl daemon stops")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_daemon())
+    # .env/bin/python -m src.crawl.daemon
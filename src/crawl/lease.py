@@ -0,0 +1,74 @@
+"""跨进程的租约，多个 worker 共用一个数据库时，保证同一个抓取器实例、定时任务只在一个进程中运行
+
+租约记录在数据库中，有过期时间，持有者定期续期（心跳）。进程异常退出后，租约过期即可被其他进程取得。
+"""
+import asyncio
+import logging
+import os
+import socket
+from uuid import uuid4
+
+from config_handle import config
+from data_handle import data
+
+logger = logging.getLogger("lease")
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"   # 当前进程的唯一标识
+SCHEDULER_LEASE = "scheduler"
+
+heartbeats: dict[str, asyncio.Task] = {}
+
+
+def _owner_is_dead(owner: str) -> bool:
+    """同一台机器上，持有者进程已经退出，租约不必等到过期"""
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname() or owner == OWNER:
+        return False
+    if int(pid) == os.getpid():
+        return True   # 之前的同一个 pid 的进程，比如容器重启
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+def acquire(name: str, ttl: int | None = None) -> bool:
+    """取得或续期租约"""
+    ttl = ttl or config.lease_ttl
+    if data.db_intf.acquire_lease(name, OWNER, ttl):
+        return True
+    owner = data.db_intf.get_lease_owner(name)
+    if owner is None or not _owner_is_dead(owner):
+        return False
+    data.db_intf.release_lease(name, owner)
+    return data.db_intf.acquire_lease(name, OWNER, ttl)
+
+def held_by_other(name: str) -> bool:
+    owner = data.db_intf.get_lease_owner(name)
+    return owner is not None and owner != OWNER and not _owner_is_dead(owner)
+
+def release(name: str) -> None:
+    data.db_intf.release_lease(name, OWNER)
+
+
+async def _heartbeat(name: str) -> None:
+    while True:
+        await asyncio.sleep(config.lease_ttl / 3)
+        if not acquire(name):
+            logger.warning("lost lease %s", name)
+            return
+
+async def acquire_with_heartbeat(name: str) -> bool:
+    """取得租约，并在释放之前一直续期，用于运行时间不确定的抓取器实例"""
+    if not acquire(name):
+        return False
+    if name not in heartbeats:
+        heartbeats[name] = asyncio.create_task(_heartbeat(name))
+    return True
+
+def release_with_heartbeat(name: str) -> None:
+    if task := heartbeats.pop(name, None):
+        task.cancel()
+    release(name)
@@ -1,46 +1,79 @@
 import asyncio
 import logging
+from collections import Counter
+from datetime import datetime
 
 from config_handle import config
-from src.scraper import LocateInfo, Sequence, WebsiteScraper
+from src.scraper import LocateInfo, Sequence, WebsiteScraper, http_cache
 from src.scraper.scraper_error import FailtoGet
+from src.scraper.tools import parse_offloaded
+from src.utils.metrics import articles_total, crawl_phase_seconds
 
+from . import crawl_loop
 from .generate_rss import generate_rss
 
 logger = logging.getLogger("local_publish")
 
+timeout_counts: Counter[str] = Counter()  # 每个抓取器类运行超时的次数
 
-async def save_articles(data, source_name, article_source, store_a_new_one: list[bool], max_rss_item: int):
+
+async def save_articles(data, source_name, article_source, store_a_new_one: list[bool], max_rss_item: int,
+                        new_pub_times: list[datetime] | None = None,
+                        max_wait_time: float | None = None, article_timeout: float | None = None, cls_name: str = "") -> bool:
     """
-    有更新则标记为真
+    有更新则标记为真，如果传入 new_pub_times ，还会把新文章的发布时间追加进去
     1. 有几篇新文章返回，无异常，应该返回有更新
     2. 有几篇新文章返回，有异常，应该返回有更新
     3. 没文章返回，无异常，应该返回没有更新
     4. 第一篇文章返回时发生异常，应该返回没有更新
+    整个过程不超过 max_wait_time ，每篇文章不超过 article_timeout ，超时则取消抓取器并返回真，已保存的文章保留
+    网络出错时引发 FailtoGet ，已保存的文章同样保留，store_a_new_one 也已标记
     """
     store_a_new_one[0] = False
+    timed_out = False
     try:
-        async for a in article_source:  # TODO 限制单个文章的超时时间
-            # 每篇文章整合成一个文档，存入相应集合
-            data.db_intf.store2database(source_name, a)
-            store_a_new_one[0] = True
-            max_rss_item -= 1
-            logger.debug("%s have new article: %s", source_name, a['title'])
-            if max_rss_item <= 0:
-                break
-    except asyncio.TimeoutError:
+        async with asyncio.timeout(max_wait_time):
+            while True:
+                try:
+                    with crawl_phase_seconds.time(cls_name, source_name, "parse"):
+                        a = await asyncio.wait_for(anext(article_source), article_timeout)
+                except StopAsyncIteration:
+                    break
+                # 每篇文章整合成一个文档，存入相应集合
+                with crawl_phase_seconds.time(cls_name, source_name, "store2database"):
+                    data.db_intf.store2database(source_name, a)
+                articles_total.inc(cls_name, source_name)
+                store_a_new_one[0] = True
+                if new_pub_times is not None:
+                    new_pub_times.append(a["pub_time"])
+                max_rss_item -= 1
+                logger.debug("%s have new article: %s", source_name, a['title'])
+                if max_rss_item <= 0:
+                    break
+    except TimeoutError:
+        timed_out = True
         logger.info("Processing %s articles took too long.", source_name)
     except FailtoGet:
         logger.info("FailtoGet: Processing %s 网络出错", source_name)
+        raise
+    finally:
+        await article_source.aclose()
+    return timed_out
 
-async def goto_uniform_flow(data, instance: WebsiteScraper, amount: int) -> str:
-    """让抓取器运行一次，把数据保存和转换"""
-    source_info, _max_wait_time = instance.source_info, instance.max_wait_time
+async def goto_uniform_flow(data, instance: WebsiteScraper, amount: int, new_pub_times: list[datetime] | None = None,
+                            failed: list[bool] | None = None) -> str:
+    """让抓取器运行一次，把数据保存和转换，新文章的发布时间会追加到 new_pub_times 。
+    中途网络出错时，如果传入 failed 且已经保存了新文章，照常返回并把 failed[0] 标记为真，否则引发 FailtoGet"""
+    cls_name = instance.__class__.__name__
+    source_info = instance.source_info
+    # 各抓取器声明的时间大多没有算上打开网页的时间，不能短于配置的下限
+    max_wait_time = max(instance.max_wait_time, config.get_min_wait_time(cls_name))
     source_name, key4sort = source_info["table_name"], source_info["key4sort"]
-    max_rss_item = config.get_max_rss_items(instance.__class__.__name__)
+    max_rss_item = config.get_max_rss_items(cls_name)
     # 确保 source 的元信息在数据库中
     data.db_intf.exist_source_meta(source_info)
-    result = data.db_intf.get_top_n_articles_by_key(source_name, 1, key4sort)
+    with crawl_phase_seconds.time(cls_name, source_name, "get_top_n_articles_by_key"):
+        result = data.db_intf.get_top_n_articles_by_key(source_name, 1, key4sort)
     if result:
         flags: LocateInfo = {"article_title": result[0]["title"], key4sort: result[0][key4sort]} # type: ignore
         sequence = Sequence.PREFER_OLD2NEW
@@ -49,19 +82,42 @@ async def goto_uniform_flow(data, instance: WebsiteScraper, amount: int) -> str:
         sequence = Sequence.PREFER_NEW2OLD
 
     got_new = [False]
-    await save_articles(data, source_name, instance.get(flags, sequence), got_new, max_rss_item)
+    failure: FailtoGet | None = None
+    try:
+        timed_out = await save_articles(data, source_name, instance.get(flags, sequence), got_new, max_rss_item,
+                                        new_pub_times, max_wait_time, config.get_article_timeout(cls_name), cls_name)
+    except FailtoGet as e:
+        # 已保存的文章依然生成 RSS ，之后再告诉调用者这次失败了
+        failure, timed_out = e, False
+    if timed_out:
+        timeout_counts[cls_name] += 1
 
     if got_new[0] or data.rss_cache.rss_is_absent(source_name):
         # 当有新内容或文件缺失的情况下，会生成 RSS 并保存
-        result = data.db_intf.get_top_n_articles_by_key(source_name, max_rss_item, key4sort)
-        rss_feed = generate_rss(source_info, result)
+        with crawl_phase_seconds.time(cls_name, source_name, "get_top_n_articles_by_key"):
+            result = data.db_intf.get_top_n_articles_by_key(source_name, max_rss_item, key4sort)
+        with crawl_phase_seconds.time(cls_name, source_name, "generate_rss"):
+            rss_feed = await parse_offloaded(generate_rss, source_info, result)
         rss_json = {"source_info": source_info, "articles": result}
         for a in result:
             a["pub_time"] = str(a["pub_time"])
             a["time4sort"] = str(a["time4sort"])  # TODO
-        data.rss_cache.set_rss(source_name, rss_feed, rss_json, source_info["access"])
+        # 在抓取线程中运行时，内存中的缓存交给网页的线程更新
+        with crawl_phase_seconds.time(cls_name, source_name, "set_rss"):
+            data.rss_cache.save_rss_file(source_name, rss_feed)
+            crawl_loop.call_in_web_loop(data.rss_cache.cache_rss, source_name, rss_feed, rss_json, source_info["access"])
+        if config.crawl_mode == "daemon":
+            data.db_intf.add_rss_change(source_name)
         logger.info("%s updates", source_name)
     else:
         logger.debug("%s exists and doesn't update", source_name)
 
+    if failure is not None:
+        if failed is None or not got_new[0]:
+            raise failure
+        failed[0] = True
+        return source_name
+    if not timed_out:
+        # 文章都已保存，之后的条件请求才能以这次的响应为准
+        http_cache.commit_pending()
     return source_name
@@ -0,0 +1,112 @@
+"""根据每个源的更新历史，自适应调整抓取频率
+
+每次抓取后记录新文章的发布时间，用指数加权平均估计新文章之间的间隔，
+下次抓取安排在间隔的一半之后；没有新文章则逐步退避。间隔始终在配置的最短和最长之间。
+抓取失败时间隔翻倍，避免一直失败的源在每次检查时都被重新抓取；还没有成功过的源不记录。
+"""
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from config_handle import config
+from data_handle import data
+from src.data import PollingDict
+
+logger = logging.getLogger("polling")
+
+UTC = ZoneInfo("UTC")
+EWMA_ALPHA = 0.3   # 新观测到的间隔所占的权重
+BACKOFF = 1.5      # 没有新文章时，间隔扩大的倍数
+FAILURE_BACKOFF = 2   # 抓取失败时，间隔扩大的倍数
+
+
+def utc_now() -> datetime:
+    """数据库中的时间都是不带时区的 UTC 时间"""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def to_naive_utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo is None else dt.astimezone(UTC).replace(tzinfo=None)
+
+
+def new_polling(scraper_key: str, table_name: str, now: datetime, poll_interval: float) -> PollingDict:
+    return {
+        "scraper_key": scraper_key,
+        "table_name": table_name,
+        "mean_interval": None,
+        "poll_interval": poll_interval,
+        "last_pub_time": None,
+        "last_crawl_time": now,
+        "next_due": now,
+        "new_count": 0,
+    }
+
+
+def update_polling(info: PollingDict | None, scraper_key: str, table_name: str, new_pub_times: Iterable[datetime],
+                   now: datetime, bounds: tuple[int, int]) -> PollingDict:
+    """根据本次抓取到的新文章的发布时间，返回更新后的记录"""
+    min_, max_ = bounds
+    info = new_polling(scraper_key, table_name, now, min_) if info is None else info.copy()
+    info["table_name"] = table_name
+
+    pub_times = sorted(to_naive_utc(t) for t in new_pub_times)
+    mean, prev = info["mean_interval"], info["last_pub_time"]
+    for t in pub_times:
+        if prev is not None and t > prev:
+            gap = (t - prev).total_seconds()
+            mean = gap if mean is None else EWMA_ALPHA * gap + (1 - EWMA_ALPHA) * mean
+        prev = t if prev is None else max(prev, t)
+
+    # 有新文章时，按照新文章间隔的一半去抓取，保证新文章出现后能及时获取；否则退避
+    poll = info["poll_interval"] * BACKOFF
+    if pub_times:
+        poll = mean / 2 if mean else info["poll_interval"] / BACKOFF
+    poll = min(max(poll, min_), max_)
+
+    info["mean_interval"] = mean
+    info["poll_interval"] = poll
+    info["last_pub_time"] = prev
+    info["last_crawl_time"] = now
+    info["next_due"] = now + timedelta(seconds=poll)
+    info["new_count"] += len(pub_times)
+    return info
+
+
+def update_polling_failure(info: PollingDict, now: datetime, bounds: tuple[int, int]) -> PollingDict:
+    """抓取失败后，不改变对更新间隔的估计，只推迟下次抓取"""
+    min_, max_ = bounds
+    info = info.copy()
+    poll = min(max(info["poll_interval"] * FAILURE_BACKOFF, min_), max_)
+    info["poll_interval"] = poll
+    info["last_crawl_time"] = now
+    info["next_due"] = now + timedelta(seconds=poll)
+    return info
+
+
+def record_run(scraper_key: str, cls_name: str, table_name: str, new_pub_times: list[datetime]) -> None:
+    """抓取完成后调用，只有启用自适应抓取的类才记录"""
+    if not config.is_adaptive_polling(cls_name):
+        return
+    info = data.db_intf.get_polling_info(scraper_key)
+    info = update_polling(info, scraper_key, table_name, new_pub_times, utc_now(), config.get_poll_bounds(cls_name))
+    data.db_intf.set_polling_info(info)
+    logger.debug("%s will be crawled after %d seconds", table_name, info["poll_interval"])
+
+
+def record_failure(scraper_key: str, cls_name: str) -> None:
+    """抓取失败后调用，只有启用自适应抓取的类才记录。
+    还没有成功过的，不知道源的表名，不记录，由熔断器避免反复失败"""
+    if not config.is_adaptive_polling(cls_name):
+        return
+    info = data.db_intf.get_polling_info(scraper_key)
+    if info is None:
+        return
+    info = update_polling_failure(info, utc_now(), config.get_poll_bounds(cls_name))
+    data.db_intf.set_polling_info(info)
+    logger.debug("%s failed, will be crawled after %d seconds", info["table_name"], info["poll_interval"])
+
+
+def not_due_keys(now: datetime | None = None) -> set[str]:
+    """还没到下次抓取时间的实例，一次查询得到；从未抓取过的不在其中，视为到期"""
+    return data.db_intf.get_not_due_keys(now or utc_now())
@@ -1,5 +1,5 @@
 
-from .db_intf import DatabaseIntf
+from .db_intf import DatabaseIntf, LeaseDict, PollingDict
 from .sqlite_intf import SQliteConnInfo, SQliteIntf
 
-__all__ = ["DatabaseIntf", "SQliteIntf", "SQliteConnInfo"]
+__all__ = ["DatabaseIntf", "LeaseDict", "PollingDict", "SQliteIntf", "SQliteConnInfo"]
@@ -1,9 +1,29 @@
 import logging
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import TypedDict
 
 from src.scraper.scraper import ArticleDict, SrcMetaDict
 
 
+class PollingDict(TypedDict):
+    scraper_key: str
+    table_name: str
+    mean_interval: float | None
+    poll_interval: float
+    last_pub_time: datetime | None
+    last_crawl_time: datetime
+    next_due: datetime
+    new_count: int
+
+
+class LeaseDict(TypedDict):
+    name: str
+    owner: str
+    expires_at: datetime
+    heartbeat_at: datetime
+
+
 class DatabaseIntf(ABC):
     # 公开接口
     @classmethod
@@ -31,6 +51,61 @@ class DatabaseIntf(ABC):
         """根据 key 排序，默认按照从新到旧，从大到小，返回最前面的若干条"""
         raise NotImplementedError
 
+    @abstractmethod
+    def get_polling_info(self, scraper_key: str) -> PollingDict | None:
+        """返回抓取器实例的更新历史"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_polling_info(self, info: PollingDict):
+        """保存抓取器实例的更新历史，不存在则添加"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_not_due_keys(self, now: datetime) -> set[str]:
+        """返回下次抓取时间晚于 now 的抓取器实例，没有记录的视为到期，不在其中"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_polling_info(self) -> list[PollingDict]:
+        """返回所有抓取器实例的更新历史，按下次抓取时间排序"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def acquire_lease(self, name: str, owner: str, ttl: int) -> bool:
+        """租约不存在、已过期或本来就属于 owner 时，取得或续期，返回是否成功"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release_lease(self, name: str, owner: str):
+        """释放属于 owner 的租约"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_lease_owner(self, name: str) -> str | None:
+        """返回未过期租约的持有者"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_leases(self) -> list[LeaseDict]:
+        """返回所有未过期的租约"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_rss_change(self, table_name: str):
+        """记录一次源的更新，供其他进程刷新缓存，顺便清理过旧的记录"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_rss_changes(self, after_id: int) -> list[tuple[int, str]]:
+        """返回编号大于 after_id 的更新记录，包含编号和表名，按编号排序"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_last_rss_change_id(self) -> int:
+        """返回最新的更新记录的编号，没有记录则返回 0"""
+        raise NotImplementedError
+
     @abstractmethod
     def _clear_db(self):
         """清空数据库"""
@@ -1,6 +1,7 @@
 from sqlalchemy import (
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Integer,
     String,
@@ -10,6 +11,8 @@ from sqlalchemy.orm import declarative_base, declared_attr
 from config_handle import config
 from src.scraper import ArticleDict, SrcMetaDict
 
+from .db_intf import LeaseDict, PollingDict
+
 Base = declarative_base()
 
 class SourceMeta4ORM(Base):
@@ -47,6 +50,47 @@ class SourceMeta4ORM(Base):
         return source_info # type: ignore
 
 
+class SourcePolling4ORM(Base):
+    """每个抓取器实例的更新历史，用于自适应调整抓取频率"""
+    __tablename__ = "source_polling"
+
+    id = Column(Integer, primary_key=True)
+    scraper_key = Column(String, unique=True, nullable=False, index=True)
+    table_name = Column(String, nullable=False)
+    mean_interval = Column(Float)   # 新文章之间的平均间隔，秒，指数加权
+    poll_interval = Column(Float, nullable=False)   # 当前使用的抓取间隔，秒
+    last_pub_time = Column(DateTime)
+    last_crawl_time = Column(DateTime, nullable=False)
+    next_due = Column(DateTime, nullable=False, index=True)
+    new_count = Column(Integer, default=0)
+
+    def export_to_dict(self) -> PollingDict:
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns if not column.primary_key} # type: ignore
+
+
+class CrawlLease4ORM(Base):
+    """跨进程的租约，用于多个 worker 之间互斥地运行抓取器和定时任务"""
+    __tablename__ = "crawl_lease"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False, index=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)
+
+    def export_to_dict(self) -> LeaseDict:
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns if not column.primary_key} # type: ignore
+
+
+class RSSChange4ORM(Base):
+    """源的更新记录，抓取进程写入，网页进程据此刷新缓存"""
+    __tablename__ = "rss_change"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False)
+    changed_at = Column(DateTime, nullable=False, index=True)
+
+
 article_models: dict[str, type] = {}
 
 class ArticleBase:
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import Self
+from zoneinfo import ZoneInfo
 
 from sqlalchemy import (
     MetaData,
@@ -8,13 +10,14 @@ from sqlalchemy import (
     desc,
     inspect,
 )
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import text
 
 from src.scraper import ArticleDict, SrcMetaDict
 
-from .db_intf import DatabaseIntf
-from .orm_model import ArticleBase, Base, SourceMeta4ORM
+from .db_intf import DatabaseIntf, LeaseDict, PollingDict
+from .orm_model import ArticleBase, Base, CrawlLease4ORM, RSSChange4ORM, SourceMeta4ORM, SourcePolling4ORM
 
 
 @dataclass
@@ -78,6 +81,78 @@ class SQliteIntf(DatabaseIntf):
                 return []
             return [res.export_to_dict() for res in results]
 
+    def get_polling_info(self, scraper_key: str) -> PollingDict | None:
+        with self.Session() as session:
+            res = session.query(SourcePolling4ORM).filter_by(scraper_key=scraper_key).first()
+            return res.export_to_dict() if res else None
+
+    def set_polling_info(self, info: PollingDict):
+        with self.Session() as session:
+            res = session.query(SourcePolling4ORM).filter_by(scraper_key=info["scraper_key"]).first()
+            if res is None:
+                session.add(SourcePolling4ORM(**info))
+            else:
+                for key, value in info.items():
+                    setattr(res, key, value)
+            session.commit()
+
+    def get_not_due_keys(self, now: datetime) -> set[str]:
+        with self.Session() as session:
+            results = session.query(SourcePolling4ORM.scraper_key).filter(SourcePolling4ORM.next_due > now).all()
+            return {res.scraper_key for res in results}
+
+    def get_all_polling_info(self) -> list[PollingDict]:
+        with self.Session() as session:
+            results = session.query(SourcePolling4ORM).order_by(asc(SourcePolling4ORM.next_due)).all()
+            return [res.export_to_dict() for res in results]
+
+    def acquire_lease(self, name: str, owner: str, ttl: int) -> bool:
+        now = self._utc_now()
+        lease = CrawlLease4ORM.__table__
+        # 一条语句完成判断和写入，由 SQLite 的写锁保证多个进程之间的原子性
+        stmt = insert(lease).values(name=name, owner=owner, expires_at=now + timedelta(seconds=ttl), heartbeat_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[lease.c.name],
+            set_={"owner": stmt.excluded.owner, "expires_at": stmt.excluded.expires_at, "heartbeat_at": stmt.excluded.heartbeat_at},
+            where=(lease.c.owner == owner) | (lease.c.expires_at < now),
+        )
+        with self.Session() as session:
+            res = session.execute(stmt)
+            session.commit()
+            return res.rowcount > 0
+
+    def release_lease(self, name: str, owner: str):
+        with self.Session() as session:
+            session.query(CrawlLease4ORM).filter_by(name=name, owner=owner).delete()
+            session.commit()
+
+    def get_lease_owner(self, name: str) -> str | None:
+        with self.Session() as session:
+            res = session.query(CrawlLease4ORM).filter(CrawlLease4ORM.name == name, CrawlLease4ORM.expires_at >= self._utc_now()).first()
+            return res.owner if res else None
+
+    def get_all_leases(self) -> list[LeaseDict]:
+        with self.Session() as session:
+            results = session.query(CrawlLease4ORM).filter(CrawlLease4ORM.expires_at >= self._utc_now()).order_by(asc(CrawlLease4ORM.name)).all()
+            return [res.export_to_dict() for res in results]
+
+    def add_rss_change(self, table_name: str):
+        now = self._utc_now()
+        with self.Session() as session:
+            session.add(RSSChange4ORM(table_name=table_name, changed_at=now))
+            session.query(RSSChange4ORM).filter(RSSChange4ORM.changed_at < now - timedelta(days=1)).delete()
+            session.commit()
+
+    def get_rss_changes(self, after_id: int) -> list[tuple[int, str]]:
+        with self.Session() as session:
+            results = session.query(RSSChange4ORM).filter(RSSChange4ORM.id > after_id).order_by(asc(RSSChange4ORM.id)).all()
+            return [(res.id, res.table_name) for res in results]
+
+    def get_last_rss_change_id(self) -> int:
+        with self.Session() as session:
+            res = session.query(RSSChange4ORM).order_by(desc(RSSChange4ORM.id)).first()
+            return res.id if res else 0
+
     def _clear_db(self):
         metadata = MetaData()
         # 反射数据库结构
@@ -95,6 +170,10 @@ class SQliteIntf(DatabaseIntf):
         super().__init__(engine)
         self.Session = Session
 
+    @staticmethod
+    def _utc_now() -> datetime:
+        return datetime.now(ZoneInfo("UTC")).replace(tzinfo=None)
+
     def _check_table_exists(self, table_name: str) -> bool:
         """检查 SQLite 数据库中是否存在指定名称的表"""
         inspector = inspect(self.engine)
@@ -9,15 +9,25 @@ import schedule
 
 from data_handle import Plugins
 from config_handle import config
-from src.crawl import ScraperNameAndParams, start_to_crawl
+from src.crawl import ScraperNameAndParams, lease, start_to_crawl
 from src.crawl.crawl_error import CrawlError
+from src.crawl.polling import not_due_keys
 
 logger = logging.getLogger(__name__)
 
+is_leader = threading.Event()   # 多个 worker 时，只有持有调度租约的运行定时任务，其他的只提供读取
+
+def sync_wrapper(cls_names, loop, only_due: bool=False):
+    """only_due 为真时，只运行到了下次抓取时间的实例，用于自适应抓取"""
+    if not is_leader.is_set():
+        return
+    # 实例很多时，逐个查询下次抓取时间太慢，每次检查只查询一次
+    waiting = not_due_keys() if only_due else set()
+    def create(name):
+        return tuple(s for s in ScraperNameAndParams.create(name) if s.key not in waiting)
 
-def sync_wrapper(cls_names, loop):
     try:
-        future = run_coroutine_threadsafe(start_to_crawl(ScraperNameAndParams.create(name) for name in cls_names), loop)
+        future = run_coroutine_threadsafe(start_to_crawl(create(name) for name in cls_names), loop)
         future.result()
     except CrawlError as e:
         # 已知的错误就忽略
@@ -33,6 +43,18 @@ def sync_wrapper(cls_names, loop):
 job = sync_wrapper
 
 
+def keep_leader(stop: threading.Event):
+    """定期取得或续期调度租约，直到 stop 被设置"""
+    while not stop.is_set():
+        if lease.acquire(lease.SCHEDULER_LEASE):
+            if not is_leader.is_set():
+                logger.info("become the scheduler leader: %s", lease.OWNER)
+            is_leader.set()
+        else:
+            is_leader.clear()
+        stop.wait(config.lease_ttl / 3)
+
+
 # https://schedule.readthedocs.io/en/stable/background-execution.html
 def run_continuously(loop: asyncio.AbstractEventLoop):
     """Continuously run, while executing pending jobs at each
@@ -45,14 +67,27 @@ def run_continuously(loop: asyncio.AbstractEventLoop):
     class ScheduleThread(threading.Thread):
         @classmethod
         def run(cls):
-            crawl_schedules = config.get_schedule_and_cls_names(Plugins.get_all_id())
+            cls_names = list(Plugins.get_all_id())
+            adaptive_cls_names = [name for name in cls_names if config.is_adaptive_polling(name)]
+            crawl_schedules = config.get_schedule_and_cls_names(name for name in cls_names if name not in adaptive_cls_names)
+            for point, names in crawl_schedules.items():
+                schedule.every().day.at(point, config.timezone).do(job, names, loop)
+            # 自适应抓取的类，由各实例的下次抓取时间决定，这里只是定期检查
+            if adaptive_cls_names:
+                schedule.every(config.WAIT).seconds.do(job, adaptive_cls_names, loop, True)
+                crawl_schedules["自适应"] = adaptive_cls_names
             config.set_crawl_schedules(crawl_schedules)
-            for point, cls_names in crawl_schedules.items():
-                schedule.every().day.at(point, config.timezone).do(job, cls_names, loop)
 
+            # 定时任务在 run_pending 中等待抓取完成，可能远长于租约的有效期，因此在另一个线程中续期
+            heartbeat = threading.Thread(target=keep_leader, args=(cease_continuous_run,), daemon=True)
+            heartbeat.start()
             while not cease_continuous_run.is_set():
                 schedule.run_pending()
                 time.sleep(config.WAIT)
+            heartbeat.join()
+            if is_leader.is_set():
+                lease.release(lease.SCHEDULER_LEASE)
+                is_leader.clear()
 
     continuous_thread = ScheduleThread()
     continuous_thread.start()
@@ -11,9 +11,9 @@ from .model import (
     SrcMetaDict,
 )
 from .scraper import WebsiteScraper
-from .tools import AsyncBrowserManager
+from .tools import AsyncBrowserManager, ReadyCondition
 
 __all__ = [
     "SourceMeta", "ArticleInfo", "PublishMethod", "SrcMetaDict", "ArticleDict", "WebsiteScraper",
-    "LocateInfo", "Sequence", "SortKey", "AccessLevel", "AsyncBrowserManager"
+    "LocateInfo", "Sequence", "SortKey", "AccessLevel", "AsyncBrowserManager", "ReadyCondition"
 ]
@@ -0,0 +1,87 @@
+"""浏览器访问网页时拦截不需要的请求，按名称选用
+
+抓取器用类属性 block_profile 声明，调用 get_html_or_none 或创建 AsyncBrowserManager 时传入。
+拦截的请求没有下载，按拦截方案和资源类型统计拦截的请求数。
+"""
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+# 常见的统计和广告域名
+_TRACKERS = re.compile(
+    r"(^|\.)(google-analytics\.com|googletagmanager\.com|googlesyndication\.com|doubleclick\.net|"
+    r"hm\.baidu\.com|cnzz\.com|umeng\.com|hotjar\.com|clarity\.ms|facebook\.net|adservice\.google\.com)$"
+)
+_MEDIA = frozenset(("image", "media", "font"))
+
+
+@dataclass(frozen=True)
+class BlockProfile:
+    name: str
+    resource_types: frozenset[str] = frozenset()
+    block_trackers: bool = False
+    block_third_party: bool = False   # 只允许和页面同一个站点的请求
+
+    def blocks(self, resource_type: str, url: str, page_url: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        host = urlsplit(url).hostname or ""
+        if self.block_trackers and _TRACKERS.search(host):
+            return True
+        return self.block_third_party and bool(page_url) and _site_of(host) != _site_of(urlsplit(page_url).hostname or "")
+
+
+def _site_of(host: str) -> str:
+    """粗略地取主域名，如 www.bilibili.com 和 api.bilibili.com 都是 bilibili.com"""
+    return ".".join(host.rsplit(".", 2)[-2:])
+
+
+PROFILES = {p.name: p for p in (
+    BlockProfile("no_media", _MEDIA),
+    BlockProfile("text_only", _MEDIA | {"stylesheet"}, block_trackers=True),
+    BlockProfile("no_third_party", block_trackers=True, block_third_party=True),
+)}
+
+
+@dataclass
+class BlockStats:
+    name: str
+    requests: int = 0
+    by_type: dict[str, int] = field(default_factory=dict)
+
+
+stats: dict[str, BlockStats] = {}
+
+
+def get_profile(name: str) -> BlockProfile:
+    if name not in PROFILES:
+        raise ValueError(f"unknown block profile '{name}', choose from {list(PROFILES)}")
+    return PROFILES[name]
+
+
+def make_handler(name: str):
+    """返回给 context.route 使用的处理函数"""
+    profile = get_profile(name)
+    stat = stats.setdefault(name, BlockStats(name))
+
+    async def handler(route):
+        request = route.request
+        if request.is_navigation_request():
+            await route.continue_()
+            return
+        try:
+            page_url = request.frame.page.url
+        except Exception:  # Service Worker 发出的请求没有页面
+            page_url = ""
+        if profile.blocks(request.resource_type, request.url, page_url):
+            stat.requests += 1
+            stat.by_type[request.resource_type] = stat.by_type.get(request.resource_type, 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    return handler
+
+
+def all_stats() -> list[BlockStats]:
+    return sorted(stats.values(), key=lambda s: s.requests, reverse=True)
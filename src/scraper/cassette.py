@@ -0,0 +1,127 @@
+"""录制和回放网络请求，用于离线的端到端测试和基准测试
+
+cassette_mode 为 record 时，经过 http_client.get_client 的请求、get_html_or_none 得到的网页和 capture_json 捕获的 JSON
+保存到 cassette_dir ；
+为 replay 时，从文件中读取而不访问网络，每次等待 cassette_latency 秒模拟网络延迟，没有录制的请求视为连接失败。
+共享客户端的传输层由 CassetteTransport 包装，因此直接使用 get_client 的抓取器、robots.txt 和订阅源也都能录制。
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import httpx
+
+from config_handle import config
+
+logger = logging.getLogger("cassette")
+
+# 保存的是解码后的内容，这些头会与之不符
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def recording() -> bool:
+    return config.cassette_mode == "record"
+
+def replaying() -> bool:
+    return config.cassette_mode == "replay"
+
+
+def _path_of(kind: str, url: str, body: bytes = b"", method: str = "GET") -> Path:
+    raw = json.dumps([kind, method, url, hashlib.sha1(body).hexdigest()], ensure_ascii=False)  # noqa: S324
+    return Path(config.cassette_dir) / f"{hashlib.sha1(raw.encode()).hexdigest()}.json"  # noqa: S324
+
+def _write(path: Path, content: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+
+
+def _request_path(request: httpx.Request) -> Path:
+    """网址包括查询参数，请求体不同的 POST 分别保存；请求头不影响，条件请求也能回放"""
+    return _path_of("http", str(request.url), request.content, request.method)
+
+def save_response(request: httpx.Request, response: httpx.Response):
+    """response 要已经读取完"""
+    headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _DROPPED_HEADERS]
+    _write(_request_path(request), {
+        "method": request.method,
+        "url": str(request.url),
+        "status_code": response.status_code,
+        "headers": headers,
+        "content": base64.b64encode(response.content).decode(),
+    })
+
+async def load_response(request: httpx.Request) -> httpx.Response | None:
+    await asyncio.sleep(config.cassette_latency)
+    path = _request_path(request)
+    if not path.is_file():
+        logger.warning("no cassette for %s %s", request.method, request.url)
+        return None
+    cassette = json.loads(path.read_text(encoding="utf-8"))
+    return httpx.Response(
+        cassette["status_code"], headers=cassette["headers"], content=base64.b64decode(cassette["content"]),
+        request=request,
+    )
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """包装共享客户端的传输层，每次请求时才判断模式，因此客户端创建后改变 cassette_mode 也有效"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if replaying():
+            # 没有录制的不能访问网络，和连接失败一样处理
+            if (response := await load_response(request)) is None:
+                raise httpx.ConnectError(f"no cassette for {request.url}", request=request)
+            return response
+        response = await self.inner.handle_async_request(request)
+        if not recording():
+            return response
+        # 录制时读完整个响应，流式读取中途停止的，回放时同样可以停止
+        await response.aread()
+        save_response(request, response)
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _DROPPED_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=response.content, request=request,
+                              extensions=response.extensions)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def wrap(client: httpx.AsyncClient) -> httpx.AsyncClient:
+    """包装客户端的传输层，包括代理使用的"""
+    client._transport = CassetteTransport(client._transport)  # noqa: SLF001
+    client._mounts = {pattern: t if t is None else CassetteTransport(t) for pattern, t in client._mounts.items()}  # noqa: SLF001
+    return client
+
+
+def save_html(url: str, html: str):
+    _write(_path_of("html", url), {"url": url, "html": html})
+
+async def load_html(url: str) -> str | None:
+    await asyncio.sleep(config.cassette_latency)
+    path = _path_of("html", url)
+    if not path.is_file():
+        logger.warning("no cassette for %s", url)
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))["html"]
+
+
+def _json_path(url: str, patterns: list[str]) -> Path:
+    return _path_of("json", url, json.dumps(sorted(patterns)).encode())
+
+def save_json(url: str, patterns: list[str], captured: dict):
+    _write(_json_path(url, patterns), {"url": url, "patterns": patterns, "captured": captured})
+
+async def load_json(url: str, patterns: list[str]) -> dict:
+    """没有录制的返回空字典，和一个都没有捕获到一样"""
+    await asyncio.sleep(config.cassette_latency)
+    path = _json_path(url, patterns)
+    if not path.is_file():
+        logger.warning("no cassette for %s", url)
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["captured"]
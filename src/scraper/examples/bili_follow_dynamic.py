@@ -8,10 +8,12 @@ from urllib.parse import urlencode
 
 import httpx
 from playwright._impl._errors import TimeoutError as pw_TimeoutError
-from playwright.async_api import BrowserContext, async_playwright
+from playwright.async_api import BrowserContext
 
+from src.scraper.http_client import get_client
 from src.scraper.scraper import WebsiteScraper
 from src.scraper.scraper_error import FailtoGet
+from src.scraper.tools import AsyncBrowserManager
 from utils import environment, image_
 
 
@@ -41,8 +43,9 @@ class BiliFoDynamic(WebsiteScraper):
 
     async def get_valid_client(self, context: BrowserContext):
         # stealth.min.js is a js script to prevent the website from detecting the crawler.
-        await context.add_init_script(path=environment.get_init_script())
+        # 上下文会被复用，脚本加在这次的页面上
         page = await context.new_page()
+        await page.add_init_script(path=environment.get_init_script())
         api_client = BiliFoDynamic.create_bilibili_client(self.user_agent, await context.cookies())
 
         # 首页
@@ -78,9 +81,8 @@ class BiliFoDynamic(WebsiteScraper):
         return api_client
 
     async def article_newer_than(self, datetime_, amount=None):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(storage_state=self.state_path, viewport={"width": 1920, "height": 1080}, accept_downloads=True, user_agent=self.user_agent)
+        # 登录后的 cookie 在归还上下文时写回 state_path
+        async with AsyncBrowserManager(self.title, self.user_agent, storage_state=self.state_path) as context:
             api_client = await self.get_valid_client(context)
             self.logger.info("Successfully get a valid bilibilli client")
 
@@ -203,8 +205,7 @@ class BilibiliClient:
         self.cookie_dict = cookie_dict
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await get_client(self.proxies).request(method, url, timeout=self.timeout, **kwargs)
         data: dict = response.json()
         if data.get("code") != 0:
             raise FailtoGet
@@ -1,11 +1,7 @@
 from collections.abc import AsyncGenerator
-from contextlib import suppress
 from datetime import datetime
 from typing import Self
 
-from playwright.async_api import TimeoutError as PwTimeoutError
-
-from config_handle import config
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
 from src.scraper.scraper_error import (
@@ -19,8 +15,10 @@ class BilibiliUp(WebsiteScraper):
     readable_name = "B站UP主动态"
     home_url = "https://space.bilibili.com"
     page_turning_duration = 60
+    block_profile = "no_media"
     support_old2new = True
     table_name_formation = "bilibili_up_{}"
+    feed_api = "/x/polymer/web-dynamic/v1/feed/space"
 
     headers = {
         'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
@@ -128,40 +126,13 @@ class BilibiliUp(WebsiteScraper):
 
     @classmethod
     async def get_response_json(cls, uid, space_url) -> dict:
-        user_agent = cls.headers["User-Agent"]
-        id_ = str(uid)
-        j_res = [{}]
-        blocked = ["image", "font", "media"]
-        def block_func(route): return route.abort() if route.request.resource_type in blocked else route.continue_()
-
-        async with AsyncBrowserManager(id_, user_agent) as context:
-            await context.route("**/*", block_func)
-            page = await context.new_page()
-            AsyncBrowserManager._logger.debug("create page for %s", id_)
-            page.on("response", lambda response: cls.handle_response(response, j_res))
-            try:
-                await page.goto(space_url, timeout=60000, wait_until='networkidle')
-            except PwTimeoutError:
-                AsyncBrowserManager._logger.warning("Page navigation of %s timed out", id_)
-                raise CreateButRequestFail()
-            except Exception as e:
-                msg = f"Page navigation of {id_} Exception occured: {e}"
-                AsyncBrowserManager._logger.warning(msg)
-                await config.post2RSS("error log of BilibiliUp when get_response_json", msg)
-                raise CreateButRequestFail() from e
-            finally:
-                if not (j_res[0] and j_res[0].get("data")):
-                    html_content = await page.content()
-                    cls._logger.error("BilibiliUp does not find url, the page content is %s", html_content[-1000:])
-                await page.close()
-                AsyncBrowserManager._logger.debug("destroy page of %s", id_)
-        return j_res[0]
-
-    @classmethod
-    async def handle_response(cls, response, j_res) -> None:
-        if '/x/polymer/web-dynamic/v1/feed/space' in response.url:
-            with suppress(Exception):
-                j_res[0] = await response.json()
+        """动态页面会请求 feed_api 获取动态列表，拿到后就不必等页面加载完"""
+        captured = await AsyncBrowserManager.capture_json(
+            str(uid), space_url, cls.headers["User-Agent"], [cls.feed_api], block_profile=cls.block_profile)
+        j_res = captured.get(cls.feed_api, {})
+        if not j_res.get("data"):
+            cls._logger.error("BilibiliUp does not find %s when visiting %s", cls.feed_api, space_url)
+        return j_res
 
     @staticmethod
     def is_valid_uid(s: str) -> bool:
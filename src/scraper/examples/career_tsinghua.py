@@ -3,11 +3,12 @@ from collections.abc import AsyncGenerator
 from datetime import datetime, timedelta
 
 import httpx
-from bs4 import BeautifulSoup
 
+from src.scraper.http_client import get_client
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
 from src.scraper.scraper_error import FailtoGet
+from src.scraper.tools import parse_html
 
 
 class CareerTsinghua(WebsiteScraper):
@@ -72,7 +73,7 @@ class CareerTsinghua(WebsiteScraper):
             response = await cls._request(cls.home_url, data_raw)
             if response is None:
                 return
-            soup = BeautifulSoup(response.text, features="lxml")
+            soup = parse_html(response.text)
 
             # Find all list items under the ul with id 'todayList'
             all_articles = soup.find_all('ul', id='todayList')[0].find_all('li')
@@ -112,9 +113,8 @@ class CareerTsinghua(WebsiteScraper):
     async def _request(cls, url: str, data_raw: dict) -> httpx.Response | None:
         # 设置超时时间为60秒
         timeout = httpx.Timeout(60.0, read=60.0)
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            try:
-                response = await client.post(url=url, headers=cls.headers, data=data_raw, timeout=timeout)
-            except (httpx.ConnectTimeout, httpx.ConnectError, httpx.ReadTimeout) as e:
-                raise FailtoGet() from e
+        try:
+            response = await get_client().post(url=url, headers=cls.headers, data=data_raw, timeout=timeout)
+        except (httpx.ConnectTimeout, httpx.ConnectError, httpx.ReadTimeout) as e:
+            raise FailtoGet() from e
         return response
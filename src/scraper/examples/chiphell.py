@@ -1,16 +1,16 @@
 from collections.abc import AsyncGenerator
 from datetime import datetime, timedelta
 
-from bs4 import BeautifulSoup
-
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
-from src.scraper.tools import AsyncBrowserManager
+from src.scraper.tools import AsyncBrowserManager, ReadyCondition, parse_html, parse_offloaded
 
 
 class Chiphell(WebsiteScraper):
     home_url = "https://www.chiphell.com/"
     page_turning_duration = 10
+    block_profile = "no_media"
+    ready_condition = ReadyCondition(selector="ul#threadulid li")
 
     headers = {
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -21,6 +21,20 @@ class Chiphell(WebsiteScraper):
         'sec-ch-ua-platform': '"Windows"',
     }
 
+    @staticmethod
+    def extract(html_content: str) -> list[tuple[str, str, str, str, str]] | None:
+        """首页很大，在进程池中解析，返回最新文章的图片、标题、摘要、链接和日期，找不到时返回 None"""
+        soup = parse_html(html_content)
+        test_room = soup.find('div', class_='chip_index_pingce cl')
+        if not test_room or test_room.div.span.text.strip() != "最新文章":
+            return None
+        articles = test_room.find('div', class_='acon cl')
+        if not articles:
+            return None
+        return [(a.select_one('a.tm01 img')['src'], a.select_one('a.tm03').text.strip(), a.select_one('div.tm04').text.strip(),
+                 a.select_one('a.tm03')['href'], a.select_one('div.avimain2 span').text)
+                for a in articles.select('ul#threadulid li')]
+
     def _source_info(self):
         source_info = {
             "name": "Chiphell",
@@ -36,29 +50,17 @@ class Chiphell(WebsiteScraper):
         """给起始页码，yield 一篇一篇惰性返回，直到最后一页最后一篇"""
         start_page = 1
         cls._logger.info("Chiphell start to parse")
-        html_content = await AsyncBrowserManager.get_html_or_none("Chiphell", cls.home_url, cls.headers["User-Agent"])
+        html_content = await AsyncBrowserManager.get_html_or_none(
+            "Chiphell", cls.home_url, cls.headers["User-Agent"], block_profile=cls.block_profile, ready=cls.ready_condition)
         if html_content is None:
             return
 
-        soup = BeautifulSoup(html_content, features="lxml")
-        test_room = soup.find('div', class_='chip_index_pingce cl')
-        if not test_room:
-            return
-        if test_room.div.span.text.strip() != "最新文章":
+        items = await parse_offloaded(cls.extract, html_content)
+        if items is None:
             cls._logger.warning("Chiphell structure has changed")
             return
 
-        articles = test_room.find('div', class_='acon cl')
-        if not articles:
-            return
-        li_elements = articles.select('ul#threadulid li')
-
-        for a in li_elements:
-            image = a.select_one('a.tm01 img')['src']
-            title = a.select_one('a.tm03').text.strip()
-            summary = a.select_one('div.tm04').text.strip()
-            article_url = a.select_one('a.tm03')['href']
-            time = a.select_one('div.avimain2 span').text
+        for image, title, summary, article_url, time in items:
             time_obj = datetime.strptime(time, "%Y/%m/%d") - timedelta(minutes=start_page)
             start_page += 1
 
@@ -7,12 +7,14 @@ from bs4 import BeautifulSoup
 
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
-from src.scraper.tools import AsyncBrowserManager, create_rp
+from src.scraper.tools import AsyncBrowserManager, ReadyCondition, create_rp
 
 
 class GatesNotes(WebsiteScraper):
     home_url = "https://www.gatesnotes.com/"
     page_turning_duration = 5
+    block_profile = "no_media"
+    ready_condition = ReadyCondition(selector="h1.ArtHeadline", timeout=60)
 
     headers = {
         'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -42,9 +44,8 @@ class GatesNotes(WebsiteScraper):
             return
 
         cls._logger.info("GatesNotes start to parse")
-        blocked = ["image", "font", "media"]
-        def block_func(route): return route.abort() if route.request.resource_type in blocked else route.continue_()
-        html_content = await AsyncBrowserManager.get_html_or_none("GatesNotes", reader_url, cls.headers["User-Agent"], block_func)
+        html_content = await AsyncBrowserManager.get_html_or_none(
+            "GatesNotes", reader_url, cls.headers["User-Agent"], block_profile=cls.block_profile, ready=cls.ready_condition)
         if html_content is None:
             return
 
@@ -2,11 +2,9 @@ import asyncio
 from collections.abc import AsyncGenerator
 from datetime import datetime
 
-from bs4 import BeautifulSoup
-
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
-from src.scraper.tools import AsyncBrowserManager, get_response_or_none
+from src.scraper.tools import AsyncBrowserManager, ReadyCondition, get_response_or_none, parse_html
 
 
 # 逻辑有缺陷，目前是每次运行将热榜按照  排序，取最新的，不会缺少新写的上热榜，但是旧的上热榜会缺少
@@ -14,6 +12,8 @@ class HotJuejin(WebsiteScraper):
     home_url = "https://juejin.cn"
     admin_url = "https://api.juejin.cn/content_api/v1/content"
     page_turning_duration = 60
+    block_profile = "text_only"
+    ready_condition = ReadyCondition(selector="div.meta-box time.time")
     table_name_formation = "hot_juejin"
 
     headers = {
@@ -66,10 +66,11 @@ class HotJuejin(WebsiteScraper):
             content_id = a["content"]["content_id"]
             article_url = f"{cls.home_url}/post/{content_id}"
 
-            html_content = await AsyncBrowserManager.get_html_or_none("HotJuejin", article_url, cls.headers["User-Agent"])
+            html_content = await AsyncBrowserManager.get_html_or_none(
+                "HotJuejin", article_url, cls.headers["User-Agent"], block_profile=cls.block_profile, ready=cls.ready_condition)
             if html_content is None:
                 break
-            soup = BeautifulSoup(html_content, features="lxml")
+            soup = parse_html(html_content)
 
             meta_info = soup.find('div', class_='meta-box')
             if not meta_info:
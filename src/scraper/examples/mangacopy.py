@@ -3,17 +3,17 @@ from collections.abc import AsyncGenerator
 from datetime import datetime
 from typing import Self
 
-from bs4 import BeautifulSoup, Tag
-
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
 from src.scraper.scraper_error import CreateButRequestFail, CreateByInvalidParam
-from src.scraper.tools import AsyncBrowserManager, get_response_or_none
+from src.scraper.tools import AsyncBrowserManager, ReadyCondition, get_response_or_none, parse_html
 
 
 class MangaCopy(WebsiteScraper):
     home_url = "https://www.mangacopy.com"
     page_turning_duration = 10
+    block_profile = "no_media"
+    ready_condition = ReadyCondition(selector='[id="default全部"] a')
     table_name_formation = "mangacopy_book_{1}"
 
     headers = {
@@ -60,13 +60,14 @@ class MangaCopy(WebsiteScraper):
     @classmethod
     async def _parse(cls, flags, book_title: str, book_url: str) -> AsyncGenerator[dict, None]:  # noqa: ARG003
         cls._logger.info("拷貝漫畫 start to parse")
-        html_content = await AsyncBrowserManager.get_html_or_none(book_title, book_url, cls.headers["User-Agent"])
+        html_content = await AsyncBrowserManager.get_html_or_none(
+            book_title, book_url, cls.headers["User-Agent"], block_profile=cls.block_profile, ready=cls.ready_condition)
         if html_content is None:
             return
 
-        soup = BeautifulSoup(html_content, features="lxml")
+        soup = parse_html(html_content)
         articles = soup.find('div', id='default全部')
-        if not articles or not isinstance(articles, Tag):
+        if not articles:
             return
         articles = articles.find_all('a', style=re.compile(r'display:\s*(block|none);'))
         articles_with_num = [(num, a) for num, a in enumerate(articles, start=1)]
@@ -80,10 +81,7 @@ class MangaCopy(WebsiteScraper):
         description = soup.find('p', class_='intro')
         description = description.text if description else ""
         image_link_tag = soup.find('img')
-        if not image_link_tag or not isinstance(image_link_tag, Tag):
-            image_link = "http://example.com"
-        else:
-            image_link = image_link_tag["src"]
+        image_link = image_link_tag["src"] if image_link_tag else "http://example.com"
 
         for num, a in reversed(articles_with_num):
             title = a["title"]
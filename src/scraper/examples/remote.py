@@ -171,6 +171,11 @@ class Remote(WebsiteScraper):
     def _custom_parameter_of_parse(self) -> tuple:
         return (self.con, self.cls_id, self.params)
 
+    @property
+    def max_wait_time(self) -> int:
+        """远端的实际耗时未知，和等待远端回复的上限一致"""
+        return 600
+
     async def destroy(self) -> None:
         Remote._logger.info(f"[Remote] {self.cls_id} close websocket")
         await self.con.destroy()
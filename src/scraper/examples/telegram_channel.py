@@ -3,12 +3,11 @@ from collections.abc import AsyncGenerator
 from datetime import datetime
 from typing import Self
 
-from bs4 import BeautifulSoup
-
+from src.scraper.http_cache import is_unchanged
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
 from src.scraper.scraper_error import CreateButRequestFail, CreateByInvalidParam
-from src.scraper.tools import get_response_or_none
+from src.scraper.tools import Node, get_response_or_none, parse_html
 
 
 class TelegramChannel(WebsiteScraper):
@@ -44,14 +43,14 @@ class TelegramChannel(WebsiteScraper):
         channel_url = cls.home_url.format(channel_id=channel_id)
         header = cls.headers.copy()
         header["referer"] = channel_url
-        name, desc, soup = await cls._get_channel_info(channel_url, header)
+        name, desc, soup, unchanged = await cls._get_channel_info(channel_url, header)
         if name and desc and soup:
-            return cls(channel_id, name, desc, channel_url, header, soup)
+            return cls(channel_id, name, desc, channel_url, header, soup, unchanged)
         raise CreateButRequestFail()
 
     def __init__(self, *args) -> None:
         super().__init__()
-        self.channel_id, self.channel_name, self.channel_desc, self.channel_url, self.header, self.soup = args
+        self.channel_id, self.channel_name, self.channel_desc, self.channel_url, self.header, self.soup, self.unchanged = args
 
     def _source_info(self):
         return {
@@ -64,8 +63,11 @@ class TelegramChannel(WebsiteScraper):
         }
 
     @classmethod
-    async def _parse(cls, flags, channel_name, channel_url: str, soup: BeautifulSoup, header: dict) -> AsyncGenerator[dict, None]:  # noqa: ARG003, C901
+    async def _parse(cls, flags, channel_name, channel_url: str, soup: Node, header: dict, unchanged: bool) -> AsyncGenerator[dict, None]:  # noqa: C901
         cls._logger.info("%s start to parse", channel_name)
+        # 第一页和上次一样，且不是要求返回指定数目的文章，则没有新消息
+        if unchanged and not flags.get("amount"):
+            return
         while True:
             articles = soup.find_all('div', class_='tgme_widget_message_wrap js-widget_message_wrap')
             if not articles:
@@ -126,26 +128,26 @@ class TelegramChannel(WebsiteScraper):
             pre_msgs_link = f"{channel_url}?before={cur_msg_id}"
             response = await get_response_or_none(pre_msgs_link, header)
             if response and response.status_code == 200:
-                soup = BeautifulSoup(response.text, features="lxml")
+                soup = parse_html(response.text)
             else:
                 raise CreateButRequestFail()
 
     def _custom_parameter_of_parse(self) -> list:
-        return [self.channel_name, self.channel_url, self.soup, self.header]
+        return [self.channel_name, self.channel_url, self.soup, self.header, self.unchanged]
 
     @classmethod
-    async def _get_channel_info(cls, channel_url: str, header: dict) -> tuple[str, str, BeautifulSoup | None]:
-        response = await get_response_or_none(channel_url, header)
+    async def _get_channel_info(cls, channel_url: str, header: dict) -> tuple[str, str, Node | None, bool]:
+        response = await get_response_or_none(channel_url, header, cache=True)
         if response and response.status_code == 200:
-            soup = BeautifulSoup(response.text, features="lxml")
+            soup = parse_html(response.text)
             right_column = soup.find('section', class_='tgme_right_column')
             if right_column:
                 title_div = right_column.find('div', class_='tgme_channel_info_header_title')
                 channel_name = title_div.get_text(strip=True) if title_div else "未找到标题"
                 desc_div = right_column.find('div', class_='tgme_channel_info_description')
                 channel_desc = desc_div.get_text(strip=True) if desc_div else "未找到描述"
-                return channel_name, channel_desc, soup
-        return "", "", None
+                return channel_name, channel_desc, soup, is_unchanged(response)
+        return "", "", None, False
 
     @staticmethod
     def is_valid_channel_id(s: str) -> bool:
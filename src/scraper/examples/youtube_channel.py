@@ -1,11 +1,11 @@
 import re
 from collections.abc import AsyncGenerator
 from datetime import datetime
-from typing import Self
+from typing import ClassVar, Self
 
-import feedparser
 from bs4 import BeautifulSoup
 
+from src.scraper.feed_stream import fetch_feed
 from src.scraper.model import SortKey
 from src.scraper.scraper import WebsiteScraper
 from src.scraper.scraper_error import CreateButRequestFail, CreateByInvalidParam
@@ -22,6 +22,9 @@ class YoutubeChannel(WebsiteScraper):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0',
     }
 
+    # 频道名称和订阅源网址，进程内只请求一次，之后每次抓取只请求一次订阅源
+    channels: ClassVar[dict[str, tuple[str, str]]] = {}
+
     @classmethod
     async def create(cls, channel_id: str) -> Self:
         """
@@ -30,17 +33,18 @@ class YoutubeChannel(WebsiteScraper):
         """
         if not YoutubeChannel.is_valid_channel_id(channel_id):
             raise CreateByInvalidParam()
-        feed_url = await cls.get_feed_url(channel_id)
-        if feed_url:
-            response = await get_response_or_none(feed_url, cls.headers)
-            if response and response.status_code == 200:
-                feed = feedparser.parse(response.text)
-                return cls(channel_id, feed.feed.title, feed) # type: ignore
-        raise CreateButRequestFail()
+        if channel_id not in cls.channels:
+            feed_url = await cls.get_feed_url(channel_id)
+            # 频道名称在第一个条目之前，读到就停止
+            result = await fetch_feed(feed_url, cls.headers, limit=0) if feed_url else None
+            if result is None or not result.info.title:
+                raise CreateButRequestFail()
+            cls.channels[channel_id] = (result.info.title, feed_url)
+        return cls(channel_id, *cls.channels[channel_id])
 
-    def __init__(self, channel_id, channel_name, feed) -> None:
+    def __init__(self, channel_id, channel_name, feed_url) -> None:
         super().__init__()
-        self.channel_id, self.channel_name, self.feed = channel_id, channel_name, feed
+        self.channel_id, self.channel_name, self.feed_url = channel_id, channel_name, feed_url
 
     def _source_info(self):
         name = "Youtube Channel " + self.channel_name
@@ -54,10 +58,16 @@ class YoutubeChannel(WebsiteScraper):
         }
 
     @classmethod
-    async def _parse(cls, flags, channel_name, feed) -> AsyncGenerator[dict, None]:
+    async def _parse(cls, flags, channel_name, feed_url) -> AsyncGenerator[dict, None]:
         """给起始页码，yield 一篇一篇惰性返回，直到最后一页最后一篇"""
         cls._logger.info("%s start to parse", channel_name)
-        for entry in feed.entries:
+        # 边下载边解析，遇到已有的视频就不再下载剩下的部分；没有变化时上游返回 304
+        amount = flags.get("amount")
+        result = await fetch_feed(feed_url, cls.headers, stop_at=None if amount else flags.get("pub_time"), limit=amount,
+                                  cache=True)
+        if result is None:
+            return
+        for entry in result.entries:
             # 如果没有更新，提前返回，减少一次网络请求
             if entry.title == flags.get("article_title"):
                 return
@@ -70,19 +80,18 @@ class YoutubeChannel(WebsiteScraper):
                 "title": entry.title,
                 "summary": d + entry.summary[0:50],
                 "link": entry.link,
-                "image_link": entry.media_thumbnail[0]['url'],
+                "image_link": entry.image,
                 "content": d + entry.summary,
-                "pub_time": datetime.fromisoformat(entry.published).replace(tzinfo=None),
+                "pub_time": entry.published,
             }
             yield article
 
     def _custom_parameter_of_parse(self) -> list:
-        return [self.channel_name, self.feed]
+        return [self.channel_name, self.feed_url]
 
-    # todo 缓存
     @classmethod
     async def get_feed_url(cls, channel_id) -> str:
-        response = await get_response_or_none(f"{YoutubeChannel.home_url}/@{channel_id}", cls.headers)
+        response = await get_response_or_none(f"{YoutubeChannel.home_url}/@{channel_id}", cls.headers, cache=True)
         if response is None or response.status_code != 200:
             return ""
         soup = BeautifulSoup(response.text, features="lxml")
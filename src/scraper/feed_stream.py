@@ -0,0 +1,234 @@
+"""边下载边解析 RSS/Atom 订阅源，遇到不比已有文章新的条目就停止下载
+
+订阅源的条目通常从新到旧排列，抓取器传入数据库中最新文章的发布时间 stop_at ，之后的内容都不必下载和解析。
+开启 enable_http_cache 且传入 cache=True 时进行条件请求，只保存 ETag 和 Last-Modified ，上游返回 304 时没有新条目。
+抓取中的 ETag 等要等条目都保存后才写入，见 http_cache.deferred 。
+请求经过共享客户端，录制和回放由 cassette 在传输层完成，录制时会下载完整的内容。
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+import httpx
+from lxml import etree
+
+from config_handle import config
+from src.utils.loop_monitor import current_scraper
+
+from . import http_cache, robots
+from .http_client import get_client, host_slot
+
+logger = logging.getLogger("feed_stream")
+
+_ATOM = "http://www.w3.org/2005/Atom"
+_MEDIA = "http://search.yahoo.com/mrss/"
+_CONTENT = "http://purl.org/rss/1.0/modules/content/"
+_DC = "http://purl.org/dc/elements/1.1/"
+_RSS1 = "http://purl.org/rss/1.0/"
+_PLAIN = ("", _ATOM, _RSS1)   # 这些命名空间中的元素按 RSS 和 Atom 的含义读取
+
+
+@dataclass
+class FeedInfo:
+    title: str = ""
+    link: str = ""
+    description: str = ""
+    language: str = ""
+
+
+@dataclass
+class FeedEntry:
+    title: str = ""
+    link: str = ""
+    id: str = ""
+    summary: str = ""
+    content: str = ""
+    author: str = ""
+    image: str = ""
+    published: datetime | None = None   # 转换为 UTC 后去掉时区，和数据库中的一致
+
+
+@dataclass
+class FeedResult:
+    info: FeedInfo
+    entries: list[FeedEntry] = field(default_factory=list)
+    not_modified: bool = False   # 上游返回 304 ，没有新条目
+    stopped_early: bool = False  # 遇到已有的条目或达到数量后停止下载
+    bytes_read: int = 0
+
+
+@dataclass
+class StreamStats:
+    name: str
+    fetches: int = 0
+    not_modified: int = 0
+    stopped_early: int = 0
+    bytes_read: int = 0
+    entries: int = 0
+
+
+stats: dict[str, StreamStats] = {}
+
+
+def parse_date(text: str) -> datetime | None:
+    """RSS 使用 RFC 822 格式，Atom 使用 ISO 8601 格式"""
+    text = text.strip()
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(text)
+        except (TypeError, ValueError, IndexError):
+            return None
+    return dt.astimezone(UTC).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _split(tag) -> tuple[str, str]:
+    if not isinstance(tag, str):   # 注释等
+        return "", ""
+    if tag[0] == "{":
+        ns, _, local = tag[1:].partition("}")
+        return ns, local
+    return "", tag
+
+
+class _FeedParser:
+    """把字节逐块交给 XMLPullParser ，读完一个条目就转换为 FeedEntry 并丢弃其元素"""
+
+    def __init__(self, info: FeedInfo):
+        self.info = info
+        self.parser = etree.XMLPullParser(events=("start", "end"), resolve_entities=False, no_network=True, recover=True)
+        self.depth = 0
+        self.entry_depth = 0   # 正在读的条目的深度，为 0 时不在条目中
+        self.entry: FeedEntry | None = None
+
+    def feed(self, data: bytes) -> list[FeedEntry]:
+        self.parser.feed(data)
+        entries = []
+        for event, el in self.parser.read_events():
+            ns, local = _split(el.tag)
+            if event == "start":
+                self.depth += 1
+                if local in ("item", "entry") and ns in _PLAIN and not self.entry_depth:
+                    self.entry_depth, self.entry = self.depth, FeedEntry()
+                elif self.depth <= 2 and not self.info.language:
+                    self.info.language = el.get("{http://www.w3.org/XML/1998/namespace}lang", "")
+                continue
+            if self.entry is not None:
+                if self.depth == self.entry_depth:
+                    entries.append(self.entry)
+                    self.entry_depth, self.entry = 0, None
+                    el.clear()
+                    if (parent := el.getparent()) is not None:
+                        parent.remove(el)
+                else:
+                    self._read_entry(self.entry, ns, local, el)
+            elif self.depth <= 3:
+                self._read_info(ns, local, el)
+            self.depth -= 1
+        return entries
+
+    def _read_info(self, ns: str, local: str, el):
+        text = (el.text or "").strip()
+        if ns not in _PLAIN:
+            return
+        if local == "title" and not self.info.title:
+            self.info.title = text
+        elif local == "link" and not self.info.link:
+            self.info.link = text or (el.get("href", "") if el.get("rel", "alternate") == "alternate" else "")
+        elif local in ("description", "subtitle") and not self.info.description:
+            self.info.description = text
+        elif local == "language":
+            self.info.language = text
+
+    @staticmethod
+    def _read_entry(entry: FeedEntry, ns: str, local: str, el):  # noqa: C901
+        text = (el.text or "").strip()
+        if ns in _PLAIN:
+            if local == "title":
+                entry.title = text
+            elif local == "link":
+                if text:
+                    entry.link = text
+                elif el.get("rel", "alternate") == "alternate" and not entry.link:
+                    entry.link = el.get("href", "")
+            elif local in ("guid", "id"):
+                entry.id = text
+            elif local in ("description", "summary"):
+                entry.summary = text
+            elif local == "content":
+                entry.content = text
+            elif local in ("pubDate", "published") or (local == "updated" and entry.published is None):
+                entry.published = parse_date(text)
+            elif local == "name" or (local == "author" and text):
+                entry.author = text
+            elif local == "enclosure" and el.get("type", "").startswith("image/"):
+                entry.image = entry.image or el.get("url", "")
+        elif ns == _MEDIA:
+            if local == "description" and not entry.summary:
+                entry.summary = text
+            elif local in ("thumbnail", "content") and not entry.image:
+                entry.image = el.get("url", "")
+        elif ns == _CONTENT and local == "encoded":
+            entry.content = text
+        elif ns == _DC:
+            if local == "date" and entry.published is None:
+                entry.published = parse_date(text)
+            elif local == "creator":
+                entry.author = text
+
+
+async def _read_entries(response: httpx.Response, result: FeedResult, stop_at: datetime | None, limit: int | None,
+                        chunk_size: int):
+    parser = _FeedParser(result.info)
+    async for chunk in response.aiter_bytes(chunk_size):
+        result.bytes_read += len(chunk)
+        for entry in parser.feed(chunk):
+            if (limit is not None and len(result.entries) >= limit) or \
+                    (stop_at is not None and entry.published is not None and entry.published <= stop_at):
+                # 返回后关闭连接，剩下的内容不再下载
+                result.stopped_early = True
+                return
+            result.entries.append(entry)
+
+
+async def fetch_feed(url: str, headers: dict | None = None, stop_at: datetime | None = None, limit: int | None = None,
+                     cache: bool = False, timeout: float = 10, chunk_size: int = 16384) -> FeedResult | None:  # noqa: ASYNC109
+    """下载并解析订阅源，遇到发布时间不晚于 stop_at 的条目，或者已经得到 limit 个条目时停止，请求失败时返回 None 。
+    stop_at 为空时是第一次抓取，不进行条件请求"""
+    if config.respect_robots_txt and not await robots.check(url, headers):
+        return None
+    name = current_scraper.get() or "unknown"
+    stat = stats.setdefault(name, StreamStats(name))
+    cache = cache and http_cache.enabled()
+    validators = http_cache.load_validators(url) if cache and stop_at is not None else None
+    headers = (headers or {}) | http_cache.conditional_headers(validators)
+    result = FeedResult(FeedInfo())
+    try:
+        async with host_slot(url), get_client().stream("GET", url, headers=headers, timeout=timeout) as response:
+            stat.fetches += 1
+            if cache:
+                http_cache.record(response.status_code == 304)
+            if response.status_code == 304:
+                stat.not_modified += 1
+                result.not_modified = True
+                return result
+            if response.status_code != 200:
+                logger.warning("failed to get feed %s, status code is %d", url, response.status_code)
+                return None
+            if cache:
+                http_cache.save_validators(url, response)
+            await _read_entries(response, result, stop_at, limit, chunk_size)
+            stat.stopped_early += result.stopped_early
+    except httpx.HTTPError as e:
+        logger.warning("exception occurred when get feed %s: %s", url, e)
+        return None
+    finally:
+        stat.bytes_read += result.bytes_read
+        stat.entries += len(result.entries)
+    return result
+
+
+def all_stats() -> list[StreamStats]:
+    return sorted(stats.values(), key=lambda s: s.fetches, reverse=True)
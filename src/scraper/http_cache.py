@@ -0,0 +1,214 @@
+"""保存在磁盘上的上游响应缓存，用条件请求判断网页或订阅源有没有更新
+
+开启 enable_http_cache 后，调用 get_response_or_none 时传入 cache=True 的请求会带上上次的 ETag 和 Last-Modified ，
+上游返回 304 时用缓存的内容构造响应，返回 200 但内容的哈希和上次一样时也视为没有变化。
+抓取器可以用 is_unchanged(response) 判断，没有变化时跳过解析。
+在 deferred 中进行的请求，缓存按实例分开保存，并且等文章都保存后调用 commit_pending 才写入，
+中途失败的抓取不会留下缓存，下次仍能拿到这些内容。
+每次读取缓存会更新文件的修改时间，超过 http_cache_ttl 秒没有用到的（比如删除的源、只请求过一次的参数）定期删除，
+目录超过 http_cache_max_mb 时从最久没有用到的开始删除。
+"""
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from config_handle import config
+from src.utils.loop_monitor import current_scraper
+
+logger = logging.getLogger("http_cache")
+
+_UNCHANGED = "source2rss_unchanged"
+# 保存的是解码后的内容，这些头会与之不符
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+_VALIDATORS_ONLY = {"source2rss_validators_only": True}
+_PRUNE_INTERVAL = 3600   # 秒，两次清理缓存目录之间至少间隔这么久
+_last_prune = -math.inf
+
+
+@dataclass
+class CacheStats:
+    name: str
+    requests: int = 0
+    not_modified: int = 0   # 上游返回 304
+    same_hash: int = 0      # 上游返回 200 ，但内容没有变化
+    bytes_saved: int = 0    # 304 时没有下载的字节数
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.not_modified + self.same_hash) / self.requests if self.requests else 0
+
+
+stats: dict[str, CacheStats] = {}
+
+
+@dataclass
+class PendingWrites:
+    owner: str   # 缓存属于哪个实例，不同实例请求同一网址时互不影响
+    writes: dict[Path, dict] = field(default_factory=dict)
+
+
+_pending: ContextVar[PendingWrites | None] = ContextVar("http_cache_pending", default=None)
+
+
+@contextmanager
+def deferred(owner: str) -> Iterator[PendingWrites]:
+    """一次抓取期间的缓存暂存在内存中，子任务中的请求也包括在内"""
+    pending = PendingWrites(owner)
+    token = _pending.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending.reset(token)
+
+def commit_pending():
+    """抓取到的文章都保存后调用，不在 deferred 中时什么也不做"""
+    if (pending := _pending.get()) is None:
+        return
+    for path, entry in pending.writes.items():
+        _write(path, entry)
+    pending.writes.clear()
+
+
+def enabled() -> bool:
+    return config.enable_http_cache
+
+def is_unchanged(response: httpx.Response | None) -> bool:
+    """响应的内容是否和上次缓存的一样"""
+    return response is not None and response.extensions.get(_UNCHANGED, False)
+
+
+def _path_of(url: str, params: dict | None) -> Path:
+    key = [url, params or {}]
+    if (pending := _pending.get()) is not None:
+        key.append(pending.owner)
+    raw = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str)
+    return Path(config.http_cache_dir) / f"{hashlib.sha1(raw.encode()).hexdigest()}.json"  # noqa: S324
+
+def _write(path: Path, entry: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+    _maybe_prune()
+
+def _save(path: Path, entry: dict):
+    if (pending := _pending.get()) is not None:
+        pending.writes[path] = entry
+    else:
+        _write(path, entry)
+
+def load(url: str, params: dict | None) -> dict | None:
+    path = _path_of(url, params)
+    if (pending := _pending.get()) is not None and path in pending.writes:
+        return pending.writes[path]
+    if not path.is_file():
+        return None
+    entry = json.loads(path.read_text(encoding="utf-8"))
+    os.utime(path)   # 还在用的不会被清理
+    return entry
+
+def conditional_headers(entry: dict | None) -> dict[str, str]:
+    headers = {}
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def update(url: str, params: dict | None, entry: dict | None, response: httpx.Response) -> httpx.Response:
+    """根据上游的响应更新缓存，返回给抓取器的响应，304 时换成缓存的内容"""
+    name = current_scraper.get() or "unknown"
+    stat = stats.setdefault(name, CacheStats(name))
+    stat.requests += 1
+    if response.status_code == 304 and entry:
+        content = base64.b64decode(entry["content"])
+        stat.not_modified += 1
+        stat.bytes_saved += len(content)
+        cached = httpx.Response(200, headers=entry["headers"], content=content, request=response.request)
+        cached.extensions[_UNCHANGED] = True
+        return cached
+    if response.status_code != 200:
+        return response
+
+    body_hash = hashlib.sha256(response.content).hexdigest()
+    if entry and entry["body_hash"] == body_hash:
+        stat.same_hash += 1
+        response.extensions[_UNCHANGED] = True
+    _save(_path_of(url, params), {
+        "url": url,
+        "etag": response.headers.get("etag", ""),
+        "last_modified": response.headers.get("last-modified", ""),
+        "body_hash": body_hash,
+        "headers": [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _DROPPED_HEADERS],
+        "content": base64.b64encode(response.content).decode(),
+    })
+    return response
+
+
+def record(not_modified: bool):
+    """feed_stream 等自行请求的，只记录是否返回了 304"""
+    name = current_scraper.get() or "unknown"
+    stat = stats.setdefault(name, CacheStats(name))
+    stat.requests += 1
+    stat.not_modified += not_modified
+
+
+def load_validators(url: str) -> dict | None:
+    return load(url, _VALIDATORS_ONLY)
+
+def save_validators(url: str, response: httpx.Response):
+    """流式读取时没有完整的内容，只保存 ETag 和 Last-Modified ，和 update 保存的分开。
+    在 deferred 中同样等条目都保存后才写入，否则中途失败时下次得到 304 ，这些条目就再也拿不到了"""
+    _save(_path_of(url, _VALIDATORS_ONLY), {
+        "url": url,
+        "etag": response.headers.get("etag", ""),
+        "last_modified": response.headers.get("last-modified", ""),
+    })
+
+
+def prune(now: float | None = None) -> int:
+    """删除过期的缓存，目录仍然太大时从最久没有用到的开始删除，返回删除的文件数"""
+    cache_dir = Path(config.http_cache_dir)
+    if not cache_dir.is_dir():
+        return 0
+    now = now or time.time()
+    files = []
+    for path in cache_dir.glob("*.json"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:   # 其他进程刚删除
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    files.sort()
+    total, limit = sum(size for _, size, _ in files), config.http_cache_max_mb * 1024 * 1024
+    removed = 0
+    for mtime, size, path in files:
+        if now - mtime <= config.http_cache_ttl and total <= limit:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        logger.info("removed %d cache files from %s", removed, cache_dir)
+    return removed
+
+def _maybe_prune():
+    global _last_prune
+    if time.monotonic() - _last_prune < _PRUNE_INTERVAL:
+        return
+    _last_prune = time.monotonic()
+    prune()
+
+
+def all_stats() -> list[CacheStats]:
+    return sorted(stats.values(), key=lambda s: s.requests, reverse=True)
@@ -0,0 +1,90 @@
+"""进程内共享的 httpx 客户端，复用连接，避免每次请求都重新进行 DNS 解析、TCP 和 TLS 握手
+
+客户端的连接池不能跨事件循环使用，因此按事件循环分别创建，同一循环中按代理和是否校验证书区分。
+同一网站同时进行的请求数不超过 http_max_per_host 。安装了 h2 且开启 enable_http2 时使用 HTTP/2 。
+传输层由 cassette 包装，经过这里的请求都能录制和回放。
+"""
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+
+import httpx
+
+from config_handle import config
+
+from . import cassette
+
+logger = logging.getLogger("http_client")
+
+_ClientKey = tuple[str | None, bool]   # 代理和是否校验证书
+
+_clients: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[_ClientKey, httpx.AsyncClient]] = WeakKeyDictionary()
+_host_slots: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]] = WeakKeyDictionary()
+requests_per_host: Counter[str] = Counter()
+
+
+def _use_http2() -> bool:
+    if config.enable_http2 and find_spec("h2") is None:
+        logger.warning("enable_http2 is set but h2 is not installed, use HTTP/1.1")
+        config.enable_http2 = False
+    return config.enable_http2
+
+
+def get_client(proxy: str | None = None, verify: bool = True) -> httpx.AsyncClient:
+    """返回当前事件循环中的共享客户端，不要关闭它。proxy 为空时使用配置的 http_proxy_url"""
+    proxy = proxy or config.http_proxy_url or None
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if (client := clients.get((proxy, verify))) is None or client.is_closed:
+        limits = httpx.Limits(max_connections=config.http_max_connections,
+                              max_keepalive_connections=config.http_max_keepalive,
+                              keepalive_expiry=config.http_keepalive_expiry)
+        # 客户端由各个抓取器共用，不保存响应设置的 cookie ，需要 cookie 的在请求头中传入
+        cookies = httpx.Cookies(CookieJar(DefaultCookiePolicy(allowed_domains=())))
+        client = clients[(proxy, verify)] = cassette.wrap(httpx.AsyncClient(
+            follow_redirects=True, verify=verify, proxy=proxy, limits=limits, http2=_use_http2(), cookies=cookies
+        ))
+        logger.info("create http client, proxy is %s, verify is %s", proxy, verify)
+    return client
+
+
+@asynccontextmanager
+async def host_slot(url: str) -> AsyncIterator[None]:
+    """限制同一网站同时进行的请求数"""
+    host = urlsplit(url).netloc
+    slots = _host_slots.setdefault(asyncio.get_running_loop(), {})
+    if (slot := slots.get(host)) is None:
+        slot = slots[host] = asyncio.Semaphore(config.http_max_per_host)
+    async with slot:
+        requests_per_host[host] += 1
+        yield
+
+
+async def close_clients() -> None:
+    """关闭当前事件循环中的客户端，在循环结束前调用"""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+    _host_slots.pop(asyncio.get_running_loop(), None)
+
+
+def pool_stats() -> list[dict]:
+    """各客户端连接池中的连接数，用于管理页面展示"""
+    stats = []
+    for clients in list(_clients.values()):
+        for (proxy, verify), client in list(clients.items()):
+            transports = [getattr(t, "inner", t) for t in (client._transport, *client._mounts.values())]  # noqa: SLF001
+            connections = [c for t in transports if (pool := getattr(t, "_pool", None)) for c in pool.connections]
+            stats.append({
+                "proxy": proxy or "-",
+                "verify": verify,
+                "connections": len(connections),
+                "idle": sum(c.is_idle() for c in connections),
+                "http2": sum("HTTP/2" in c.info() for c in connections),
+            })
+    return stats
@@ -0,0 +1,86 @@
+"""按网站缓存 robots.txt ，并把其中的 Crawl-delay 作为请求同一网站的最短间隔
+
+开启 respect_robots_txt 后，get_response_or_none 和 get_html_or_none 在请求前检查，不允许抓取的网址直接返回 None 。
+robots.txt 缓存 robots_ttl 秒；获取失败时视为全部允许，只缓存 robots_negative_ttl 秒，之后再试。
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from config_handle import config
+
+from .http_client import get_client
+
+logger = logging.getLogger("robots")
+
+USER_AGENT = "source2RSSbot"
+
+
+@dataclass
+class RobotsEntry:
+    rp: RobotFileParser
+    expires_at: float
+    fetched: bool   # 为假时是获取失败后的临时结果
+
+    @property
+    def crawl_delay(self) -> float:
+        return float(self.rp.crawl_delay(USER_AGENT) or 0)
+
+
+_cache: dict[str, RobotsEntry] = {}
+_next_request_at: dict[str, float] = {}   # 各网站下次可以发出请求的时间
+
+
+def _origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def _parse(robots_txt: str) -> RobotFileParser:
+    rp = RobotFileParser()
+    rp.parse(robots_txt.splitlines())
+    return rp
+
+
+async def get_entry(url: str, headers: dict | None = None) -> RobotsEntry:
+    """返回网址所在网站的 robots.txt ，过期后重新获取"""
+    origin = _origin_of(url)
+    if (entry := _cache.get(origin)) and entry.expires_at > time.monotonic():
+        return entry
+    try:
+        res = await get_client().get(f"{origin}/robots.txt", headers=headers, timeout=10)
+    except httpx.HTTPError as e:
+        logger.info("exception occurred when get robots.txt of %s: %s", origin, e)
+        res = None
+    if res is not None and res.status_code < 500:
+        # 4xx 表示没有限制
+        rp = _parse(res.text if res.status_code == 200 else "")
+        entry = RobotsEntry(rp, time.monotonic() + config.robots_ttl, True)
+    else:
+        logger.info("failed to get robots.txt of %s, allow all for a while", origin)
+        entry = RobotsEntry(_parse(""), time.monotonic() + config.robots_negative_ttl, False)
+    _cache[origin] = entry
+    return entry
+
+
+async def check(url: str, headers: dict | None = None) -> bool:
+    """不允许抓取时返回假；允许时按 Crawl-delay 等待到可以请求的时间"""
+    entry = await get_entry(url, headers)
+    if not entry.rp.can_fetch(USER_AGENT, url):
+        logger.info("%s is disallowed by robots.txt", url)
+        return False
+    if delay := entry.crawl_delay:
+        host = urlsplit(url).netloc
+        now = time.monotonic()
+        request_at = max(now, _next_request_at.get(host, 0))
+        _next_request_at[host] = request_at + delay
+        await asyncio.sleep(request_at - now)
+    return True
+
+
+def all_entries() -> list[tuple[str, RobotsEntry]]:
+    return sorted(_cache.items())
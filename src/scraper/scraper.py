@@ -16,6 +16,7 @@ from .model import (
     SourceMeta,
     SrcMetaDict,
 )
+from .tools import ReadyCondition
 
 
 class ScraperMeta(ABCMeta):
@@ -140,6 +141,12 @@ class WebsiteScraper(ABC, metaclass=ScraperMeta):
     home_url = "https://yanh.tech/"
     # 请求每页之间的间隔，秒
     page_turning_duration = 5
+    # 是否按类名熔断，实例分布在不同网站的类应设为 False ，只按网站熔断，否则几个失败的实例就会停掉全部
+    class_breaker: ClassVar[bool] = True
+    # 用浏览器访问时拦截的请求，见 block_profiles.PROFILES ，为空则不拦截
+    block_profile = ""
+    # 用浏览器访问时，页面满足这个条件就读取，为空则等待 networkidle
+    ready_condition: ClassVar[ReadyCondition | None] = None
     _logger: ClassVar[logging.Logger]
 
     @abstractmethod
@@ -155,6 +162,11 @@ class WebsiteScraper(ABC, metaclass=ScraperMeta):
             "table_name": "技焉洲",
         }
 
+    @classmethod
+    def site_of(cls, *init_params) -> str:  # noqa: ARG003
+        """实例请求的网站，用于按网站熔断，默认是 home_url"""
+        return cls.home_url
+
     def _custom_parameter_of_parse(self) -> tuple:
         """调用 _parse 时，额外需要提供的参数"""
         return ()
@@ -1,140 +1,863 @@
 """WebsiteScraper 可以使用的工具"""
 import asyncio
+import heapq
 import logging
+import math
+import multiprocessing
+import pickle
+import re
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import lru_cache
+from itertools import count
+from pathlib import Path
+from typing import Any, TypeVar
 from urllib.robotparser import RobotFileParser
+from weakref import WeakKeyDictionary
 
 import httpx
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
 from playwright.async_api import TimeoutError as PwTimeoutError
 from playwright.async_api import async_playwright
 
 from config_handle import config
+from src.utils import proc_mem
+from src.utils.loop_monitor import current_scraper
+from src.utils.metrics import (
+    browser_queue_length,
+    browser_ready_seconds,
+    browser_wait_seconds,
+    offload_queue_depth,
+    offload_task_seconds,
+)
+
+from . import block_profiles, cassette, http_cache, robots
+from .http_client import get_client, host_slot
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
-async def get_response_or_none(url: str, headers=None, params=None, verify=True, retry: int=0, timeout: int=10) -> httpx.Response | None:
+async def get_response_or_none(url: str, headers=None, params=None, verify=True, retry: int=0, timeout: int=10,
+                               proxy=None, cache=False) -> httpx.Response | None:
+    """使用共享的客户端请求，proxy 为空时使用配置的 http_proxy_url 。
+    cache 为真且开启了 enable_http_cache 时，进行条件请求，用 http_cache.is_unchanged 判断内容是否有变化"""
+    if config.respect_robots_txt and not await robots.check(url, headers):
+        return None
+    cache = cache and http_cache.enabled()
+    entry = http_cache.load(url, params) if cache else None
+    if entry:
+        headers = (headers or {}) | http_cache.conditional_headers(entry)
+    response = await _get_response_or_none(url, headers, params, verify, retry, timeout, proxy)
+    if response is not None and cache:
+        response = http_cache.update(url, params, entry, response)
+    return response
+
+async def _get_response_or_none(url: str, headers, params, verify, retry: int, timeout: int, proxy: str | None) -> httpx.Response | None:  # noqa: ASYNC109
     backoff_factor: float = 0.5   # 指数退避因子
-    async with httpx.AsyncClient(follow_redirects=True, verify=verify, timeout=timeout) as client:
-        for attempt in range(retry + 1):  # 包含首次请求
-            try:
-                response = await client.get(url, params=params, headers=headers)
-                if response.status_code in {429, 500, 502, 503, 504}:
-                    raise httpx.HTTPStatusError("Retryable status code", request=response.request, response=response)
-            except (httpx.ConnectTimeout, httpx.ConnectError, httpx.ReadTimeout, httpx.HTTPStatusError) as e:  # noqa: PERF203
-                if attempt == retry:
-                    logger.warning("exception occurred when call get_response_or_none, url is '%s', e is '%s'", url, str(e))
-                    return None
-                wait_time = backoff_factor * (2 ** attempt)
-                await asyncio.sleep(min(wait_time, 60))  # 上限60秒
-            except Exception as e:
-                msg = f"exception occurred when call get_response_or_none, url is '{url}', e is '{e}'"
-                logger.error(msg)
-                await config.post2RSS("error log of get_response_or_none", msg)
+    client = get_client(proxy, verify)
+    for attempt in range(retry + 1):  # 包含首次请求
+        try:
+            async with host_slot(url):
+                response = await client.get(url, params=params, headers=headers, timeout=timeout)
+            if response.status_code in {429, 500, 502, 503, 504}:
+                raise httpx.HTTPStatusError("Retryable status code", request=response.request, response=response)
+        except (httpx.ConnectTimeout, httpx.ConnectError, httpx.ReadTimeout, httpx.HTTPStatusError) as e:  # noqa: PERF203
+            if attempt == retry:
+                logger.warning("exception occurred when call get_response_or_none, url is '%s', e is '%s'", url, str(e))
                 return None
-            else:
-                return response
+            wait_time = backoff_factor * (2 ** attempt)
+            await asyncio.sleep(min(wait_time, 60))  # 上限60秒
+        except Exception as e:
+            msg = f"exception occurred when call get_response_or_none, url is '{url}', e is '{e}'"
+            logger.error(msg)
+            await config.post2RSS("error log of get_response_or_none", msg)
+            return None
+        else:
+            return response
+
+
+class Priority(IntEnum):
+    """等待浏览器上下文时的优先级，数值小的先得到"""
+    INTERACTIVE = 0   # 用户通过 query_rss 主动请求
+    SCHEDULED = 1
+
+# 由 query_rss 设置，抓取器创建的任务会继承
+admission_priority: ContextVar[Priority] = ContextVar("admission_priority", default=Priority.SCHEDULED)
+
+
+@dataclass(frozen=True)
+class ReadyCondition:
+    """页面可以读取的条件，满足其中一个即返回，不再等待 networkidle 。抓取器用类属性 ready_condition 声明"""
+    selector: str = ""    # 出现这个 CSS 选择器对应的元素
+    predicate: str = ""   # 这段 JS 表达式的值为真
+    response: str = ""    # 收到网址包含这个字符串的响应
+    timeout: float = 30   # 秒，包括打开网页的时间
+
+    async def wait(self, page, url: str) -> None:
+        """打开网页并等待条件满足，超时引发 playwright 的 TimeoutError"""
+        deadline = time.monotonic() + self.timeout
+        def remaining() -> float: return max(deadline - time.monotonic(), 0.001) * 1000
+
+        # 响应可能在打开网页的过程中到达，需要先开始等待
+        waiters = []
+        if self.response:
+            waiters.append(asyncio.ensure_future(page.wait_for_response(lambda r: self.response in r.url, timeout=remaining())))
+        try:
+            await page.goto(url, timeout=remaining(), wait_until="domcontentloaded")
+            if self.selector:
+                waiters.append(asyncio.ensure_future(page.wait_for_selector(self.selector, state="attached", timeout=remaining())))
+            if self.predicate:
+                waiters.append(asyncio.ensure_future(page.wait_for_function(self.predicate, timeout=remaining())))
+            await self._first_satisfied(waiters)
+        finally:
+            for w in waiters:
+                if w.done() and not w.cancelled():
+                    w.exception()   # 避免未取得异常的警告
+                w.cancel()
+
+    @staticmethod
+    async def _first_satisfied(waiters: list[asyncio.Future]) -> None:
+        """有一个条件满足就返回，全部失败时引发最后一个异常"""
+        pending, error = set(waiters), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for w in done:
+                if (error := w.exception()) is None:
+                    return
+        if error:
+            raise error
+
+
+@dataclass
+class _PooledContext:
+    context: Any
+    page: Any = None   # 保留的页面，下次使用时不必新建
+    uses: int = 0
+    routed: bool = False   # 是否已经按 route_policy 设置了拦截
+
+
+@dataclass
+class _BrowserInstance:
+    """一个浏览器进程及其中保留的上下文"""
+    index: int
+    browser: Any = None
+    pids: list[int] = field(default_factory=list)   # 浏览器的主进程，用于统计内存
+    users: int = 0
+    pages: int = 0      # 本次启动后使用上下文的次数
+    launches: int = 0
+    crashes: int = 0
+    recycles: int = 0
+    draining: bool = False   # 达到回收条件，不再分配，用完后关闭
+    idle: dict[tuple, list[_PooledContext]] = field(default_factory=dict)  # 用完后保留的上下文
+    rss: int = 0             # 最近一次统计的进程树内存，字节
+    rss_sampled: float = -math.inf   # 最近一次统计的时间
+
+    def idle_count(self) -> int:
+        return sum(len(contexts) for contexts in self.idle.values())
+
+    async def sample_rss(self):
+        """距离上次统计超过 browser_memory_interval 秒时，在线程中读取 /proc ，不阻塞事件循环"""
+        now = time.monotonic()
+        if self.browser is None or now - self.rss_sampled < config.browser_memory_interval:
+            return
+        self.rss_sampled = now
+        self.rss = await asyncio.to_thread(proc_mem.tree_rss, list(self.pids))
+
+
+@dataclass
+class _BrowserState:
+    """一个事件循环中的浏览器及其使用情况"""
+    playwright: Any = None
+    users: int = 0
+    users_that_is_waiting: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    waiters: list[tuple[int, int, asyncio.Future]] = field(default_factory=list)  # 按优先级和先后排列的堆
+    seq: Iterator[int] = field(default_factory=count)
+    instances: list[_BrowserInstance] = field(default_factory=list)
+
+
+async def _abort_in_replay(route):
+    await route.abort("internetdisconnected")
 
 
 class AsyncBrowserManager:
-    """被多个事件循环调用时会出错"""
-    _browser = None
-    _playwright = None
-    _users = 0
-    _users_that_is_waiting = 0
-    _lock = asyncio.Lock()
+    """Playwright 的对象不能跨事件循环使用，因此每个事件循环各有浏览器、锁和计数。
+    每个循环中有 browser_instances 个浏览器，每个最多同时打开 max_opening_context 个上下文，分配给用户最少的那个"""
+    _states: WeakKeyDictionary[asyncio.AbstractEventLoop, _BrowserState] = WeakKeyDictionary()
     _logger = logging.getLogger("AsyncBrowserManager")
 
-    def __init__(self, id_: str, user_agent=None):
+    def __init__(self, id_: str, user_agent=None, storage_state: str | None = None, route_policy: str = ""):
+        """storage_state 是保存 cookie 等登录状态的文件，归还上下文时会写回；route_policy 是 block_profiles 中的名称。
+        id_、user_agent、storage_state 和 route_policy 都相同的，才会复用同一个上下文，
+        localStorage 等按网站保存的状态无法逐一清除，因此不同 id_ 的使用者不共用上下文"""
+        if route_policy:
+            block_profiles.get_profile(route_policy)
         self.id_ = id_
         self.user_agent = user_agent
+        self.storage_state = storage_state
+        self.route_policy = route_policy
         self.context = None
+        self._pooled: _PooledContext | None = None
+        self._instance: _BrowserInstance | None = None
+
+    @property
+    def key(self) -> tuple:
+        return (self.id_, self.user_agent, self.storage_state, self.route_policy)
+
+    @classmethod
+    def _state(cls) -> _BrowserState:
+        loop = asyncio.get_running_loop()
+        if (state := cls._states.get(loop)) is None:
+            state = cls._states[loop] = _BrowserState()
+        while len(state.instances) < config.browser_instances:
+            state.instances.append(_BrowserInstance(len(state.instances)))
+        return state
+
+    @staticmethod
+    def _capacity() -> int:
+        return config.max_opening_context * config.browser_instances
 
     async def __aenter__(self):
-        # 协程并发下，如果不加锁，有可能会实例化多个 _browser 或其他非预期状况
-        async with AsyncBrowserManager._lock:
-            # 首次使用时初始化浏览器和 Playwright
-            if AsyncBrowserManager._browser is None:
-                AsyncBrowserManager._playwright = await async_playwright().start()
-                AsyncBrowserManager._browser = await AsyncBrowserManager._playwright.chromium.launch(headless=True)
-                AsyncBrowserManager._logger.info("create browser for " + self.id_)
-        await AsyncBrowserManager.waiting_operation(self.id_, config.max_opening_context)
-        self.context = await AsyncBrowserManager._browser.new_context(
-            viewport={"width": 1920, "height": 1080}, accept_downloads=True, user_agent=self.user_agent
-        )
-        AsyncBrowserManager._logger.debug("create context for " + self.id_)
+        state = AsyncBrowserManager._state()
+        try:
+            await AsyncBrowserManager.waiting_operation(self.id_, AsyncBrowserManager._capacity())
+        except TimeoutError:
+            asyncio.create_task(AsyncBrowserManager.delayed_clean(self.id_, config.wait_before_close_browser))
+            raise
+        try:
+            # 协程并发下，如果不加锁，有可能会实例化多个 browser 或其他非预期状况
+            async with state.lock:
+                self._instance = self._choose(state)
+                self._instance.users += 1
+                if self._instance.browser is None:
+                    await AsyncBrowserManager._launch(state, self._instance, self.id_)
+            self._pooled = await self._take_context(self._instance)
+        except BaseException:
+            if self._instance is not None:
+                self._instance.users -= 1
+            AsyncBrowserManager._release(state, AsyncBrowserManager._capacity())
+            raise
+        self.context = self._pooled.context
         return self.context
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        async with AsyncBrowserManager._lock:
-            await self.context.close() # type: ignore
-            AsyncBrowserManager._logger.debug("destroy context of " + self.id_)
-            AsyncBrowserManager._users -= 1
-            # 所有用户都退出后清理资源
+        state = AsyncBrowserManager._state()
+        instance = self._instance
+        await instance.sample_rss() # type: ignore
+        async with state.lock:
+            await self._recycle(instance) # type: ignore
+            instance.users -= 1 # type: ignore
+            await AsyncBrowserManager._retire_if_needed(instance) # type: ignore
+        AsyncBrowserManager._release(state, AsyncBrowserManager._capacity())
+        # 所有用户都退出后清理资源
         asyncio.create_task(AsyncBrowserManager.delayed_clean(self.id_, config.wait_before_close_browser))
 
+    def _choose(self, state: _BrowserState) -> _BrowserInstance:
+        """选用户最少的浏览器，一样少时优先有可复用上下文的，正在回收的尽量不选"""
+        candidates = [i for i in state.instances if not i.draining] or state.instances
+        return min(candidates, key=lambda i: (i.users, not i.idle.get(self.key), i.index))
+
+    @classmethod
+    async def _launch(cls, state: _BrowserState, instance: _BrowserInstance, id_: str):
+        if state.playwright is None:
+            state.playwright = await async_playwright().start()
+        browser = await state.playwright.chromium.launch(headless=True)
+        instance.pids = await cls._browser_pids(browser)
+        instance.browser, instance.pages, instance.draining = browser, 0, False
+        instance.rss, instance.rss_sampled = 0, -math.inf
+        instance.launches += 1
+        browser.on("disconnected", lambda _: cls._on_disconnected(instance, browser))
+        cls._logger.info("create browser %d for %s", instance.index, id_)
+
+    @classmethod
+    async def _browser_pids(cls, browser) -> list[int]:
+        """向浏览器查询它的主进程，子进程在统计内存时再从 /proc 找。查询失败时不统计内存"""
+        try:
+            session = await browser.new_browser_cdp_session()
+            info = await session.send("SystemInfo.getProcessInfo")
+            await session.detach()
+        except Exception as e:
+            cls._logger.warning("failed to get pid of the browser: %s", e)
+            return []
+        processes = info.get("processInfo", [])
+        return [p["id"] for p in processes if p.get("type") == "browser"] or [p["id"] for p in processes]
+
+    @classmethod
+    def _on_disconnected(cls, instance: _BrowserInstance, browser):
+        """不是主动关闭的，视为崩溃，下次分配到时重新启动"""
+        if instance.browser is not browser:
+            return
+        cls._logger.warning("browser %d crashed, it will be restarted when needed", instance.index)
+        instance.crashes += 1
+        instance.browser, instance.pids = None, []
+        instance.idle.clear()
+
+    @classmethod
+    async def _retire_if_needed(cls, instance: _BrowserInstance):
+        """打开的网页数或内存超过阈值时回收，等正在使用的用户都退出后关闭，下次分配到时重新启动"""
+        if instance.browser is None:
+            return
+        if not instance.draining and (instance.pages >= config.browser_max_pages
+                                      or instance.rss > config.browser_max_memory * 1024 * 1024):
+            cls._logger.info("browser %d will be recycled, pages: %d", instance.index, instance.pages)
+            instance.draining = True
+            instance.recycles += 1
+        if instance.draining and instance.users == 0:
+            await cls._close_instance(instance)
+
+    @staticmethod
+    async def _close_instance(instance: _BrowserInstance):
+        browser = instance.browser
+        instance.browser, instance.pids, instance.draining = None, [], False
+        instance.idle.clear()   # 随浏览器一起关闭
+        with suppress(Exception):
+            await browser.close()
+
+    async def new_page(self):
+        """返回上下文中保留的页面，归还时会重置，使用者不需要关闭"""
+        pooled = self._pooled
+        if pooled.page is None or pooled.page.is_closed(): # type: ignore
+            pooled.page = await pooled.context.new_page() # type: ignore
+            AsyncBrowserManager._logger.debug("create page for " + self.id_)
+        return pooled.page # type: ignore
+
+    async def _take_context(self, instance: _BrowserInstance) -> _PooledContext:
+        if idle := instance.idle.get(self.key):
+            pooled = idle.pop()
+            AsyncBrowserManager._logger.debug("reuse context for " + self.id_)
+        else:
+            storage_state = self.storage_state if self.storage_state and Path(self.storage_state).is_file() else None  # noqa: ASYNC240
+            context = await instance.browser.new_context(
+                viewport={"width": 1920, "height": 1080}, accept_downloads=True, user_agent=self.user_agent,
+                storage_state=storage_state,
+            )
+            pooled = _PooledContext(context)
+            AsyncBrowserManager._logger.debug("create context for " + self.id_)
+        if self.route_policy and not pooled.routed:
+            await pooled.context.route("**/*", block_profiles.make_handler(self.route_policy))
+            pooled.routed = True
+        if cassette.replaying():
+            # 直接使用上下文的请求没有录制，回放时一律中止，不访问网络；归还时由 unroute_all 清除
+            await pooled.context.route("**/*", _abort_in_replay)
+            pooled.routed = True
+        pooled.uses += 1
+        instance.pages += 1
+        return pooled
+
+    async def _recycle(self, instance: _BrowserInstance):
+        """清除使用者添加的拦截和页面后放回池中，用满 context_max_uses 次、池已满或浏览器要回收时关闭"""
+        pooled = self._pooled
+        context = pooled.context # type: ignore
+        keep = (instance.browser is not None and not instance.draining and pooled.uses < config.context_max_uses # type: ignore
+                and instance.idle_count() < config.max_opening_context)
+        try:
+            if self.storage_state:
+                await context.storage_state(path=self.storage_state)
+            if keep:
+                await context.unroute_all(behavior="ignoreErrors")
+                pooled.routed = False # type: ignore
+                for page in context.pages:
+                    if page is not pooled.page: # type: ignore
+                        await page.close()
+                if pooled.page is not None and not pooled.page.is_closed(): # type: ignore
+                    await pooled.page.unroute_all(behavior="ignoreErrors") # type: ignore
+                    await pooled.page.goto("about:blank") # type: ignore
+                if not self.storage_state:
+                    await context.clear_cookies()
+                await context.clear_permissions()
+                instance.idle.setdefault(self.key, []).append(pooled) # type: ignore
+                return
+        except Exception as e:
+            AsyncBrowserManager._logger.warning("failed to recycle context of %s: %s", self.id_, e)
+        with suppress(Exception):
+            await context.close()
+        AsyncBrowserManager._logger.debug("destroy context of " + self.id_)
+
     @classmethod
     async def delayed_clean(cls, id_, delay: int):
-        async with AsyncBrowserManager._lock:
-            if cls._users > 0:
+        state = cls._state()
+        async with state.lock:
+            if state.users > 0:
                 return
         await asyncio.sleep(delay)
-        async with AsyncBrowserManager._lock:
-            all_users = cls._users + cls._users_that_is_waiting
-            if all_users == 0 and cls._browser is not None:
-                await cls._browser.close()
-                await cls._playwright.stop() # type: ignore
-                cls._browser = None
-                cls._playwright = None
+        async with state.lock:
+            all_users = state.users + state.users_that_is_waiting
+            if all_users == 0 and state.playwright is not None:
+                for instance in state.instances:
+                    if instance.browser is not None:
+                        await cls._close_instance(instance)
+                await state.playwright.stop()
+                state.playwright = None
                 cls._logger.info("destroy browser by %s", id_)
             elif all_users > 0:
                 cls._logger.info("leave browser alone, said by %s", id_)
-            elif all_users == 0 and cls._browser is None:
-                pass
-            else:
-                cls._logger.warning(f"unexpected situcation {id_}, {cls._users=}, {cls._users_that_is_waiting=}, {cls._browser=}")  # noqa: G004
+
+    @classmethod
+    def instance_stats(cls) -> list[dict]:
+        """各事件循环中每个浏览器的使用情况，用于管理页面展示"""
+        return [{
+            "index": i.index,
+            "running": i.browser is not None,
+            "users": i.users,
+            "idle_contexts": i.idle_count(),
+            "pages": i.pages,
+            "rss_mb": round(i.rss / 1024 / 1024, 1) if i.browser is not None else 0,
+            "launches": i.launches,
+            "crashes": i.crashes,
+            "recycles": i.recycles,
+            "draining": i.draining,
+        } for state in list(cls._states.values()) for i in state.instances]
 
     @classmethod
     async def waiting_operation(cls, id_, max_: int):
-        need_wait = True
-        cls._users_that_is_waiting += 1
-        while(need_wait):
-            async with cls._lock:
-                if cls._users >= max_:
-                    cls._logger.info("%s need to wait for context", id_)
-                    need_wait = True
-                else:
-                    cls._users += 1
-                    need_wait = False
-            if need_wait:
-                await asyncio.sleep(15)
-        cls._users_that_is_waiting -= 1
+        """按优先级和先后顺序分配上下文，等待超过 browser_queue_timeout 秒时引发 TimeoutError"""
+        state = cls._state()
+        priority = admission_priority.get()
+        if state.users < max_ and not state.waiters:
+            state.users += 1
+            browser_wait_seconds.observe(0, priority.name)
+            return
+        cls._logger.info("%s need to wait for context", id_)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.waiters, (priority, next(state.seq), future))
+        state.users_that_is_waiting += 1
+        browser_queue_length.set(len(state.waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, config.browser_queue_timeout)
+        except (TimeoutError, asyncio.CancelledError):
+            # 已经分配到但被取消了，交给下一个
+            if future.done() and not future.cancelled():
+                cls._release(state, max_)
+            cls._logger.warning("%s gave up waiting for context", id_)
+            raise
+        finally:
+            state.users_that_is_waiting -= 1
+            state.waiters = [w for w in state.waiters if not w[2].done()]
+            heapq.heapify(state.waiters)
+            browser_queue_length.set(len(state.waiters))
+            browser_wait_seconds.observe(time.perf_counter() - start, priority.name)
+
+    @staticmethod
+    def _release(state: _BrowserState, max_: int):
+        """归还上下文，直接交给等待中优先级最高的，而不是让它们再去竞争"""
+        state.users -= 1
+        while state.users < max_ and state.waiters:
+            _, _, future = heapq.heappop(state.waiters)
+            if not future.done():
+                state.users += 1
+                future.set_result(None)
 
 
     @staticmethod
-    async def get_html_or_none(id_: str, url: str, user_agent, block_func=None):
+    async def get_html_or_none(id_: str, url: str, user_agent, block_func=None, block_profile: str = "",
+                               ready: ReadyCondition | None = None):
+        """block_profile 是 block_profiles 中的名称，block_func 则是自定义的拦截函数。
+        ready 为空时等待 networkidle ，最长 3 分钟"""
+        if cassette.replaying():
+            return await cassette.load_html(url)
+        if config.respect_robots_txt and not await robots.check(url):
+            return None
         html_content = None
-        async with AsyncBrowserManager(id_, user_agent) as context:
-            if block_func:
-                await context.route("**/*", block_func)
-            page = await context.new_page()
-            AsyncBrowserManager._logger.debug("create page for " + id_)
-            try:
-                await page.goto(url, timeout=180000, wait_until='networkidle')   # 单位是毫秒，共 3 分钟
-            except PwTimeoutError as e:
-                AsyncBrowserManager._logger.warning(f"Page navigation of {id_} timed out: {e}")
-            else:
-                html_content = await page.content()
-            finally:
-                await page.close()
-                AsyncBrowserManager._logger.debug("destroy page of " + id_)
+        try:
+            manager = AsyncBrowserManager(id_, user_agent, route_policy=block_profile)
+            async with manager:
+                page = await manager.new_page()
+                if block_func:
+                    await page.route("**/*", block_func)
+                start = time.perf_counter()
+                try:
+                    if ready:
+                        await ready.wait(page, url)
+                    else:
+                        await page.goto(url, timeout=180000, wait_until='networkidle')   # 单位是毫秒，共 3 分钟
+                except PwTimeoutError as e:
+                    browser_ready_seconds.observe(time.perf_counter() - start, current_scraper.get() or id_, "timeout")
+                    AsyncBrowserManager._logger.warning(f"Page navigation of {id_} timed out: {e}")
+                else:
+                    browser_ready_seconds.observe(time.perf_counter() - start, current_scraper.get() or id_, "ready")
+                    html_content = await page.content()
+                    if cassette.recording():
+                        cassette.save_html(url, html_content)
+        except TimeoutError:
+            AsyncBrowserManager._logger.warning("%s waited too long for context", id_)
         return html_content
 
+    @staticmethod
+    async def capture_json(id_: str, url: str, user_agent, patterns: list[str], timeout: float = 60,  # noqa: ASYNC109
+                           block_profile: str = "", storage_state: str | None = None) -> dict[str, Any]:
+        """打开网页，把网址包含 patterns 中字符串的响应按 JSON 解析，以对应的字符串为键返回。
+        全部捕获后立即返回并停止加载网页，超时则返回已捕获的部分"""
+        if cassette.replaying():
+            return await cassette.load_json(url, patterns)
+        captured = await AsyncBrowserManager._capture_json(id_, url, user_agent, patterns, timeout, block_profile, storage_state)
+        if cassette.recording():
+            cassette.save_json(url, patterns, captured)
+        return captured
+
+    @staticmethod
+    async def _capture_json(id_: str, url: str, user_agent, patterns: list[str], timeout: float,  # noqa: ASYNC109
+                            block_profile: str, storage_state: str | None) -> dict[str, Any]:
+        if config.respect_robots_txt and not await robots.check(url):
+            return {}
+        captured: dict[str, Any] = {}
+        all_captured = asyncio.Event()
+
+        async def on_response(response):
+            pattern = next((p for p in patterns if p in response.url and p not in captured), None)
+            if pattern is None:
+                return
+            try:
+                captured[pattern] = await response.json()
+            except Exception as e:
+                AsyncBrowserManager._logger.debug("failed to parse response %s as json: %s", response.url, e)
+                return
+            if len(captured) == len(patterns):
+                all_captured.set()
+
+        try:
+            manager = AsyncBrowserManager(id_, user_agent, storage_state=storage_state, route_policy=block_profile)
+            async with manager:
+                page = await manager.new_page()
+                page.on("response", on_response)
+                start = time.perf_counter()
+                waiter = asyncio.create_task(all_captured.wait())
+                navigation = asyncio.create_task(page.goto(url, timeout=timeout * 1000))
+                await asyncio.wait((waiter, navigation), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not waiter.done() and navigation.done() and navigation.exception() is None:
+                    # 页面加载完后才请求接口的，继续等到超时
+                    await asyncio.wait((waiter,), timeout=max(timeout - (time.perf_counter() - start), 0))
+                waiter.cancel()
+                page.remove_listener("response", on_response)
+                if not navigation.done():
+                    # 打开空白页会中断原来的加载
+                    with suppress(Exception):
+                        await page.goto("about:blank")
+                results = await asyncio.gather(navigation, return_exceptions=True)
+                result = "ready" if all_captured.is_set() else "timeout"
+                browser_ready_seconds.observe(time.perf_counter() - start, current_scraper.get() or id_, result)
+                if result == "timeout":
+                    AsyncBrowserManager._logger.warning("%s captured %d of %d responses from %s, navigation result: %s",
+                                                        id_, len(captured), len(patterns), url, results[0])
+        except TimeoutError:
+            AsyncBrowserManager._logger.warning("%s waited too long for context", id_)
+        return captured
+
 
 async def create_rp(robots_txt: str, headers: dict | None = None) -> RobotFileParser:
-    """robots_txt 可以是字符串或网址，使用 rp.can_fetch(url) 判断是否能爬取"""
+    """robots_txt 可以是字符串或网址，使用 rp.can_fetch(url) 判断是否能爬取，网址的结果会按网站缓存"""
     if robots_txt.startswith("http"):
-        res = await get_response_or_none(robots_txt, headers)
-        robots_txt = res.text if res else "User-agent: *\nAllow: /"
+        return (await robots.get_entry(robots_txt, headers)).rp
     rp = RobotFileParser()
     rp.parse(robots_txt.split('\n'))
     return rp
+
+
+# CPU 密集的解析和生成 RSS 放到进程池中，不阻塞事件循环，也能用上多个核心。
+# 函数要定义在模块顶层，参数和返回值都要能 pickle ；offload_workers 为 0 时在当前线程运行，但同样检查
+@dataclass
+class OffloadStats:
+    name: str
+    tasks: int = 0
+    failures: int = 0
+    run_seconds: float = 0     # 在进程中运行的时间
+    wait_seconds: float = 0    # 排队和传输数据的时间
+    max_seconds: float = 0
+
+
+offload_stats: dict[str, OffloadStats] = {}
+_offload_pool: ProcessPoolExecutor | None = None
+_offload_pending = 0   # 已提交还没完成的任务数
+_offload_lock = threading.Lock()   # 网页和抓取可能在不同线程中提交
+
+
+def _get_offload_pool() -> ProcessPoolExecutor | None:
+    global _offload_pool
+    with _offload_lock:
+        if _offload_pool is None and config.offload_workers > 0:
+            # 进程中有多个线程，fork 不安全
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _offload_pool = ProcessPoolExecutor(config.offload_workers, multiprocessing.get_context(method))
+        return _offload_pool
+
+
+def shutdown_offload_pool():
+    global _offload_pool
+    with _offload_lock:
+        pool, _offload_pool = _offload_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_pickled(data: bytes) -> tuple[bytes, float]:
+    fn, args = pickle.loads(data)  # noqa: S301 参数来自本进程
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    try:
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL), seconds
+    except Exception as e:
+        raise TypeError(f"result of {_name_of(fn)} can not be pickled: {e}") from None
+
+
+def _name_of(fn) -> str:
+    return getattr(fn, "__qualname__", None) or repr(fn)
+
+
+def _change_pending(delta: int):
+    global _offload_pending
+    with _offload_lock:
+        _offload_pending += delta
+        offload_queue_depth.set(_offload_pending)
+
+
+async def parse_offloaded(fn: Callable[..., T], *args) -> T:
+    """在进程池中运行 fn(*args) 并返回结果，函数、参数或返回值不能 pickle 时引发 TypeError 。
+    offload_workers 为 0 时直接调用，不经过 pickle ，开启 offload_check_pickle 时才同样检查"""
+    name = _name_of(fn)
+    stat = offload_stats.setdefault(name, OffloadStats(name))
+    pool = _get_offload_pool()
+    start = time.perf_counter()
+    _change_pending(1)
+    try:
+        if pool is None and not config.offload_check_pickle:
+            result = fn(*args)
+            run_seconds = time.perf_counter() - start
+        else:
+            result, run_seconds = await _call_pickled(pool, fn, args)
+    except BrokenProcessPool:
+        # 子进程意外退出，下次重新创建
+        stat.failures += 1
+        shutdown_offload_pool()
+        raise
+    except Exception:
+        stat.failures += 1
+        raise
+    finally:
+        _change_pending(-1)
+    seconds = time.perf_counter() - start
+    stat.tasks += 1
+    stat.run_seconds += run_seconds
+    stat.wait_seconds += seconds - run_seconds
+    stat.max_seconds = max(stat.max_seconds, seconds)
+    offload_task_seconds.observe(seconds, name)
+    return result
+
+
+async def _call_pickled(pool: ProcessPoolExecutor | None, fn: Callable[..., T], args: tuple) -> tuple[T, float]:
+    try:
+        data = pickle.dumps((fn, args), pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        raise TypeError(f"{_name_of(fn)} or its arguments can not be pickled: {e}") from None
+    if pool is None:
+        result, run_seconds = _run_pickled(data)
+    else:
+        result, run_seconds = await asyncio.get_running_loop().run_in_executor(pool, _run_pickled, data)
+    return pickle.loads(result), run_seconds  # noqa: S301
+
+
+def offload_status() -> tuple[int, list[OffloadStats]]:
+    """正在排队或运行的任务数，以及各函数的统计，用于管理页面展示"""
+    return _offload_pending, sorted(offload_stats.values(), key=lambda s: s.run_seconds, reverse=True)
+
+
+# 抓取器通常只读取网页中的少数节点，用 BeautifulSoup 构建整棵树较慢。
+# parse_html 直接用 lxml 解析，返回的 Node 提供和 BeautifulSoup 相同的常用方法；
+# 给出 SoupStrainer 时，则只用 BeautifulSoup 构建匹配的部分
+_MULTI_VALUED = frozenset(("class", "rel", "rev", "headers", "accesskey", "accept-charset"))
+_NOT_TEXT = "[not(parent::script or parent::style or parent::template)]"   # 和 BeautifulSoup 一样，不包括脚本和样式
+# node.div 这样的简写只用于这些标签，其他未实现的 Tag 属性（如 string 、 children ）引发 AttributeError ，不会悄悄返回 None
+_HTML_TAGS = frozenset((
+    "a", "abbr", "address", "article", "aside", "audio", "b", "blockquote", "body", "br", "button", "canvas", "caption",
+    "cite", "code", "dd", "del", "details", "dfn", "div", "dl", "dt", "em", "figcaption", "figure", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "head", "header", "hr", "html", "i", "iframe", "img", "input", "ins", "label",
+    "li", "link", "main", "mark", "meta", "nav", "noscript", "ol", "option", "p", "picture", "pre", "q", "s", "section",
+    "select", "small", "source", "span", "strong", "sub", "summary", "sup", "svg", "table", "tbody", "td", "textarea",
+    "tfoot", "th", "thead", "time", "title", "tr", "u", "ul", "video",
+))
+
+
+def parse_html(html: str | bytes, only: SoupStrainer | None = None) -> "Node | BeautifulSoup":
+    if only is not None:
+        return BeautifulSoup(html, features="lxml", parse_only=only)
+    try:
+        root = etree.HTML(html)
+    except ValueError:   # 字符串中声明了编码
+        root = etree.HTML(html.encode() if isinstance(html, str) else html)
+    if root is None:
+        root = etree.HTML("<html></html>")
+    return Node(root.getroottree())
+
+
+def _literal(s: str) -> str:
+    if "'" not in s:
+        return f"'{s}'"
+    if '"' not in s:
+        return f'"{s}"'
+    return "concat('" + "', \"'\", '".join(s.split("'")) + "')"
+
+
+def _has_class(c: str) -> str:
+    return f"[contains(concat(' ', normalize-space(@class), ' '), {_literal(' ' + c + ' ')})]"
+
+
+@lru_cache(maxsize=256)
+def _compile(xpath: str) -> etree.XPath:
+    return etree.XPath(xpath)
+
+
+_CSS_TOKEN = re.compile(r"""\s*(>)\s*|(\s+)|([\w-]+|\*)|#([^\s#.\[\]>,:]+)|\.([^\s#.\[\]>,:]+)"""
+                        r"""|\[\s*([\w-]+)\s*(?:=\s*(?:"([^"]*)"|'([^']*)'|([^\]\s]+))\s*)?\]""")
+
+
+def _css_condition(m: re.Match) -> str:
+    id_, class_, attr = m.group(4, 5, 6)
+    if id_:
+        return f"[@id={_literal(id_)}]"
+    if class_:
+        return _has_class(class_)
+    value = next((v for v in m.group(7, 8, 9) if v is not None), None)
+    return f"[@{attr}]" if value is None else f"[@{attr}={_literal(value)}]"
+
+
+@lru_cache(maxsize=256)
+def _css_to_xpath(css: str) -> str:
+    """只支持标签、 #id 、 .class 、 [attr] 、 [attr=value] 和后代、子代组合，以及逗号分隔的多个选择器"""
+    paths = []
+    for selector in css.split(","):
+        selector, path, axis, tag, conditions, pos = selector.strip(), ".", "//", "", "", 0
+        while pos < len(selector):
+            m = _CSS_TOKEN.match(selector, pos)
+            if m is None:
+                raise ValueError(f"unsupported css selector: {css}")
+            pos = m.end()
+            child, space = m.group(1, 2)
+            if child or space:
+                # 组合符，前面的一步结束
+                if tag or conditions:
+                    path += axis + (tag or "*") + conditions
+                    tag, conditions, axis = "", "", "//"
+                if child:
+                    axis = "/"
+            elif m.group(3):
+                tag = m.group(3)
+            else:
+                conditions += _css_condition(m)
+        if not (tag or conditions):
+            raise ValueError(f"unsupported css selector: {css}")
+        paths.append(path + axis + (tag or "*") + conditions)
+    return " | ".join(paths)
+
+
+class Node:
+    """lxml 元素的包装，方法和 BeautifulSoup 的 Tag 相同，但只实现了抓取器常用的部分"""
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Node) and other._el is self._el
+
+    def __hash__(self) -> int:
+        return hash(self._el)
+
+    def __repr__(self) -> str:
+        return etree.tostring(self._el, encoding="unicode", with_tail=False)
+
+    def __getattr__(self, name: str):
+        """和 BeautifulSoup 一样， node.div 是第一个 div 后代"""
+        if name not in _HTML_TAGS:
+            raise AttributeError(f"'Node' object has no attribute '{name}'")
+        return self.find(name)
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    @property
+    def name(self) -> str:
+        return getattr(self._el, "tag", "[document]")
+
+    @property
+    def attrs(self) -> dict[str, Any]:
+        if not hasattr(self._el, "attrib"):
+            return {}
+        return {k: v.split() if k in _MULTI_VALUED else v for k, v in self._el.attrib.items()}
+
+    @property
+    def parent(self) -> "Node | None":
+        parent = self._el.getparent() if hasattr(self._el, "getparent") else None
+        return Node(parent) if parent is not None else None
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    def get(self, key: str, default=None):
+        if not hasattr(self._el, "attrib") or (value := self._el.attrib.get(key)) is None:
+            return default
+        return value.split() if key in _MULTI_VALUED else value
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        texts = _compile(".//text()" + _NOT_TEXT)(self._el)
+        if strip:
+            texts = [t.strip() for t in texts if t.strip()]
+        return separator.join(texts)
+
+    def find(self, name: str | None = None, attrs: dict | None = None, recursive: bool = True, **kwargs) -> "Node | None":
+        found = self.find_all(name, attrs, recursive, limit=1, **kwargs)
+        return found[0] if found else None
+
+    def find_all(self, name: str | None = None, attrs: dict | None = None, recursive: bool = True,
+                 limit: int | None = None, **kwargs) -> list["Node"]:
+        """属性的值可以是字符串、 True 或正则表达式，class 的值有空格时要求完全相同，否则包含即可"""
+        conditions = {**(attrs or {}), **kwargs}
+        if "class_" in conditions:
+            conditions["class"] = conditions.pop("class_")
+        xpath, filters = ("./" if not recursive else ".//") + (name or "*"), []
+        for key, value in conditions.items():
+            if value is True:
+                xpath += f"[@{key}]"
+            elif isinstance(value, str):
+                xpath += _has_class(value) if key == "class" and not any(c.isspace() for c in value) \
+                    else f"[@{key}={_literal(value)}]"
+            elif isinstance(value, re.Pattern):
+                filters.append((key, value))
+            else:
+                raise TypeError(f"unsupported value for attribute {key}: {value!r}")
+        nodes = _compile(xpath)(self._el)
+        if filters:
+            nodes = [n for n in nodes if all(_attr_matches(n.get(k), p, k) for k, p in filters)]
+        return [Node(n) for n in nodes[:limit]]
+
+    def select(self, css: str, limit: int | None = None) -> list["Node"]:
+        """选择器只在当前节点的后代中匹配"""
+        return [Node(n) for n in _compile(_css_to_xpath(css))(self._el)[:limit]]
+
+    def select_one(self, css: str) -> "Node | None":
+        found = self.select(css, 1)
+        return found[0] if found else None
+
+
+def _attr_matches(value: str | None, pattern: re.Pattern, key: str) -> bool:
+    if value is None:
+        return False
+    if key in _MULTI_VALUED and any(pattern.search(v) for v in value.split()):
+        return True
+    return pattern.search(value) is not None
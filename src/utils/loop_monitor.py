@@ -0,0 +1,133 @@
+"""监测事件循环被同步代码阻塞的情况，并找出是哪个抓取器造成的
+
+循环中的心跳协程定期记录时间，另一个线程发现心跳停止超过阈值时，记录循环所在线程的调用栈，
+并根据当前任务找到抓取器。抓取器由 process_one_instance 设置到 contextvar 中，子任务创建时会继承，
+由于 3.11 不能从其他线程读取任务的 context ，任务工厂在创建任务时另外记录一份。
+"""
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from weakref import WeakKeyDictionary
+
+from config_handle import config
+
+logger = logging.getLogger("loop_monitor")
+
+current_scraper: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_scraper", default=None)
+_task_scrapers: WeakKeyDictionary[asyncio.Future, str] = WeakKeyDictionary()
+
+
+def set_current_scraper(name: str) -> contextvars.Token:
+    token = current_scraper.set(name)
+    if task := asyncio.current_task():
+        _task_scrapers[task] = name
+    return token
+
+def reset_current_scraper(token: contextvars.Token) -> None:
+    current_scraper.reset(token)
+    if task := asyncio.current_task():
+        if previous := current_scraper.get():
+            _task_scrapers[task] = previous
+        else:
+            _task_scrapers.pop(task, None)
+
+def _task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context") or contextvars.copy_context()
+    if name := context.get(current_scraper):
+        _task_scrapers[task] = name
+    return task
+
+
+@dataclass
+class Offender:
+    name: str
+    count: int = 0
+    total_lag: float = 0
+    max_lag: float = 0
+    last_stack: str = ""
+
+
+offenders: dict[str, Offender] = {}
+_lock = threading.Lock()
+
+def top_offenders(n: int = 10) -> list[Offender]:
+    with _lock:
+        return sorted(offenders.values(), key=lambda o: o.total_lag, reverse=True)[:n]
+
+
+class LoopMonitor:
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float, interval: float = 0.1):
+        self.loop, self.threshold, self.interval = loop, threshold, interval
+        self._last_beat = time.monotonic()
+        self._captured: tuple[str, str] | None = None   # 本次阻塞中抓到的抓取器和调用栈
+        self._loop_thread_id = 0
+        self._stop_event = threading.Event()
+        self._heartbeat_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """可以在任意线程中调用"""
+        self.loop.call_soon_threadsafe(self._start_in_loop)
+        threading.Thread(target=self._watch, name="loop_monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._heartbeat_task is not None:
+            self.loop.call_soon_threadsafe(self._heartbeat_task.cancel)
+
+    def _start_in_loop(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        if self.loop.get_task_factory() is None:
+            self.loop.set_task_factory(_task_factory)
+        self._heartbeat_task = self.loop.create_task(self._heartbeat())
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._last_beat - self.interval
+            if lag >= self.threshold:
+                name, stack = self._captured or ("unknown", "")
+                self._record(name, lag, stack)
+            self._captured = None
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            blocked = time.monotonic() - self._last_beat - self.interval
+            if blocked < self.threshold or self._captured is not None or not self._loop_thread_id:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+            task = asyncio.current_task(self.loop)
+            name = (_task_scrapers.get(task) if task else None) or (task.get_name() if task else "loop callback")
+            self._captured = (name, "".join(traceback.format_stack(frame)) if frame else "")
+
+    @staticmethod
+    def _record(name: str, lag: float, stack: str) -> None:
+        logger.warning("event loop was blocked for %.3f seconds by %s", lag, name)
+        with _lock:
+            offender = offenders.setdefault(name, Offender(name))
+            offender.count += 1
+            offender.total_lag += lag
+            offender.max_lag = max(offender.max_lag, lag)
+            if stack:
+                offender.last_stack = stack
+
+
+def start_monitor(loop: asyncio.AbstractEventLoop) -> LoopMonitor | None:
+    """阈值为 0 时不监测"""
+    if config.loop_lag_threshold <= 0:
+        return None
+    monitor = LoopMonitor(loop, config.loop_lag_threshold)
+    monitor.start()
+    return monitor
+
+
+def stop_monitors(monitors: list[LoopMonitor | None]) -> None:
+    for monitor in monitors:
+        if monitor is not None:
+            monitor.stop()
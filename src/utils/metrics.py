@@ -0,0 +1,135 @@
+"""简单的计数器和直方图，以 Prometheus 文本格式输出
+
+未开启 enable_metrics 时，记录操作直接返回，计时使用共享的空上下文，几乎没有开销。
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+
+from config_handle import config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180)
+
+_registry: list["Counter | Gauge | Histogram"] = []
+_lock = threading.Lock()   # 抓取可能在另一个线程中进行
+_null = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help_, labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        _registry.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not config.enable_metrics:
+            return
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge:
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help_, labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        _registry.append(self)
+
+    def set(self, value: float, *labels: str) -> None:
+        if not config.enable_metrics:
+            return
+        with _lock:
+            self._values[labels] = value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help_, labelnames, buckets
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}  # 各桶的计数（不累加）和 [总和]
+        _registry.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not config.enable_metrics:
+            return
+        with _lock:
+            if (item := self._values.get(labels)) is None:
+                item = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            item[0][bisect_left(self.buckets, value)] += 1
+            item[1][0] += value
+
+    def time(self, *labels: str):
+        """作为上下文管理器，记录其中代码运行的时间"""
+        return self._time(*labels) if config.enable_metrics else _null
+
+    @contextmanager
+    def _time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def totals(self, label: str) -> dict[str, tuple[int, float]]:
+        """按某个标签汇总次数和总时长，供基准测试使用"""
+        index = self.labelnames.index(label)
+        result: dict[str, tuple[int, float]] = {}
+        with _lock:
+            for labels, (counts, total) in self._values.items():
+                count, seconds = result.get(labels[index], (0, 0.0))
+                result[labels[index]] = (count + sum(counts), seconds + total[0])
+        return result
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                le = 'le="' + str(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total[0]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+def render_all() -> str:
+    with _lock:
+        return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+crawl_phase_seconds = Histogram(
+    "source2rss_crawl_phase_seconds", "Time spent in each phase of a crawl", ("cls", "source", "phase"))
+articles_total = Counter("source2rss_articles_total", "New articles stored", ("cls", "source"))
+http_request_seconds = Histogram(
+    "source2rss_http_request_seconds", "Latency of HTTP requests by router", ("router", "method", "status"))
+browser_wait_seconds = Histogram(
+    "source2rss_browser_wait_seconds", "Time spent waiting for a browser context", ("priority",))
+browser_ready_seconds = Histogram(
+    "source2rss_browser_ready_seconds", "Time from navigation to page ready", ("scraper", "result"))
+browser_queue_length = Gauge("source2rss_browser_queue_length", "Scrapers waiting for a browser context")
+offload_queue_depth = Gauge("source2rss_offload_queue_depth", "Tasks submitted to the process pool and not finished")
+offload_task_seconds = Histogram(
+    "source2rss_offload_task_seconds", "Time of tasks run in the process pool, including waiting", ("fn",))
@@ -0,0 +1,42 @@
+"""通过 /proc 找到子进程并统计进程树占用的内存，用于按内存回收浏览器。不是 Linux 时都返回空"""
+import os
+from pathlib import Path
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _parents() -> dict[int, int]:
+    """所有进程的父进程"""
+    parents = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # 进程名中可能有空格和括号，从最后一个右括号之后取
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        parents[int(stat.parent.name)] = int(fields[1])
+    return parents
+
+
+def descendants(pid: int, parents: dict[int, int] | None = None) -> set[int]:
+    children: dict[int, list[int]] = {}
+    for child, parent in (parents or _parents()).items():
+        children.setdefault(parent, []).append(child)
+    result, stack = set(), [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            if child not in result:
+                result.add(child)
+                stack.append(child)
+    return result
+
+
+def tree_rss(pids: list[int]) -> int:
+    """这些进程及其子进程的常驻内存之和，字节"""
+    total, parents = 0, _parents()
+    for pid in {p for root in pids for p in (root, *descendants(root, parents))}:
+        try:
+            total += int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
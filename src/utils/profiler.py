@@ -0,0 +1,123 @@
+"""对一次运行进行采样分析和内存分配统计，结果保存到 data_dir/profiles
+
+采样器在单独的线程中定期读取运行协程的线程的调用栈，输出 collapsed 格式（每行 "a;b;c 次数"），
+可以直接交给 flamegraph.pl 或 speedscope 生成火焰图。同一事件循环中的其他协程也会被采样到。
+"""
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Coroutine
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from config_handle import config
+
+
+@dataclass
+class ProfileSummary:
+    name: str
+    seconds: float
+    samples: int
+    top_functions: list[tuple[str, int]]     # 函数和出现在栈顶的次数
+    top_allocations: list[tuple[str, int]]   # 代码位置和分配的字节数
+    stacks_file: str
+    allocations_file: str
+    result: Any = None
+    error: str = ""
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        super().__init__(name="stack_sampler", daemon=True)
+        self.thread_id, self.interval = thread_id, interval
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # noqa: SLF001
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0        # 正在进行的分析个数，最后一个结束时才停止 tracemalloc
+_tracing_started = False  # tracemalloc 是否由这里开启，外部开启的不停止
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+async def profile(name: str, coro: Coroutine, top: int = 20) -> ProfileSummary:
+    """运行协程并分析，协程中的异常会记录在结果中，不会抛出"""
+    profiles_dir = Path(config.data_dir) / "profiles"
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    stem = profiles_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{name}"
+
+    sampler = StackSampler(threading.get_ident())
+    _start_tracing()
+    start = time.perf_counter()
+    sampler.start()
+    result, error = None, ""
+    try:
+        result = await coro
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"
+    finally:
+        sampler.stop()
+        seconds = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _stop_tracing()
+
+    # 空闲时的栈顶是事件循环的 select ，也保留，能看出等待网络的时间占比
+    stacks_file = stem.with_suffix(".collapsed.txt")
+    stacks_file.write_text("".join(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common()), encoding="utf-8")
+    leaves: Counter[str] = Counter()
+    for stack, count in sampler.stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+
+    stats = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),)).statistics("lineno")
+    allocations = [(str(stat.traceback), stat.size) for stat in stats]
+    allocations_file = stem.with_suffix(".alloc.txt")
+    allocations_file.write_text("".join(f"{size}\t{where}\n" for where, size in allocations), encoding="utf-8")
+
+    return ProfileSummary(name, seconds, sum(sampler.stacks.values()), leaves.most_common(top), allocations[:top],
+                          str(stacks_file), str(allocations_file), result, error)
+
+
+if __name__ == "__main__":
+    async def busy():
+        await asyncio.sleep(0.1)
+        return sum(i * i for i in range(10**6))
+
+    print(asyncio.run(profile("busy", busy())))  # noqa: T201
+    # .env/bin/python -m src.utils.profiler
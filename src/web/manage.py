@@ -8,9 +8,17 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from pydantic import BaseModel
 
 from config_handle import config
-from data_handle import data
-from src.crawl import start_to_crawl_all
+from data_handle import Plugins, data
+from src.crawl import ScraperNameAndParams, process_one_instance, start_to_crawl_all
+from src.crawl.circuit_breaker import not_closed_breakers
+from src.crawl.crawl_loop import run_in_crawl_loop
 from src.crawl.crawler import running_scrapers
+from src.crawl.local_publish import timeout_counts
+from src.scraper import block_profiles, feed_stream, http_cache, robots
+from src.scraper.http_client import pool_stats, requests_per_host
+from src.scraper.tools import AsyncBrowserManager, offload_status
+from src.utils.loop_monitor import top_offenders
+from src.utils.profiler import profile
 
 from .get_rss import templates
 from .security import User, UserRegistry, get_admin_user
@@ -29,7 +37,21 @@ async def manage_page(request: Request):
         "invite_code": UserRegistry._invite_code, # noqa: SLF001
         "count": UserRegistry._left_count, # noqa: SLF001
         "running_scrapers": running_scrapers,
+        "leases": data.db_intf.get_all_leases(),
         "all_agent_info": data.agents.all_agent_info(),
+        "polling_info": data.db_intf.get_all_polling_info(),
+        "timeout_counts": timeout_counts.most_common(),
+        "breakers": not_closed_breakers(),
+        "loop_offenders": top_offenders(),
+        "http_pools": pool_stats(),
+        "requests_per_host": requests_per_host.most_common(20),
+        "http_cache_stats": http_cache.all_stats(),
+        "robots_entries": robots.all_entries(),
+        "block_stats": block_profiles.all_stats(),
+        "feed_stream_stats": feed_stream.all_stats(),
+        "browser_instances": AsyncBrowserManager.instance_stats(),
+        "offload": offload_status(),
+        "offload_workers": config.offload_workers,
         "scraper_profiles_content": scraper_profiles_content,
     }
     return templates.TemplateResponse(request=request, name="manage.html", context=context)
@@ -38,10 +60,23 @@ async def manage_page(request: Request):
 # todo 可能会出现同一个抓取器同时运行，会有什么影响
 @router.post("/crawler/run_all", response_class=JSONResponse, dependencies=[Depends(get_admin_user)])
 async def run_all_scraper(background_tasks: BackgroundTasks):
-    background_tasks.add_task(start_to_crawl_all)
+    background_tasks.add_task(run_in_crawl_loop, start_to_crawl_all())
     return HTMLResponse("<p>start to crawl</p>")
 
 
+@router.post("/crawler/profile", response_class=HTMLResponse, dependencies=[Depends(get_admin_user)])
+async def profile_scraper(request: Request, cls_id: Annotated[str, Form()], params: Annotated[str, Form()] = ""):
+    """运行一次抓取器实例并分析，参数每行一个，不填则使用配置中的第一组"""
+    if Plugins.get_plugin_or_none(cls_id) is None:
+        return HTMLResponse(f"<p>{cls_id} is not found</p>")
+    init_params = tuple(p.strip() for p in params.splitlines() if p.strip())
+    scrapers = ScraperNameAndParams.create(cls_id, (init_params, ) if init_params else None)
+    if not scrapers:
+        return HTMLResponse(f"<p>{cls_id} has no parameters to run</p>")
+    summary = await run_in_crawl_loop(profile(cls_id, process_one_instance(scrapers[0])))
+    return templates.TemplateResponse(request=request, name="profile_result.html", context={"s": summary})
+
+
 class InviteCodeCreate(BaseModel):
     code: str
     count: int
@@ -1,6 +1,8 @@
 # ruff: noqa: B904
 """主动请求某个源的 RSS ，会触发抓取过程并返回结果"""
+import asyncio
 import logging
+from collections.abc import Iterable
 from datetime import datetime
 from enum import Enum, auto
 from functools import wraps
@@ -14,8 +16,11 @@ from data_handle import Plugins
 from config_handle import config
 from data_handle import data
 from src.crawl import ScraperNameAndParams, process_one_instance
-from src.crawl.crawl_error import CrawlError
+from src.crawl.crawl_loop import run_in_crawl_loop
+from src.crawl.crawl_error import CrawlBreakError, CrawlError, CrawlRepeatError
+from src.crawl.crawler import last_source_names
 from src.scraper import AccessLevel
+from src.scraper.tools import Priority, admission_priority
 
 from . import sort_rss_list
 from .get_rss import select_rss, templates
@@ -74,6 +79,11 @@ class CacheType(Enum):
     JUST_SKIP_CACHE = auto() # 总是执行，不把结果放缓存中
 
 cache=TTLCache(maxsize=config.query_cache_maxsize, ttl=config.query_cache_ttl_s)
+inflight: dict[tuple, asyncio.Task] = {}  # 正在抓取的请求，相同的请求会等待同一个结果
+
+def normalize_params(params: Iterable[str]) -> tuple[str, ...]:
+    """去掉参数首尾的空白和空参数，使等价的 q 列表对应同一个缓存"""
+    return tuple(p.strip() for p in params if p.strip())
 
 def async_cached(func):
     @wraps(func)
@@ -81,31 +91,47 @@ def async_cached(func):
         if cache_type is CacheType.JUST_SKIP_CACHE:
             return await func(cls_id, one_group_params, cache_type=cache_type)
         # 根据传入的参数生成唯一的 key
+        one_group_params = normalize_params(one_group_params)
         cache_key = (cls_id, one_group_params)
         if cache_type is CacheType.NORMAL and cache_key in cache:
             logger.debug("%s, %s, has cache", cls_id, str(one_group_params))
             return cache[cache_key]
+        if task := inflight.get(cache_key):
+            logger.debug("%s, %s, wait for the same request", cls_id, str(one_group_params))
+            return await asyncio.shield(task)
+
+        async def crawl_and_cache() -> str:
+            try:
+                result = await func(cls_id, one_group_params, cache_type=cache_type)
+                cache[cache_key] = result
+                return result
+            finally:
+                inflight.pop(cache_key, None)
+
         logger.debug("%s, %s, will crawl immediately", cls_id, str(one_group_params))
-        try:
-            result = await func(cls_id, one_group_params, cache_type=cache_type)
-            cache[cache_key] = result
-        except HTTPException as e:
-            if e.status_code != 466:
-                raise
-            # 对于不应期，尝试返回缓存中的值
-            result = cache.get(cache_key)
-            if not result:
-                raise
-        return result
+        # 放到单独的任务中，发起请求的连接断开也不影响其他等待者
+        task = asyncio.create_task(crawl_and_cache())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        inflight[cache_key] = task
+        return await asyncio.shield(task)
     return wrapper
 
 @async_cached
 async def go_to_crawl(cls_id: str, one_group_params: tuple, *, cache_type: CacheType=CacheType.NORMAL) -> str:
     scraper_with_one_group_params = ScraperNameAndParams.create(cls_id, (one_group_params, ))
+    # 用户在等待结果，优先分配浏览器上下文，抓取循环中的任务会继承这个 contextvar
+    token = admission_priority.set(Priority.INTERACTIVE)
     try:
-        res = await process_one_instance(scraper_with_one_group_params[0])
+        res = await run_in_crawl_loop(process_one_instance(scraper_with_one_group_params[0]))
+    except (CrawlRepeatError, CrawlBreakError) as e:
+        # 对于不应期和熔断期间，返回最近一次抓取的结果
+        if res := last_source_names.get(scraper_with_one_group_params[0]):
+            return res
+        raise HTTPException(status_code=e.code, detail=str(e))
     except CrawlError as e:
         raise HTTPException(status_code=e.code, detail=str(e))
+    finally:
+        admission_priority.reset(token)
 
     if res is None:
         await config.post2RSS("error log of no_cache_flow", f"res=None, {cls_id=}, {one_group_params=}")
@@ -0,0 +1,88 @@
+# ruff: noqa: T201
+"""
+对熔断器的状态转换测试
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/crawl/test_circuit_breaker.py
+"""
+import pytest
+
+from config_handle import config
+from src.crawl import circuit_breaker
+from src.crawl.circuit_breaker import BreakerState, CircuitBreaker
+
+
+@pytest.fixture
+def breaker():
+    print("This is run before each circuit breaker test")
+    yield CircuitBreaker("class:HotBilibili")
+    print("This is run after each circuit breaker test")
+
+def test_open_after_threshold(breaker):
+    opened = [breaker.record_failure(0) for _ in range(config.breaker_threshold)]
+    assert opened == [False] * (config.breaker_threshold - 1) + [True]
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.allow(config.breaker_cooldown - 1)
+
+def test_half_open_single_probe(breaker):
+    for _ in range(config.breaker_threshold):
+        breaker.record_failure(0)
+    assert breaker.allow(config.breaker_cooldown)
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert not breaker.allow(config.breaker_cooldown)
+    assert breaker.record_success()
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.allow(config.breaker_cooldown)
+
+def test_cooldown_backoff(breaker):
+    for _ in range(config.breaker_threshold):
+        breaker.record_failure(0)
+    now = config.breaker_cooldown
+    breaker.allow(now)
+    # 试探失败再次打开，不重复通知，等待时间翻倍
+    assert not breaker.record_failure(now)
+    assert breaker.open_until == now + min(config.breaker_cooldown * 2, config.breaker_max_cooldown)
+
+def test_probe_taken_only_when_all_allow(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "breakers", {})
+    monkeypatch.setattr(circuit_breaker, "get_breaker_keys", lambda cls_id, *_: (f"class:{cls_id}", "host:h"))
+    cls_a, host = CircuitBreaker("class:A", state=BreakerState.OPEN), CircuitBreaker("host:h", state=BreakerState.OPEN)
+    host.open_until = float("inf")
+    circuit_breaker.breakers |= {"class:A": cls_a, "host:h": host}
+    # 网站的熔断器不放行，类的熔断器虽然已经半开，也不占用试探
+    assert circuit_breaker.acquire("A") is None
+    assert (cls_a.state, cls_a.probing) == (BreakerState.HALF_OPEN, False)
+
+    host.open_until = 0
+    probes = circuit_breaker.acquire("A")
+    assert probes == (cls_a, host)
+    assert circuit_breaker.acquire("A") is None
+    # 没有记录结果就结束，放回试探后可以再次试探
+    circuit_breaker.release(probes)
+    assert circuit_breaker.acquire("A") == (cls_a, host)
+
+@pytest.mark.asyncio
+async def test_notify_only_when_opened(monkeypatch):
+    notices = []
+
+    async def fake_post2rss(title, content):
+        notices.append((title, content))
+
+    monkeypatch.setattr(circuit_breaker, "breakers", {})
+    monkeypatch.setattr(circuit_breaker, "get_breaker_keys", lambda cls_id, *_: (f"class:{cls_id}",))
+    monkeypatch.setattr(config, "post2RSS", fake_post2rss)
+    for i in range(config.breaker_threshold + 2):
+        await circuit_breaker.record("A", False, (), f"error {i}")
+    # 每次失败不通知，打开时通知一次，并附上原因
+    assert len(notices) == 1
+    assert notices[0][0] == "circuit breaker opened"
+    assert f"error {config.breaker_threshold - 1}" in notices[0][1]
+
+def test_breaker_keys_of_feed_source():
+    from src.scraper.examples.feed_source import FeedSource
+    from src.scraper.examples.hot_juejin import HotJuejin
+
+    # 订阅源各自按所在网站熔断，不会因为几个失败的订阅源停掉全部
+    assert not FeedSource.class_breaker
+    assert circuit_breaker.get_breaker_keys("FeedSource", ["https://a.example.org/feed", "USER"]) == ("host:a.example.org",)
+    assert circuit_breaker.get_breaker_keys("FeedSource", ()) == ()
+    assert circuit_breaker.get_breaker_keys(HotJuejin.__name__) == ("class:HotJuejin", "host:juejin.cn")
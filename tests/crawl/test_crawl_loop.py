@@ -0,0 +1,55 @@
+# ruff: noqa: T201
+"""
+对抓取线程的事件循环测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/crawl/test_crawl_loop.py
+"""
+import asyncio
+import threading
+
+import pytest
+
+from src.crawl import crawl_loop
+
+
+@pytest.fixture
+def started_loop():
+    """返回启动函数，需要在测试所在的事件循环中调用"""
+    print("This is run before each crawl loop test")
+    yield lambda: crawl_loop.start(asyncio.get_running_loop())
+    crawl_loop.stop()
+    print("This is run after each crawl loop test")
+
+
+@pytest.mark.asyncio
+async def test_run_in_crawl_loop(started_loop):
+    started_loop()
+    async def where():
+        await asyncio.sleep(0)
+        return threading.current_thread().name, crawl_loop.in_crawl_thread()
+
+    assert await crawl_loop.run_in_crawl_loop(where()) == ("crawl_loop", True)
+    assert not crawl_loop.in_crawl_thread()
+
+@pytest.mark.asyncio
+async def test_cache_update_before_result(started_loop):
+    """缓存的更新先于结果到达网页的循环，请求拿到结果时就能读到缓存"""
+    started_loop()
+    cache = {}
+
+    def update(key):
+        cache[key] = threading.current_thread().name
+
+    async def crawl():
+        crawl_loop.call_in_web_loop(update, "thread")
+        return "done"
+
+    assert await crawl_loop.run_in_crawl_loop(crawl()) == "done"
+    assert cache == {"thread": threading.current_thread().name}
+
+@pytest.mark.asyncio
+async def test_without_crawl_loop():
+    cache = {}
+    crawl_loop.call_in_web_loop(cache.__setitem__, "k", "v")
+    assert cache == {"k": "v"}
+    assert await crawl_loop.run_in_crawl_loop(asyncio.sleep(0, "v")) == "v"
@@ -0,0 +1,62 @@
+# ruff: noqa: T201, SLF001
+"""
+对同一类的实例并发运行测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/crawl/test_crawler.py
+"""
+import asyncio
+
+import pytest
+
+from config_handle import config
+from src.crawl import crawler
+from src.crawl.crawl_error import CrawlInitError
+from src.crawl.crawler import ScraperNameAndParams
+
+
+@pytest.mark.asyncio
+async def test_concurrent_instances(monkeypatch):
+    running, peak = 0, 0
+
+    async def fake_process(scraper: ScraperNameAndParams) -> str:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if scraper.init_params == "bad":
+            raise CrawlInitError(503, "Failed when crawling")
+        return f"source {scraper.init_params}"
+
+    monkeypatch.setattr(crawler, "process_one_instance", fake_process)
+    monkeypatch.setitem(config.scraper_profile, "FeedSource", {"custom_cfg": {"concurrent_instances": 4}})
+    scrapers = tuple(ScraperNameAndParams("FeedSource", str(i), 10, 0) for i in range(10)) + \
+        (ScraperNameAndParams("FeedSource", "bad", 10, 0),)
+    res = await crawler._process_one_kind_of_class(scrapers)
+    # 出错的实例跳过，其他的照常运行
+    assert sorted(res) == sorted(f"source {i}" for i in range(10))
+    assert peak == 4
+
+    peak = 0
+    monkeypatch.setitem(config.scraper_profile, "FeedSource", {})
+    assert len(await crawler._process_one_kind_of_class(scrapers[:3])) == 3
+    assert peak == 1
+
+@pytest.mark.asyncio
+async def test_only_source_failure_backs_off(monkeypatch):
+    codes, failed = iter((400, 422, 423, 500, 503)), []
+
+    async def fake_process(scraper: ScraperNameAndParams):
+        raise CrawlInitError(next(codes), scraper.key)
+
+    monkeypatch.setattr(crawler, "_process_one_instance", fake_process)
+    monkeypatch.setattr(crawler.polling, "record_failure", lambda *args: failed.append(args))
+    scraper = ScraperNameAndParams("FeedSource", "https://example.com/feed", 10, 0)
+    errors = []
+    for _ in range(5):
+        with pytest.raises(CrawlInitError) as e:
+            await crawler.process_one_instance(scraper)
+        errors.append(e.value.code)
+    # 繁忙和参数错误不是源的问题，只有 500 和 503 推迟下次抓取
+    assert errors == [400, 422, 423, 500, 503]
+    assert len(failed) == 2
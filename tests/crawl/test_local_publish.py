@@ -0,0 +1,129 @@
+# ruff: noqa: T201
+"""
+对保存文章的流程测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/crawl/test_local_publish.py
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from src.crawl import local_publish
+from src.crawl.local_publish import goto_uniform_flow, save_articles
+from src.scraper.scraper_error import FailtoGet
+
+
+class FakeDB:
+    def __init__(self):
+        self.stored = []
+
+    def store2database(self, source_name, article):
+        self.stored.append(article)
+
+    def exist_source_meta(self, source_info):
+        pass
+
+    def get_top_n_articles_by_key(self, source_name, n, key):
+        return [dict(a) for a in self.stored[:n]]
+
+
+class FakeRSSCache:
+    def __init__(self):
+        self.saved = {}
+
+    def rss_is_absent(self, source_name):
+        return source_name not in self.saved
+
+    def save_rss_file(self, source_name, rss):
+        self.saved[source_name] = rss
+
+    def cache_rss(self, *args):
+        pass
+
+
+async def slow_source(delays: list[float], closed: list[bool]):
+    try:
+        for i, delay in enumerate(delays):
+            await asyncio.sleep(delay)
+            yield {"title": str(i), "pub_time": datetime(2025, 1, 1, i)}
+    finally:
+        closed[0] = True
+
+
+@pytest_asyncio.fixture()
+async def fake_data():
+    print("This is run before each local_publish test")
+    yield SimpleNamespace(db_intf=FakeDB(), rss_cache=FakeRSSCache())
+    print("This is run after each local_publish test")
+
+
+@pytest.mark.asyncio
+async def test_save_all(fake_data):
+    got_new, closed, pub_times = [False], [False], []
+    timed_out = await save_articles(fake_data, "t", slow_source([0, 0, 0], closed), got_new, 50, pub_times, 1, 1)
+    assert not timed_out
+    assert got_new[0]
+    assert len(fake_data.db_intf.stored) == 3
+    assert len(pub_times) == 3
+    assert closed[0]
+
+@pytest.mark.asyncio
+async def test_article_timeout(fake_data):
+    got_new, closed = [False], [False]
+    timed_out = await save_articles(fake_data, "t", slow_source([0, 0, 5], closed), got_new, 50, None, 10, 0.1)
+    assert timed_out
+    assert got_new[0]
+    assert len(fake_data.db_intf.stored) == 2
+    assert closed[0]
+
+@pytest.mark.asyncio
+async def test_instance_timeout(fake_data):
+    got_new, closed = [False], [False]
+    timed_out = await save_articles(fake_data, "t", slow_source([0.05] * 20, closed), got_new, 50, None, 0.3, 1)
+    assert timed_out
+    assert 0 < len(fake_data.db_intf.stored) < 20
+    assert closed[0]
+
+@pytest.mark.asyncio
+async def test_fail_to_get(fake_data):
+    async def broken_source(closed: list[bool]):
+        try:
+            yield {"title": "0", "pub_time": datetime(2025, 1, 1)}
+            raise FailtoGet()
+        finally:
+            closed[0] = True
+
+    got_new, closed = [False], [False]
+    with pytest.raises(FailtoGet):
+        await save_articles(fake_data, "t", broken_source(closed), got_new, 50, None, 1, 1)
+    # 出错前的文章已保存，调用者据此生成 RSS
+    assert got_new[0]
+    assert len(fake_data.db_intf.stored) == 1
+    assert closed[0]
+
+@pytest.mark.asyncio
+async def test_partial_result_kept(fake_data, monkeypatch):
+    class BrokenScraper:
+        source_info = {"table_name": "t", "key4sort": "pub_time", "access": None}
+        max_wait_time = 10
+
+        def __init__(self, articles: int):
+            self.articles = articles
+
+        async def get(self, flags, sequence):
+            for i in range(self.articles):
+                yield {"title": str(i), "pub_time": datetime(2025, 1, 1, i), "time4sort": datetime(2025, 1, 1, i)}
+            raise FailtoGet()
+
+    monkeypatch.setattr(local_publish, "generate_rss", lambda _, articles: f"{len(articles)} articles")
+    # 出错前保存了新文章的，照常生成 RSS 并返回，只是标记为失败
+    failed = [False]
+    assert await goto_uniform_flow(fake_data, BrokenScraper(2), 10, None, failed) == "t"
+    assert failed[0]
+    assert fake_data.rss_cache.saved["t"] == "2 articles"
+    # 没有新文章的，依然引发异常
+    with pytest.raises(FailtoGet):
+        await goto_uniform_flow(fake_data, BrokenScraper(0), 10, None, [False])
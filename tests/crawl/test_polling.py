@@ -0,0 +1,68 @@
+# ruff: noqa: T201
+"""
+对自适应抓取频率测试
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/crawl/test_polling.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.crawl.polling import update_polling, update_polling_failure
+
+BOUNDS = (3600, 86400 * 7)
+
+
+@pytest.fixture
+def setup_and_tear_down():
+    print("This is run before each polling test")
+    yield
+    print("This is run after each polling test")
+
+def test_first_run(setup_and_tear_down):
+    now = datetime(2025, 1, 1, 12)
+    info = update_polling(None, "HotBilibili:[]", "hot_bilibili", [], now, BOUNDS)
+    assert info["mean_interval"] is None
+    assert BOUNDS[0] <= info["poll_interval"] <= BOUNDS[1]
+    assert info["next_due"] == now + timedelta(seconds=info["poll_interval"])
+
+def test_hot_source_polled_more(setup_and_tear_down):
+    now = datetime(2025, 1, 1, 12)
+    pub_times = [now - timedelta(hours=h) for h in range(10, 0, -2)]
+    info = update_polling(None, "k", "t", pub_times, now, BOUNDS)
+    assert info["mean_interval"] == pytest.approx(7200)
+    assert info["poll_interval"] == BOUNDS[0]
+    assert info["new_count"] == len(pub_times)
+    assert info["last_pub_time"] == pub_times[-1]
+
+def test_dormant_source_backs_off(setup_and_tear_down):
+    now = datetime(2025, 1, 1, 12)
+    info = update_polling(None, "k", "t", [now - timedelta(days=90)], now, BOUNDS)
+    intervals = []
+    for i in range(30):
+        info = update_polling(info, "k", "t", [], now + timedelta(days=i), BOUNDS)
+        intervals.append(info["poll_interval"])
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == BOUNDS[1]
+
+def test_new_article_shrinks_interval(setup_and_tear_down):
+    now = datetime(2025, 1, 1, 12)
+    info = update_polling(None, "k", "t", [now - timedelta(days=2)], now, BOUNDS)
+    for _ in range(15):
+        info = update_polling(info, "k", "t", [], now, BOUNDS)
+    backed_off = info["poll_interval"]
+    info = update_polling(info, "k", "t", [now], now, BOUNDS)
+    assert info["poll_interval"] < backed_off
+    assert info["mean_interval"] == pytest.approx(86400 * 2)
+
+def test_failure_backs_off(setup_and_tear_down):
+    now = datetime(2025, 1, 1, 12)
+    info = update_polling(None, "k", "t", [now - timedelta(days=2)], now, BOUNDS)
+    poll = info["poll_interval"]
+    info = update_polling_failure(info, now, BOUNDS)
+    assert info["poll_interval"] == poll * 2
+    assert info["next_due"] == now + timedelta(seconds=poll * 2)
+    for i in range(20):
+        info = update_polling_failure(info, now + timedelta(days=i), BOUNDS)
+    assert info["poll_interval"] == BOUNDS[1]
+    assert info["table_name"] == "t"
@@ -4,10 +4,11 @@
 
 SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/data/test_db.py
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 
+from src.data import PollingDict
 from src.data.sqlite_intf import DatabaseIntf, SQliteConnInfo, SQliteIntf
 from src.scraper import AccessLevel, ArticleDict, SortKey, SrcMetaDict
 
@@ -53,3 +54,64 @@ def test_sqlite(setup_and_tear_down):
     a = db_intf.get_top_n_articles_by_key(source_info["name"], 1, source_info["key4sort"])
     for key in article:
         assert a[0][key] == article[key]
+
+def test_polling_info(setup_and_tear_down):
+    info = SQliteConnInfo("sqlite:///tests/config_and_data_files/test.db")
+    db_intf: DatabaseIntf = SQliteIntf.connect(info)
+
+    db_intf._clear_db()
+    now = datetime.now().replace(microsecond=0)
+    polling: PollingDict = {
+        "scraper_key": 'BilibiliUp:["138624168"]',
+        "table_name": "bilibili_up_138624168",
+        "mean_interval": None,
+        "poll_interval": 3600.0,
+        "last_pub_time": None,
+        "last_crawl_time": now,
+        "next_due": now,
+        "new_count": 0,
+    }
+    assert db_intf.get_polling_info(polling["scraper_key"]) is None
+    db_intf.set_polling_info(polling)
+    assert db_intf.get_polling_info(polling["scraper_key"]) == polling
+    polling["mean_interval"] = 7200.0
+    polling["new_count"] = 3
+    db_intf.set_polling_info(polling)
+    assert db_intf.get_all_polling_info() == [polling]
+    assert db_intf.get_not_due_keys(now) == set()
+    assert db_intf.get_not_due_keys(now - timedelta(seconds=1)) == {polling["scraper_key"]}
+
+def test_lease(setup_and_tear_down):
+    info = SQliteConnInfo("sqlite:///tests/config_and_data_files/test.db")
+    db_intf: DatabaseIntf = SQliteIntf.connect(info)
+
+    db_intf._clear_db()
+    name = "crawl:HotBilibili:[]"
+    assert db_intf.acquire_lease(name, "worker1", 60)
+    assert db_intf.acquire_lease(name, "worker1", 60)   # 续期
+    assert not db_intf.acquire_lease(name, "worker2", 60)
+    assert db_intf.get_lease_owner(name) == "worker1"
+    assert [lease["owner"] for lease in db_intf.get_all_leases()] == ["worker1"]
+    db_intf.release_lease(name, "worker2")
+    assert db_intf.get_lease_owner(name) == "worker1"
+    db_intf.release_lease(name, "worker1")
+    assert db_intf.get_lease_owner(name) is None
+    # 过期的租约可以被其他进程取得
+    assert db_intf.acquire_lease(name, "worker1", -1)
+    assert db_intf.get_lease_owner(name) is None
+    assert db_intf.acquire_lease(name, "worker2", 60)
+    assert db_intf.get_lease_owner(name) == "worker2"
+
+def test_rss_change(setup_and_tear_down):
+    info = SQliteConnInfo("sqlite:///tests/config_and_data_files/test.db")
+    db_intf: DatabaseIntf = SQliteIntf.connect(info)
+
+    db_intf._clear_db()
+    assert db_intf.get_last_rss_change_id() == 0
+    db_intf.add_rss_change("hot_bilibili")
+    last_id = db_intf.get_last_rss_change_id()
+    db_intf.add_rss_change("bilibili_up_138624168")
+    db_intf.add_rss_change("hot_bilibili")
+    changes = db_intf.get_rss_changes(last_id)
+    assert [name for _, name in changes] == ["bilibili_up_138624168", "hot_bilibili"]
+    assert changes[-1][0] == db_intf.get_last_rss_change_id()
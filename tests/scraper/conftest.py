@@ -0,0 +1,20 @@
+import httpx
+import pytest
+
+from config_handle import config
+from src.scraper import cassette, feed_stream
+
+
+@pytest.fixture
+def feed_client(monkeypatch, tmp_path):
+    """返回的函数用 handler 构造客户端，订阅源的请求都交给它处理，缓存放在临时目录。
+    和 get_client 一样包装传输层，可以录制和回放"""
+    monkeypatch.setattr(config, "enable_http_cache", True)
+    monkeypatch.setattr(config, "http_cache_dir", str(tmp_path))
+
+    def serve(handler) -> httpx.AsyncClient:
+        client = cassette.wrap(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(feed_stream, "get_client", lambda *_: client)
+        return client
+
+    return serve
@@ -0,0 +1,87 @@
+"""
+对转发订阅源的抓取器测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/scraper/test_feed_source.py
+"""
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+from config_handle import config
+from src.scraper.examples.feed_source import FeedSource
+from src.scraper.model import AccessLevel
+from src.scraper.scraper_error import CreateButRequestFail, CreateByInvalidParam
+
+ITEMS = "".join(f"""<item><title>文章 {i}</title><link>https://example.com/{i}</link><description>摘要 {i}</description>
+<pubDate>Mon, {20 - i:02d} Jan 2025 08:00:00 GMT</pubDate></item>""" for i in range(20))
+UNDATED = """<item><title>置顶</title><link>https://example.com/pinned</link><description>没有发布时间</description></item>"""
+RSS = f"""<rss version="2.0"><channel><title>示例博客</title><link>https://example.com/</link>
+<description>博客</description><language>zh-CN</language>{UNDATED}{ITEMS}</channel></rss>""".encode()
+
+
+@pytest.fixture
+def feed_source(feed_client, monkeypatch):
+    """返回请求过的路径"""
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        return httpx.Response(200, content=RSS) if request.url.path == "/feed" else httpx.Response(404)
+
+    monkeypatch.setattr(FeedSource, "infos", {})
+    feed_client(handler)
+    return requested
+
+
+def test_create(feed_source):
+    async def main():
+        with pytest.raises(CreateByInvalidParam):
+            await FeedSource.create("example.com/feed")
+        with pytest.raises(CreateByInvalidParam):
+            await FeedSource.create("https://example.com/feed", "ROOT")
+        with pytest.raises(CreateButRequestFail):
+            await FeedSource.create("https://example.com/missing")
+        instance = await FeedSource.create("https://example.com/feed", "USER")
+        # 信息已在进程内记住，再次创建不发请求
+        again = await FeedSource.create("https://example.com/feed")
+        return instance, again
+
+    instance, again = asyncio.run(main())
+    info = instance.source_info
+    assert (info["name"], info["link"], info["desc"], info["access"]) == ("示例博客", "https://example.com/", "博客", AccessLevel.USER)
+    assert info["table_name"].startswith("feed_source_")
+    assert again.source_info["access"] is AccessLevel.PUBLIC
+    assert feed_source == ["/missing", "/feed"]
+
+
+def test_get(feed_source):
+    async def main():
+        instance = await FeedSource.create("https://example.com/feed")
+        first = [a async for a in instance.get({"amount": 3})]
+        newer = [a async for a in instance.get({"pub_time": datetime(2025, 1, 17, 8)})]
+        return first, newer
+
+    first, newer = asyncio.run(main())
+    # 没有发布时间的条目不会每次都被当作新文章
+    assert [a["title"] for a in first] == ["文章 0", "文章 1", "文章 2"]
+    assert first[0]["summary"] == "摘要 0"
+    assert [a["title"] for a in newer] == ["文章 0", "文章 1", "文章 2"]
+    assert feed_source.count("/feed") == 3
+
+
+def test_replay(feed_source, monkeypatch, tmp_path):
+    async def crawl() -> list[str]:
+        FeedSource.infos.clear()
+        instance = await FeedSource.create("https://example.com/feed")
+        return [a["title"] async for a in instance.get({"amount": 3})]
+
+    monkeypatch.setattr(config, "cassette_dir", str(tmp_path / "cassettes"))
+    monkeypatch.setattr(config, "cassette_mode", "record")
+    recorded = asyncio.run(crawl())
+    requested = len(feed_source)
+    # 回放时不访问网络，得到同样的文章
+    monkeypatch.setattr(config, "cassette_mode", "replay")
+    assert asyncio.run(crawl()) == recorded == ["文章 0", "文章 1", "文章 2"]
+    assert len(feed_source) == requested
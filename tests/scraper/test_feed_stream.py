@@ -0,0 +1,88 @@
+"""
+对边下载边解析订阅源测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/scraper/test_feed_stream.py
+"""
+import asyncio
+from datetime import datetime
+
+import httpx
+
+from src.scraper import feed_stream, http_cache
+
+URL = "https://example.com/feed"
+ENTRIES = "".join(f"""<entry><title>视频 {i}</title><link rel="alternate" href="https://example.com/v/{i}"/>
+<published>2025-03-{20 - i:02d}T08:00:00+08:00</published><media:group><media:title>媒体标题</media:title>
+<media:thumbnail url="https://example.com/{i}.jpg"/><media:description>描述 {i}</media:description></media:group></entry>"""
+                  for i in range(50))
+ATOM = f"""<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom"
+xmlns:media="http://search.yahoo.com/mrss/" xml:lang="en"><title>示例频道</title>
+<link rel="alternate" href="https://example.com/"/>{ENTRIES}</feed>""".encode()
+RSS = b"""<rss version="2.0"><channel><title>RSS</title><link>https://example.com/</link><description>d</description>
+<item><title>a</title><link>https://example.com/a</link><pubDate>Mon, 03 Mar 2025 08:00:00 GMT</pubDate>
+<enclosure url="https://example.com/a.png" type="image/png"/></item></channel></rss>"""
+
+
+def atom_with_etag(sent: list):
+    """ETag 相同时返回 304"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"etag": '"1"'}, content=ATOM)
+    return handler
+
+
+def test_fetch_feed_stops_early(feed_client):
+    async def main():
+        async with feed_client(atom_with_etag([])):
+            info_only = await feed_stream.fetch_feed(URL, limit=0)
+            first = await feed_stream.fetch_feed(URL, limit=10, chunk_size=1024)
+            newer = await feed_stream.fetch_feed(URL, stop_at=datetime(2025, 3, 17))
+        return info_only, first, newer
+
+    info_only, first, newer = asyncio.run(main())
+    assert (info_only.info.title, info_only.info.link, info_only.info.language) == ("示例频道", "https://example.com/", "en")
+    assert info_only.entries == []
+    assert len(first.entries) == 10
+    assert first.stopped_early
+    assert first.bytes_read < len(ATOM)
+    e = first.entries[0]
+    assert (e.title, e.link, e.image, e.summary) == ("视频 0", "https://example.com/v/0", "https://example.com/0.jpg", "描述 0")
+    assert e.published == datetime(2025, 3, 20)
+    # 北京时间 3 月 17 日 8 点是 UTC 0 点，不晚于 stop_at ，在它之前停止
+    assert [x.title for x in newer.entries] == ["视频 0", "视频 1", "视频 2"]
+
+
+def test_fetch_feed_conditional(feed_client):
+    sent = []
+
+    async def main():
+        async with feed_client(atom_with_etag(sent)):
+            await feed_stream.fetch_feed(URL, limit=10, cache=True)
+            unchanged = await feed_stream.fetch_feed(URL, stop_at=datetime(2025, 3, 17), cache=True)
+            # 抓取中途失败，没有提交，下次不能得到 304
+            with http_cache.deferred("k"):
+                await feed_stream.fetch_feed(URL, limit=1, cache=True)
+            with http_cache.deferred("k"):
+                uncommitted = await feed_stream.fetch_feed(URL, stop_at=datetime(2025, 3, 17), cache=True)
+                http_cache.commit_pending()
+            with http_cache.deferred("k"):
+                committed = await feed_stream.fetch_feed(URL, stop_at=datetime(2025, 3, 17), cache=True)
+        return unchanged, uncommitted, committed
+
+    unchanged, uncommitted, committed = asyncio.run(main())
+    assert unchanged.not_modified
+    assert not uncommitted.not_modified
+    assert committed.not_modified
+    assert sent == [None, '"1"', None, None, '"1"']
+
+
+def test_fetch_rss(feed_client):
+    async def main():
+        async with feed_client(lambda _: httpx.Response(200, content=RSS)):
+            return await feed_stream.fetch_feed(URL)
+
+    plain = asyncio.run(main())
+    assert plain.info.description == "d"
+    assert (plain.entries[0].image, plain.entries[0].published) == ("https://example.com/a.png", datetime(2025, 3, 3, 8))
@@ -1,14 +1,25 @@
-# ruff: noqa: T201, SLF001
+# ruff: noqa: T201, SLF001, ASYNC109
 """
 对提供的工具，如 AsyncBrowserManager 等测试
 
 SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/scraper/test_tools.py
 """
+import asyncio
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
 import pytest
 import pytest_asyncio
+from playwright.async_api import TimeoutError as PwTimeoutError
 
+from config_handle import config
+from src.scraper import block_profiles, cassette, http_cache, http_client, robots, tools
 from src.scraper.scraper import WebsiteScraper
-from src.scraper.tools import create_rp
+from src.scraper.tools import AsyncBrowserManager, ReadyCondition, admission_priority, create_rp, get_response_or_none
 
 
 @pytest.fixture
@@ -67,3 +78,568 @@ Allow: /foo.html
     assert not rp.can_fetch("source2RSSbot", "https://example.com/foo.html")
     assert rp.can_fetch("source2RSSbot", "https://example.com/fuzz.html")
     assert rp.can_fetch("googlebot", "https://example.com/foo.html")
+
+
+@pytest.mark.asyncio
+async def test_cassette_replay(async_setup_and_tear_down, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "cassette_dir", str(tmp_path))
+    url, params = "https://example.com/api", {"page": 1}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, json={"posted": request.content.decode()})
+        return httpx.Response(200, headers={"content-type": "application/json"}, content=b'{"ok": true}')
+
+    # 直接使用客户端的请求也经过传输层录制，包括 POST
+    monkeypatch.setattr(config, "cassette_mode", "record")
+    async with httpx.AsyncClient(transport=cassette.CassetteTransport(httpx.MockTransport(handler))) as client:
+        assert (await client.get(url, params=params)).json() == {"ok": True}
+        assert (await client.post(url, data={"page": "2"})).json() == {"posted": "page=2"}
+    cassette.save_html(url, "<html></html>")
+
+    monkeypatch.setattr(config, "cassette_mode", "replay")
+    response = await get_response_or_none(url, params=params)
+    assert response is not None
+    assert response.json() == {"ok": True}
+    assert response.headers["content-type"] == "application/json"
+    assert await get_response_or_none(url, params={"page": 2}) is None
+    assert (await http_client.get_client().post(url, data={"page": "2"})).json() == {"posted": "page=2"}
+    # 没有录制的请求不访问网络
+    with pytest.raises(httpx.ConnectError):
+        await http_client.get_client().post(url, data={"page": "3"})
+    assert await AsyncBrowserManager.get_html_or_none("test", url, None) == "<html></html>"
+    await http_client.close_clients()
+
+
+def test_shared_http_client(monkeypatch):
+    monkeypatch.setattr(config, "http_max_per_host", 2)
+
+    async def main():
+        client = http_client.get_client()
+        assert http_client.get_client() is client
+        assert http_client.get_client("http://127.0.0.1:1080") is not client
+        assert len(http_client.pool_stats()) == 2
+
+        running, most = 0, 0
+        async def request():
+            nonlocal running, most
+            async with http_client.host_slot("https://example.com/a"):
+                running += 1
+                most = max(most, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+        await asyncio.gather(*(request() for _ in range(5)))
+        assert most == 2
+
+        await http_client.close_clients()
+        assert client.is_closed
+        assert http_client.get_client() is not client
+        await http_client.close_clients()
+
+    asyncio.run(main())
+
+
+def test_http_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "enable_http_cache", True)
+    monkeypatch.setattr(config, "http_cache_dir", str(tmp_path))
+    bodies = [b"<rss>1</rss>", b"<rss>1</rss>", None, b"<rss>2</rss>"]
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request.headers.get("if-none-match"))
+        body = bodies[len(sent) - 1]
+        if body is None:
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"etag": f'"{len(sent)}"'}, content=body)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(tools, "get_client", lambda *_: client)
+            url = "https://example.com/feed"
+            results = [await get_response_or_none(url, cache=True) for _ in bodies]
+        return results
+
+    token = http_cache.current_scraper.set("test_http_cache")
+    try:
+        results = asyncio.run(main())
+    finally:
+        http_cache.current_scraper.reset(token)
+    assert sent == [None, '"1"', '"2"', '"2"']
+    assert [http_cache.is_unchanged(r) for r in results] == [False, True, True, False]
+    assert results[2].content == b"<rss>1</rss>"
+    stat = http_cache.stats["test_http_cache"]
+    assert (stat.requests, stat.not_modified, stat.same_hash, stat.bytes_saved) == (4, 1, 1, 12)
+
+
+def test_http_cache_deferred(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "enable_http_cache", True)
+    monkeypatch.setattr(config, "http_cache_dir", str(tmp_path))
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"etag": '"1"'}, content=b"<rss>1</rss>")
+
+    async def fetch(owner: str, commit: bool) -> bool:
+        with http_cache.deferred(owner):
+            response = await get_response_or_none("https://example.com/feed", cache=True)
+            if commit:
+                http_cache.commit_pending()
+        return http_cache.is_unchanged(response)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(tools, "get_client", lambda *_: client)
+            # 中途失败的抓取没有提交，下次仍视为有变化
+            failed = await fetch("a", False)
+            retried = await fetch("a", True)
+            unchanged = await fetch("a", True)
+            # 另一个实例请求同一网址，不受前一个的缓存影响
+            other = await fetch("b", True)
+        return failed, retried, unchanged, other
+
+    assert asyncio.run(main()) == (False, False, True, False)
+    assert sent == [None, None, '"1"', None]
+
+
+def test_http_cache_prune(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "http_cache_dir", str(tmp_path))
+    monkeypatch.setattr(config, "http_cache_ttl", 100)
+    monkeypatch.setattr(config, "http_cache_max_mb", 1)
+    now = time.time()
+    for name, age in (("stale", 200), ("old", 50), ("new", 10)):
+        (tmp_path / f"{name}.json").write_bytes(b"x" * 400 * 1024)
+        os.utime(tmp_path / f"{name}.json", (now - age, now - age))
+    # 过期的删除，剩下的仍超过 1 MB 时删除最久没有用到的
+    assert http_cache.prune(now) == 1
+    assert sorted(p.stem for p in tmp_path.iterdir()) == ["new", "old"]
+    (tmp_path / "newest.json").write_bytes(b"x" * 400 * 1024)
+    assert http_cache.prune(now) == 1
+    assert sorted(p.stem for p in tmp_path.iterdir()) == ["new", "newest"]
+
+
+def test_robots_cache(monkeypatch):
+    monkeypatch.setattr(config, "respect_robots_txt", True)
+    fetched = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/robots.txt":
+            fetched.append(request.url.host)
+            if request.url.host == "down.example.com":
+                return httpx.Response(503)
+            return httpx.Response(200, text="User-agent: *\nDisallow: /private/\nCrawl-delay: 2\n")
+        return httpx.Response(200, text="ok")
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(tools, "get_client", lambda *_: client)
+            monkeypatch.setattr(robots, "get_client", lambda *_: client)
+            assert await get_response_or_none("https://robots.example.com/private/a") is None
+            for _ in range(3):
+                assert await get_response_or_none("https://robots.example.com/public") is not None
+            assert [round(s) for s in slept] == [0, 2, 4]
+            assert await get_response_or_none("https://down.example.com/private/a") is not None
+            assert not (await create_rp("https://robots.example.com/robots.txt")).can_fetch("source2RSSbot", "/private/")
+
+    slept = []
+    async def sleep(seconds):
+        slept.append(seconds)
+    monkeypatch.setattr(robots, "asyncio", SimpleNamespace(sleep=sleep))
+    monkeypatch.setattr(robots, "_cache", {})
+    monkeypatch.setattr(robots, "_next_request_at", {})
+    asyncio.run(main())
+    assert fetched == ["robots.example.com", "down.example.com"]
+    assert not dict(robots.all_entries())["https://down.example.com"].fetched
+
+
+def test_context_admission(monkeypatch):
+    monkeypatch.setattr(config, "browser_queue_timeout", 0.2)
+    granted = []
+
+    async def use(id_, priority=tools.Priority.SCHEDULED, hold=0.01):
+        admission_priority.set(priority)
+        await AsyncBrowserManager.waiting_operation(id_, 1)
+        granted.append(id_)
+        await asyncio.sleep(hold)
+        AsyncBrowserManager._release(AsyncBrowserManager._state(), 1)
+
+    async def main():
+        first = asyncio.create_task(use("first", hold=0.05))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(use(f"scheduled{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(use("interactive", tools.Priority.INTERACTIVE)))
+        await asyncio.gather(first, *waiting)
+        assert AsyncBrowserManager._state().users == 0
+
+        blocker = asyncio.create_task(use("blocker", hold=0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(TimeoutError):
+            await use("late")
+        await blocker
+        state = AsyncBrowserManager._state()
+        assert (state.users, state.users_that_is_waiting, state.waiters) == (0, 0, [])
+
+    asyncio.run(main())
+    assert granted == ["first", "interactive", "scheduled0", "scheduled1", "blocker"]
+
+
+class FakePage:
+    def __init__(self):
+        self.closed, self.visited = False, []
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+    async def unroute_all(self, behavior=None):
+        pass
+
+    async def goto(self, url, **_):
+        self.visited.append(url)
+
+
+class FakeContext:
+    def __init__(self, storage_state):
+        self.loaded_state, self.pages, self.closed = storage_state, [], False
+        self.saved, self.cleared, self.routes, self.permissions_cleared = [], 0, [], 0
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def new_page(self):
+        self.pages.append(page := FakePage())
+        return page
+
+    async def unroute_all(self, behavior=None):
+        pass
+
+    async def clear_cookies(self):
+        self.cleared += 1
+
+    async def clear_permissions(self):
+        self.permissions_cleared += 1
+
+    async def storage_state(self, path):
+        self.saved.append(path)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts, self.handlers, self.closed = [], [], False
+
+    async def new_browser_cdp_session(self):
+        async def send(method):
+            return {"processInfo": [{"type": "gpu", "id": 2}, {"type": "browser", "id": 1}]}
+
+        async def detach():
+            pass
+        return SimpleNamespace(send=send, detach=detach)
+
+    async def new_context(self, storage_state=None, **_):
+        self.contexts.append(context := FakeContext(storage_state))
+        return context
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    async def close(self):
+        self.closed = True
+
+    def crash(self):
+        for handler in self.handlers:
+            handler(self)
+
+
+def test_context_pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "context_max_uses", 3)
+    monkeypatch.setattr(config, "max_opening_context", 2)
+    state_path = tmp_path / "state.json"
+
+    async def main():
+        browser = AsyncBrowserManager._state().instances[0].browser = FakeBrowser()
+        pages = []
+        for _ in range(4):
+            manager = AsyncBrowserManager("juejin", "ua")
+            async with manager:
+                pages.append(await manager.new_page())
+        # 前三次用的是同一个上下文和页面，第四次换了新的
+        assert len(browser.contexts) == 2
+        assert pages[0] is pages[1] is pages[2] is not pages[3]
+        assert browser.contexts[0].closed
+        assert browser.contexts[0].cleared == browser.contexts[0].permissions_cleared == 2
+        assert pages[0].visited == ["about:blank", "about:blank"]
+
+        async with AsyncBrowserManager("bili", "ua", storage_state=str(state_path)) as context:
+            extra = await context.new_page()
+        state_path.write_text("{}")
+        async with AsyncBrowserManager("bili", "ua", storage_state=str(state_path)) as again:
+            assert again is context
+        assert extra.closed
+        assert context.cleared == 0
+        assert context.saved == [str(state_path)] * 2
+        assert context.loaded_state is None
+        # 不同的使用者不共用上下文，避免 localStorage 等带到别的抓取器
+        async with AsyncBrowserManager("other", "ua") as other:
+            assert other not in (browser.contexts[1], context)
+        AsyncBrowserManager._state().instances[0].browser = None
+
+    asyncio.run(main())
+
+
+def test_browser_memory_sampling(monkeypatch):
+    import os
+    monkeypatch.setattr(config, "browser_memory_interval", 3600)
+    instance = tools._BrowserInstance(0, browser=object(), pids=[os.getpid()])
+
+    async def main():
+        await instance.sample_rss()
+        first = instance.rss
+        # 间隔内不再读取 /proc
+        instance.pids = []
+        await instance.sample_rss()
+        return first
+
+    first = asyncio.run(main())
+    assert first > 0
+    assert instance.rss == first
+
+def test_browser_instances(monkeypatch):
+    monkeypatch.setattr(config, "browser_instances", 2)
+    monkeypatch.setattr(config, "max_opening_context", 2)
+    monkeypatch.setattr(config, "browser_max_pages", 3)
+    launched = []
+
+    async def launch(headless):
+        launched.append(browser := FakeBrowser())
+        return browser
+
+    async def main():
+        state = AsyncBrowserManager._state()
+        state.playwright = SimpleNamespace(chromium=SimpleNamespace(launch=launch))
+        # 同时使用时分到不同的浏览器
+        async with AsyncBrowserManager("a", "ua"), AsyncBrowserManager("b", "ua"):
+            assert [i.users for i in state.instances] == [1, 1]
+        assert len(launched) == 2
+        # 浏览器的主进程由浏览器自己报告
+        assert [i.pids for i in state.instances] == [[1], [1]]
+        # 崩溃后下次分配到时重新启动
+        launched[0].crash()
+        assert state.instances[0].browser is None
+        async with AsyncBrowserManager("a", "ua"), AsyncBrowserManager("b", "ua"):
+            pass
+        assert len(launched) == 3
+        assert state.instances[0].crashes == 1
+        # 使用次数达到阈值后，用完即关闭
+        for _ in range(3):
+            async with AsyncBrowserManager("b", "ua"):
+                pass
+        assert launched[1].closed
+        stats = AsyncBrowserManager.instance_stats()
+        assert [(s["launches"], s["recycles"]) for s in stats if s["index"] == 1] == [(1, 1)]
+        state.playwright = None
+        for instance in state.instances:
+            instance.browser = None
+
+    asyncio.run(main())
+
+
+def test_capture_json(monkeypatch, tmp_path):
+    class XhrPage(FakePage):
+        def __init__(self):
+            super().__init__()
+            self.handlers, self.loading = [], None
+
+        def on(self, event, handler):
+            self.handlers.append(handler)
+
+        def remove_listener(self, event, handler):
+            self.handlers.remove(handler)
+
+        async def goto(self, url, **_):
+            self.visited.append(url)
+            if url == "about:blank":
+                # 中断正在进行的加载
+                self.loading.set_exception(Exception("navigation interrupted"))
+                return
+            self.loading = asyncio.get_running_loop().create_future()
+            for api in ("/api/other", "/api/feed"):
+                response = SimpleNamespace(url=f"https://example.com{api}?page=1", json=lambda api=api: asyncio.sleep(0, {"api": api}))
+                for handler in self.handlers:
+                    asyncio.create_task(handler(response))
+            await self.loading   # 图片等资源一直没加载完
+
+    pages = []
+    async def new_page(self):
+        pages.append(page := XhrPage())
+        return page
+    monkeypatch.setattr(FakeContext, "new_page", new_page)
+    monkeypatch.setattr(config, "cassette_dir", str(tmp_path))
+
+    async def main():
+        state = AsyncBrowserManager._state()
+        state.instances[0].browser = FakeBrowser()
+        start = time.perf_counter()
+        captured = await AsyncBrowserManager.capture_json("bili", "https://example.com/", "ua", ["/api/feed"], timeout=5)
+        assert captured == {"/api/feed": {"api": "/api/feed"}}
+        assert time.perf_counter() - start < 1
+        assert pages[0].handlers == []
+        assert pages[0].visited == ["https://example.com/", "about:blank", "about:blank"]
+        # 没有匹配的响应时，超时后返回空
+        captured = await AsyncBrowserManager.capture_json("bili", "https://example.com/", "ua", ["/api/none"], timeout=0.1)
+        assert captured == {}
+
+        # 录制后回放，不打开网页
+        monkeypatch.setattr(config, "cassette_mode", "record")
+        recorded = await AsyncBrowserManager.capture_json("bili", "https://example.com/", "ua", ["/api/feed"], timeout=5)
+        monkeypatch.setattr(config, "cassette_mode", "replay")
+        opened = len(pages)
+        assert await AsyncBrowserManager.capture_json("bili", "https://example.com/", "ua", ["/api/feed"]) == recorded
+        assert await AsyncBrowserManager.capture_json("bili", "https://example.com/", "ua", ["/api/other"]) == {}
+        assert len(pages) == opened
+        # 直接使用上下文的，回放时请求都被中止
+        async with AsyncBrowserManager("bili", "ua") as context:
+            assert context.routes[-1] == ("**/*", tools._abort_in_replay)
+        state.instances[0].browser = None
+
+    asyncio.run(main())
+
+
+def test_block_profiles():
+    page = "https://www.bilibili.com/video/1"
+    no_media, text_only, no_third_party = (block_profiles.get_profile(n) for n in ("no_media", "text_only", "no_third_party"))
+    assert no_media.blocks("image", "https://i0.hdslb.com/a.png", page)
+    assert not no_media.blocks("script", "https://www.googletagmanager.com/gtm.js", page)
+    assert text_only.blocks("stylesheet", "https://www.bilibili.com/a.css", page)
+    assert text_only.blocks("script", "https://www.googletagmanager.com/gtm.js", page)
+    assert not text_only.blocks("xhr", "https://api.bilibili.com/x/space", page)
+    assert no_third_party.blocks("script", "https://cdn.example.com/a.js", page)
+    assert not no_third_party.blocks("xhr", "https://api.bilibili.com/x/space", page)
+    with pytest.raises(ValueError, match="unknown block profile"):
+        AsyncBrowserManager("test", route_policy="no_such_profile")
+
+    class Route:
+        def __init__(self, resource_type, url):
+            self.request = SimpleNamespace(resource_type=resource_type, url=url, is_navigation_request=lambda: False,
+                                           frame=SimpleNamespace(page=SimpleNamespace(url=page)))
+            self.result = ""
+        async def abort(self):
+            self.result = "abort"
+        async def continue_(self):
+            self.result = "continue"
+
+    handler = block_profiles.make_handler("no_media")
+    routes = [Route("image", "https://i0.hdslb.com/a.png"), Route("font", "https://www.bilibili.com/a.woff"),
+              Route("xhr", "https://api.bilibili.com/x/space")]
+    before = block_profiles.stats["no_media"].requests
+    async def main():
+        for r in routes:
+            await handler(r)
+    asyncio.run(main())
+    assert [r.result for r in routes] == ["abort", "abort", "continue"]
+    assert block_profiles.stats["no_media"].requests - before == 2
+
+
+def test_ready_condition():
+    class Page:
+        def __init__(self, selector_delay, response_delay):
+            self.selector_delay, self.response_delay, self.goto_args = selector_delay, response_delay, None
+
+        async def goto(self, url, timeout, wait_until):
+            self.goto_args = (wait_until, timeout)
+
+        async def wait_for_selector(self, selector, state, timeout):
+            if self.selector_delay * 1000 > timeout:
+                await asyncio.sleep(timeout / 1000)
+                raise PwTimeoutError("selector")
+            await asyncio.sleep(self.selector_delay)
+
+        async def wait_for_response(self, predicate, timeout):
+            await asyncio.sleep(self.response_delay)
+            return predicate(SimpleNamespace(url="https://api.example.com/feed?page=1"))
+
+    async def main():
+        # 满足其中一个条件就返回
+        page = Page(selector_delay=10, response_delay=0.01)
+        start = time.perf_counter()
+        await ReadyCondition(selector="div.list", response="/feed", timeout=5).wait(page, "https://example.com")
+        assert time.perf_counter() - start < 1
+        assert page.goto_args[0] == "domcontentloaded"
+
+        with pytest.raises(PwTimeoutError):
+            await ReadyCondition(selector="div.list", timeout=0.05).wait(Page(10, 10), "https://example.com")
+
+    asyncio.run(main())
+
+
+def test_parse_html_parity():
+    """parse_html 和 BeautifulSoup 读取保存的网页，结果相同"""
+    from bs4 import BeautifulSoup
+
+    from benchmarks.html_parse import QUERIES, load
+
+    for name, (query, only) in QUERIES.items():
+        html = load(name)
+        expected = query(BeautifulSoup(html, features="lxml"))
+        assert query(tools.parse_html(html)) == expected, name
+        assert query(tools.parse_html(html, only)) == expected, name
+
+
+def test_parse_html_node():
+    soup = tools.parse_html('<div id="a" class="x y"><p>1<script>var s;</script> <b>2</b></p><p class="x">3</p>'
+                            '<a href="/q" rel="nofollow">q</a></div>')
+    assert soup.name == "[document]"
+    assert soup.div["class"] == ["x", "y"]
+    assert soup.div.get("title", "none") == "none"
+    assert soup.p.text == "1 2"
+    assert soup.p.get_text("|", strip=True) == "1|2"
+    assert [p.text for p in soup.find_all("p", class_="x")] == ["3"]
+    assert soup.find("div", class_="x") is not None
+    assert soup.find("div", class_="y x") is None   # 有空格时要求完全相同
+    assert soup.find("a", rel=re.compile("follow"))["href"] == "/q"
+    assert [n.text for n in soup.select("#a > p, a[href='/q']")] == ["1 2", "3", "q"]
+    assert soup.select_one("div.y p b").text == "2"
+    assert soup.find("span") is None
+    with pytest.raises(KeyError):
+        soup.div["title"]
+    with pytest.raises(ValueError, match="unsupported css selector"):
+        soup.select("p:first-child")
+    assert tools.parse_html("").find("p") is None
+    # 没有实现的 Tag 属性不能当作标签查找
+    for attr in ("string", "next_sibling", "children"):
+        with pytest.raises(AttributeError):
+            getattr(soup.div, attr)
+
+
+def test_parse_offloaded(monkeypatch):
+    async def main():
+        assert await tools.parse_offloaded(sorted, [3, 1, 2]) == [1, 2, 3]
+        with pytest.raises(TypeError, match="can not be pickled"):
+            await tools.parse_offloaded(lambda x: x, 1)
+        with pytest.raises(TypeError, match="result of allocate_lock can not be pickled"):
+            await tools.parse_offloaded(threading.Lock)
+
+    monkeypatch.setattr(config, "offload_workers", 0)
+    monkeypatch.setattr(config, "offload_check_pickle", True)
+    asyncio.run(main())
+    # 默认直接调用，不经过 pickle
+    monkeypatch.setattr(config, "offload_check_pickle", False)
+    lock = asyncio.run(tools.parse_offloaded(threading.Lock))
+    assert lock.acquire(blocking=False)
+    # 在子进程中运行，结果相同
+    monkeypatch.setattr(config, "offload_workers", 1)
+    try:
+        asyncio.run(main())
+    finally:
+        tools.shutdown_offload_pool()
+    depth, stats = tools.offload_status()
+    assert depth == 0
+    assert next(s for s in stats if s.name == "sorted").tasks >= 2
+
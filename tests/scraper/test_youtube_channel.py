@@ -0,0 +1,46 @@
+"""
+对 Youtube 频道抓取器的测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/scraper/test_youtube_channel.py
+"""
+import asyncio
+
+import httpx
+
+from src.scraper import tools
+from src.scraper.examples.youtube_channel import YoutubeChannel
+
+HOME = b"""<html><head><link rel="alternate" type="application/rss+xml" title="RSS"
+href="https://www.youtube.com/feeds/videos.xml?channel_id=UC1"></head></html>"""
+ENTRIES = "".join(f"""<entry><title>视频 {i}</title><link rel="alternate" href="https://www.youtube.com/watch?v={i}"/>
+<published>2025-01-{20 - i:02d}T08:00:00+00:00</published></entry>""" for i in range(5))
+FEED = f"""<feed xmlns="http://www.w3.org/2005/Atom"><title>频道</title>{ENTRIES}</feed>""".encode()
+
+
+def test_one_feed_request_per_run(feed_client, monkeypatch):
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path == "/@channel":
+            return httpx.Response(200, content=HOME)
+        if request.url.path == "/feeds/videos.xml":
+            return httpx.Response(200, content=FEED)
+        return httpx.Response(200, text='"approxDurationMs": "61000",')
+
+    monkeypatch.setattr(YoutubeChannel, "channels", {})
+    client = feed_client(handler)
+    monkeypatch.setattr(tools, "get_client", lambda *_: client)
+
+    async def crawl() -> list[str]:
+        instance = await YoutubeChannel.create("channel")
+        return [a["title"] async for a in instance.get({"amount": 2})]
+
+    async def main():
+        return await crawl(), await crawl()
+
+    first, second = asyncio.run(main())
+    assert first == second == ["视频 0", "视频 1"]
+    # 频道主页和订阅源的开头只在第一次创建时请求，之后每次抓取只请求一次订阅源
+    assert requested.count("/@channel") == 1
+    assert requested.count("/feeds/videos.xml") == 3
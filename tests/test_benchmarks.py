@@ -0,0 +1,28 @@
+"""
+基准测试本身能运行，且能发现变慢的项
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/test_benchmarks.py
+"""
+from benchmarks.html_parse import QUERIES
+from benchmarks.html_parse import run as run_html_parse
+from benchmarks.scale import THRESHOLDS, check, run
+
+
+def test_scale_small():
+    result = run(5, 2, 3)
+    assert set(result["timings"]) == set(THRESHOLDS)
+    assert result["timings"]["store2database"]["count"] == 10
+    assert result["timings"]["route_rss_xml"]["count"] == 3
+
+def test_check_regression():
+    result = {"timings": {"generate_rss": {"per_op_ms": 2.0}, "store2database": {"per_op_ms": THRESHOLDS["store2database"] + 1}}}
+    baseline = {"timings": {"generate_rss": {"per_op_ms": 1.0}}}
+    failures = check(result, baseline, 0.25)
+    assert len(failures) == 2
+    # 在容许范围内的变慢不算
+    assert len(check(result, {"timings": {"generate_rss": {"per_op_ms": 1.9}}}, 0.25)) == 1
+
+def test_html_parse():
+    result = run_html_parse(1)
+    assert set(result["timings"]) == set(QUERIES)
+    assert all(t["parse_html_ms"] > 0 for t in result["timings"].values())
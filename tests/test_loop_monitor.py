@@ -0,0 +1,41 @@
+"""
+对事件循环阻塞监测测试
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/test_loop_monitor.py
+"""
+import asyncio
+import time
+
+from src.utils.loop_monitor import LoopMonitor, offenders, reset_current_scraper, set_current_scraper
+
+
+def blocking_parse():
+    time.sleep(0.4)
+
+async def child():
+    blocking_parse()
+
+async def fake_process_one_instance(name: str):
+    token = set_current_scraper(name)
+    try:
+        await asyncio.sleep(0.05)
+        # 抓取器中创建的子任务，也能归到这个抓取器
+        await asyncio.create_task(child())
+    finally:
+        reset_current_scraper(token)
+    await asyncio.sleep(0.3)
+
+async def run_with_monitor():
+    monitor = LoopMonitor(asyncio.get_running_loop(), threshold=0.2, interval=0.02)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await fake_process_one_instance("BlockingScraper")
+    monitor.stop()
+
+
+def test_blocking_scraper_is_named():
+    asyncio.run(run_with_monitor())
+    offender = offenders["BlockingScraper"]
+    assert offender.count == 1
+    assert offender.max_lag >= 0.3
+    assert "blocking_parse" in offender.last_stack
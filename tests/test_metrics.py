@@ -0,0 +1,53 @@
+# ruff: noqa: T201
+"""
+对指标的记录和输出格式测试
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/test_metrics.py
+"""
+import pytest
+
+from config_handle import config
+from src.utils.metrics import Counter, Gauge, Histogram, render_all
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    print("This is run before each metrics test")
+    monkeypatch.setattr(config, "enable_metrics", True)
+    yield
+    print("This is run after each metrics test")
+
+def test_disabled_records_nothing():
+    counter = Counter("test_disabled_total", "help", ("cls",))
+    histogram = Histogram("test_disabled_seconds", "help", ("cls",))
+    counter.inc("HotBilibili")
+    with histogram.time("HotBilibili"):
+        pass
+    assert "test_disabled_total{" not in render_all()
+    assert "test_disabled_seconds_count" not in render_all()
+
+def test_histogram(enabled):
+    histogram = Histogram("test_phase_seconds", "help", ("cls", "phase"), buckets=(0.1, 1))
+    histogram.observe(0.05, "HotBilibili", "parse")
+    histogram.observe(0.5, "HotBilibili", "parse")
+    histogram.observe(5, "HotBilibili", "parse")
+    text = render_all()
+    assert "# TYPE test_phase_seconds histogram" in text
+    assert 'test_phase_seconds_bucket{cls="HotBilibili",phase="parse",le="0.1"} 1' in text
+    assert 'test_phase_seconds_bucket{cls="HotBilibili",phase="parse",le="1"} 2' in text
+    assert 'test_phase_seconds_bucket{cls="HotBilibili",phase="parse",le="+Inf"} 3' in text
+    assert 'test_phase_seconds_count{cls="HotBilibili",phase="parse"} 3' in text
+
+def test_counter(enabled):
+    counter = Counter("test_articles_total", "help", ("source",))
+    counter.inc('a "quoted" name')
+    counter.inc('a "quoted" name', amount=2)
+    assert 'test_articles_total{source="a \\"quoted\\" name"} 3' in render_all()
+
+def test_gauge(enabled):
+    gauge = Gauge("test_queue_length", "help")
+    gauge.set(3)
+    gauge.set(1)
+    text = render_all()
+    assert "# TYPE test_queue_length gauge" in text
+    assert "test_queue_length 1" in text
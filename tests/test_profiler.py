@@ -0,0 +1,63 @@
+"""
+对运行分析测试
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/test_profiler.py
+"""
+import asyncio
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from config_handle import config
+from src.utils.profiler import profile
+
+
+def busy_function():
+    return sum(i * i for i in range(10**6))
+
+async def busy_coro():
+    await asyncio.sleep(0.01)
+    data = [str(i) for i in range(10**5)]
+    return busy_function() + len(data)
+
+async def failed_coro():
+    raise ValueError("boom")
+
+
+@pytest.fixture(autouse=True)
+def tmp_data_dir(monkeypatch, tmp_path):
+    """结果写入临时目录，不留在测试的数据目录中"""
+    monkeypatch.setattr(config, "data_dir", str(tmp_path))
+    return tmp_path
+
+
+def test_profile():
+    summary = asyncio.run(profile("busy", busy_coro()))
+    assert summary.result == busy_function() + 10**5
+    assert summary.samples > 0
+    stacks = Path(summary.stacks_file).read_text(encoding="utf-8")
+    assert "busy_function" in stacks
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.splitlines())
+    assert summary.top_allocations
+    assert Path(summary.allocations_file).exists()
+
+def test_profile_error():
+    summary = asyncio.run(profile("failed", failed_coro()))
+    assert summary.error == "ValueError: boom"
+
+def test_overlapping_profiles():
+    async def main():
+        async def short():
+            await asyncio.sleep(0.01)
+
+        async def long():
+            await asyncio.sleep(0.05)
+            # 先结束的分析不能停止另一个还在进行的
+            return tracemalloc.is_tracing()
+
+        return await asyncio.gather(profile("long", long()), profile("short", short()))
+
+    long_summary, _ = asyncio.run(main())
+    assert long_summary.result is True
+    assert not tracemalloc.is_tracing()
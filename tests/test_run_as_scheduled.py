@@ -0,0 +1,40 @@
+# ruff: noqa: T201
+"""
+对定时任务的调度租约测试，不需要网络
+
+SOURCE2RSS_CONFIG_FILE=tests/test_config.yaml .env/bin/python -m pytest -s tests/test_run_as_scheduled.py
+"""
+import threading
+import time
+
+import pytest
+
+from config_handle import config
+from src import run_as_scheduled
+from src.crawl import lease
+
+
+@pytest.fixture
+def setup_and_tear_down():
+    print("This is run before each scheduler test")
+    yield
+    run_as_scheduled.is_leader.clear()
+    print("This is run after each scheduler test")
+
+def test_lease_renewed_during_long_job(setup_and_tear_down, monkeypatch):
+    renewals = []
+    monkeypatch.setattr(config, "lease_ttl", 0.03)
+    monkeypatch.setattr(lease, "acquire", lambda name: renewals.append(name) or True)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=run_as_scheduled.keep_leader, args=(stop,))
+    heartbeat.start()
+    # 定时任务长时间等待抓取结果，期间租约依然续期
+    time.sleep(0.2)
+    assert run_as_scheduled.is_leader.is_set()
+    assert len(renewals) >= 3
+
+    monkeypatch.setattr(lease, "acquire", lambda _: False)
+    time.sleep(0.05)
+    assert not run_as_scheduled.is_leader.is_set()
+    stop.set()
+    heartbeat.join()
@@ -67,6 +67,24 @@ def test_run_all_crawler(setup_and_tear_down):
     response = client.post("/manage/crawler/run_all", json={})
     assert response.status_code == 401
 
+"""
+分析一次抓取器的运行
+
+curl -X 'POST' \
+  'http://rss.vfly2.com/manage/crawler/profile' \
+  -H "Authorization: Basic $(echo -n 'vfly2:123456' | base64 | tr -d '\n')" \
+  -d 'cls_id=HotBilibili'
+"""
+def test_profile_scraper(setup_and_tear_down):
+    headers = get_headers(config.query_username, config.query_password, accept="html")
+    headers.pop("Content-Type")  # 表单
+    response = client.post("/manage/crawler/profile", data={"cls_id": "NotExist"}, headers=headers)
+    assert response.status_code == 200
+    assert "not found" in response.text
+
+    response = client.post("/manage/crawler/profile", data={"cls_id": "HotBilibili"})
+    assert response.status_code == 401
+
 """
 更新抓取器配置
 
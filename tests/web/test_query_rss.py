@@ -12,6 +12,7 @@ from httpx import ASGITransport, AsyncClient
 
 from config_handle import config
 from main import fast_app
+from src.web.query_rss import CacheType, async_cached
 from tests.web.test_user import add_source_to_user, register_user
 from tests.web.utility import get_headers
 
@@ -154,7 +155,7 @@ async def test_query_rss_high_concurrency():
 @pytest.mark.slow
 @pytest.mark.asyncio
 async def test_query_rss_same_scraper_in_one_time():
-    """同一时间，完全相同的实例只能有一个在运行，其他的直接放弃"""
+    """同一时间，完全相同的实例只能有一个在运行，其他的等待并得到同一个结果"""
     async with AsyncClient(transport=ASGITransport(app=fast_app), base_url="http://async_testserver") as ac: # type: ignore
         urls = [
             "/query_rss/BilibiliUp/?q=246370149",
@@ -167,5 +168,26 @@ async def test_query_rss_same_scraper_in_one_time():
         responses = await asyncio.gather(*tasks)
 
         status_code_list = [response.status_code for response in responses]
-        status_code_list.sort()
-        assert status_code_list == [200, 466, 466]
+        assert status_code_list == [200, 200, 200]
+        assert len({response.text for response in responses}) == 1
+
+
+@pytest.mark.asyncio
+async def test_coalesce_same_request():
+    """相同的请求只会触发一次抓取，等价的参数共用一个缓存"""
+    calls = []
+
+    @async_cached
+    async def fake_crawl(cls_id: str, one_group_params: tuple, *, cache_type: CacheType=CacheType.NORMAL) -> str:
+        calls.append(one_group_params)
+        await asyncio.sleep(0.1)
+        return f"{cls_id}_{'_'.join(one_group_params)}"
+
+    tasks = (fake_crawl("FakeScraper", params, CacheType.JUST_REFRESH) for params in (("1", "2"), (" 1", "2 "), ("1", "", "2")))
+    results = await asyncio.gather(*tasks)
+    assert results == ["FakeScraper_1_2"] * 3
+    assert calls == [("1", "2")]
+
+    # 之后普通用户的请求直接使用缓存
+    assert await fake_crawl("FakeScraper", ("1 ", " 2"), CacheType.NORMAL) == "FakeScraper_1_2"
+    assert len(calls) == 1